@@ -29,6 +29,7 @@ from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import sys
 sys.path.append('.')  # Para importar o consolidator
+from rate_limiter import AdaptiveRateLimiter
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -818,6 +819,7 @@ scraping_status = {
     'current': '',
     'message': '',
     'results': [],
+    'rate_limiter': {},
     'start_time': None,
     'end_time': None
 }
@@ -856,17 +858,28 @@ def run_scraping():
         
         scraping_status['message'] = 'Login realizado com sucesso! Iniciando consultas...'
         
+        # Ritmo adaptativo entre consultas (antes 2s fixos); a pesquisa já tem esperas internas de ~10s
+        limitador = AdaptiveRateLimiter.from_env(taxa_inicial=0.5, latencia_lenta=20.0)
+        scraping_status['rate_limiter'] = limitador.snapshot()
+        
         # Processar cada produto
         for i, produto in enumerate(produtos, 1):
             if not scraping_status['running']:
                 break
+            
+            if not limitador.acquire(lambda: scraping_status['running']):
+                break
                 
             scraping_status['current'] = produto
             scraping_status['progress'] = int((i / len(produtos)) * 100)
             scraping_status['message'] = f'Processando produto {produto} ({i}/{len(produtos)})'
             
             # Pesquisar produto
+            inicio = time.monotonic()
             resultado = scraper.search_product(produto, "TINTO")
+            resultado['latencia'] = round(time.monotonic() - inicio, 3)
+            limitador.record(resultado)
+            scraping_status['rate_limiter'] = limitador.snapshot()
             
             if resultado['success']:
                 if resultado.get('dados'):
@@ -880,9 +893,6 @@ def run_scraping():
                 scraping_status['results'].append(resultado)
             else:
                 scraping_status['message'] = f'Erro no produto {produto}: {resultado.get("error", "Erro desconhecido")}'
-            
-            # Pequena pausa entre requisições
-            time.sleep(2)
         
         scraping_status['end_time'] = datetime.now().isoformat()
         scraping_status['message'] = 'Scraping concluído com sucesso!'
@@ -942,6 +952,7 @@ def start_scraping():
         'current': '',
         'message': 'Iniciando...',
         'results': [],
+        'rate_limiter': {},
         'start_time': None,
         'end_time': None
     }
@@ -0,0 +1,174 @@
+# benchmark_parser.py - Parser por texto: busca por janelas (antes) x máquina de estados de uma passada, em páginas sintéticas grandes
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+import parser_dgb
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FOLDER = 'benchmarks'
+
+TIMESTAMP_FIXO = '2000-01-01 00:00:00'
+
+CORES = ['5 - BLACK', '12 - OFF WHITE', '31 - AZUL MARINHO', '47 - VERMELHO', '88 - CINZA MESCLA']
+
+def pagina_sintetica(quantidade, produto='20', previsoes=4):
+    """
+    Página de resultados no formato do DGB com `quantidade` linhas tr.registro,
+    cada uma com `previsoes` previsões (pronta entrega e datas) e os 3 valores.
+    """
+    codigo = str(produto).zfill(6)
+    inicio = datetime(2026, 1, 20)
+    partes = [
+        '<html><head><title>Estoque / Previsão</title>',
+        '<script>var filtros = {"produto": "%s"};</script>' % codigo,
+        '<style>.registro { color: #000; }</style></head><body><table>'
+    ]
+    for i in range(quantidade):
+        partes.append(
+            '<tr class="registro"><td><div class="container-3-x">'
+            f'<div title="Produto"><b>{codigo}</b> VELUDO CONFORT</div>'
+            f'<div class="mt-10"><b>001</b> TINTO / <b>{i % 100000:05d}</b> {CORES[i % len(CORES)]}</div>'
+            '</div>'
+        )
+        for p in range(previsoes):
+            previsao = 'Pronta entrega' if p == 0 else (inicio + timedelta(days=7 * (i % 20 + p))).strftime('%d/%m/%Y')
+            estoque = (i * 7919 + p * 104729) % 10_000_000
+            pedidos = estoque // 3
+            valores = [f"{v // 100:,}".replace(',', '.') + f",{v % 100:02d}" for v in (estoque, pedidos, estoque - pedidos)]
+            partes.append(
+                '<span class="registro">'
+                f'<label>Previsão</label><span>{previsao}</span>'
+                f'<label>Estoque</label><span>{valores[0]}</span>'
+                f'<label>Pedidos</label><span>{valores[1]}</span>'
+                f'<label>Disponível</label><span>{valores[2]}</span>'
+                '</span>'
+            )
+        partes.append('</td></tr>\n')
+    partes.append('</table></body></html>')
+    return ''.join(partes)
+
+def registros_reescaneando(linhas, produto_codigo, artigo, timestamp):
+    """
+    Busca anterior: para cada linha com o código, relê as 20 linhas seguintes e,
+    para cada previsão, as 10 seguintes com re.findall (referência de resultado e tempo).
+    """
+    registros = []
+    for i, line in enumerate(linhas):
+        if str(produto_codigo) in line:
+            descricao = line
+            for j in range(i, min(i + 20, len(linhas))):
+                data_line = linhas[j]
+                if parser_dgb.PADRAO_DATA.match(data_line) or data_line.lower() == 'pronta entrega':
+                    valores_encontrados = []
+                    for k in range(j + 1, min(j + 10, len(linhas))):
+                        numeros = parser_dgb.PADRAO_NUMEROS.findall(linhas[k])
+                        if numeros:
+                            valores_encontrados.extend(numeros)
+                        if len(valores_encontrados) >= 3:
+                            break
+                    if len(valores_encontrados) >= 3:
+                        registros.append([
+                            artigo, timestamp, descricao, data_line,
+                            parser_dgb.formatar_valor_csv(valores_encontrados[0]),
+                            parser_dgb.formatar_valor_csv(valores_encontrados[1]),
+                            parser_dgb.formatar_valor_csv(valores_encontrados[2])
+                        ])
+    return registros
+
+def cronometrar(funcao, repeticoes):
+    """(melhor tempo em s, resultado da última execução)"""
+    melhor, resultado = None, None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return melhor, resultado
+
+def medir(quantidade, produto, repeticoes):
+    """Etapa das linhas e parse completo (antes: busca por janelas + texto gravado em disco) para uma página"""
+    html = pagina_sintetica(quantidade, produto)
+    artigo = str(produto).lstrip('0')
+    texto = parser_dgb.texto_da_pagina(html)
+    linhas = list(parser_dgb.linhas_do_texto(texto))
+
+    antes_linhas_s, esperado = cronometrar(
+        lambda: registros_reescaneando(linhas, produto, artigo, TIMESTAMP_FIXO), repeticoes)
+    depois_linhas_s, obtido = cronometrar(
+        lambda: list(parser_dgb.registros_das_linhas(iter(linhas), produto, artigo, TIMESTAMP_FIXO)), repeticoes)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        def antes_completo():
+            texto_pagina = parser_dgb.texto_da_pagina(html)
+            with open(os.path.join(pasta, 'parser.txt'), 'w', encoding='utf-8') as f:
+                f.write(texto_pagina)
+            linhas_pagina = [l.strip() for l in texto_pagina.split('\n') if l.strip()]
+            return registros_reescaneando(linhas_pagina, produto, artigo, TIMESTAMP_FIXO)
+
+        antes_completo_s, _ = cronometrar(antes_completo, repeticoes)
+    depois_completo_s, completos = cronometrar(
+        lambda: parser_dgb.parse_html_dgb_simples(html, produto, salvar_texto=False), repeticoes)
+
+    # O parse completo usa o horário atual: compara sem a coluna datahora
+    iguais = esperado == obtido and [r[2:] for r in completos] == [r[2:] for r in esperado]
+    return {
+        'linhas_registro': quantidade,
+        'kb_html': round(len(html) / 1024, 1),
+        'linhas_texto': len(linhas),
+        'registros': len(obtido),
+        'iguais': iguais,
+        'antes_linhas_ms': round(antes_linhas_s * 1000, 2),
+        'depois_linhas_ms': round(depois_linhas_s * 1000, 2),
+        'aceleracao_linhas': round(antes_linhas_s / depois_linhas_s, 2) if depois_linhas_s else None,
+        'antes_completo_ms': round(antes_completo_s * 1000, 2),
+        'depois_completo_ms': round(depois_completo_s * 1000, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do parser por texto do estoque em páginas sintéticas')
+    parser.add_argument('--linhas-registro', type=int, nargs='*', default=[100, 1000, 5000],
+                        help='Tamanhos da página (linhas tr.registro)')
+    parser.add_argument('--produto', default='20', help='Código do produto (curto = mais linhas casando o código)')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Execuções de cada caminho (vale a melhor)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger('parser_dgb').setLevel(logging.WARNING)
+
+    resultados = [medir(n, args.produto, args.repeticoes) for n in args.linhas_registro]
+
+    relatorio = {
+        'timestamp': datetime.now().isoformat(),
+        'produto': args.produto,
+        'repeticoes': args.repeticoes,
+        'paginas': resultados
+    }
+    os.makedirs(BENCHMARK_FOLDER, exist_ok=True)
+    caminho = os.path.join(BENCHMARK_FOLDER, f"parser_estoque_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"{'tr.registro':>12}{'KB':>9}{'linhas':>9}{'registros':>11}"
+          f"{'janelas ms':>12}{'passada ms':>12}{'aceleração':>12}{'completo antes/depois ms':>28}{'igual':>7}")
+    for r in resultados:
+        completo = f"{r['antes_completo_ms']} / {r['depois_completo_ms']}"
+        print(f"{r['linhas_registro']:>12}{r['kb_html']:>9}{r['linhas_texto']:>9}{r['registros']:>11}"
+              f"{r['antes_linhas_ms']:>12}{r['depois_linhas_ms']:>12}{r['aceleracao_linhas']:>11}x"
+              f"{completo:>28}{'✅' if r['iguais'] else '❌':>7}")
+    print(f"\n💾 {caminho}")
+
+    divergentes = [r['linhas_registro'] for r in resultados if not r['iguais']]
+    if divergentes:
+        print(f"❌ Resultados diferentes nas páginas com {divergentes} linhas")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
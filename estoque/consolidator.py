@@ -9,6 +9,8 @@ import logging
 from typing import List, Dict, Any, Optional, Tuple
 import json
 
+from numeros_br import centavos_de_texto, centavos_de_textos, textos_de_centavos, reais_de_textos
+
 logger = logging.getLogger(__name__)
 
 class DGBDataProcessor:
@@ -33,7 +35,10 @@ class DGBDataProcessor:
             required_columns = ['artigo', 'datahora', 'Produto / Situação / Cor / Desenho / Variante',
                               'Previsão', 'Estoque', 'Pedidos', 'Disponível']
             
-            for _, row in df.iterrows():
+            # Valores normalizados em lote (coluna inteira), não célula a célula
+            valores = {col: textos_de_centavos(centavos_de_textos(df[col])) for col in ['Estoque', 'Pedidos', 'Disponível']}
+            
+            for i, row in df.iterrows():
                 try:
                     # Extrair informações
                     artigo = str(row['artigo']).strip()
@@ -41,11 +46,6 @@ class DGBDataProcessor:
                     descricao_completa = str(row['Produto / Situação / Cor / Desenho / Variante']).strip()
                     previsao = str(row['Previsão']).strip()
                     
-                    # Converter valores
-                    estoque = self.converter_valor(row['Estoque'])
-                    pedidos = self.converter_valor(row['Pedidos'])
-                    disponivel = self.converter_valor(row['Disponível'])
-                    
                     # Extrair informações detalhadas da descrição
                     info_detalhada = self.extrair_info_detalhada(descricao_completa, artigo)
                     
@@ -59,9 +59,9 @@ class DGBDataProcessor:
                         'VARIANTE': info_detalhada['variante'],
                         'SITUACAO': info_detalhada['situacao'],
                         'PREVISAO': previsao,
-                        'ESTOQUE': self.formatar_valor(estoque),
-                        'PEDIDOS': self.formatar_valor(pedidos),
-                        'DISPONIVEL': self.formatar_valor(disponivel),
+                        'ESTOQUE': valores['Estoque'][i],
+                        'PEDIDOS': valores['Pedidos'][i],
+                        'DISPONIVEL': valores['Disponível'][i],
                         'DATAHORA': datahora
                     }
                     
@@ -128,25 +128,18 @@ class DGBDataProcessor:
         return info
     
     def converter_valor(self, valor) -> float:
-        """Converte valor string para float"""
+        """Converte valor string para float (uma célula; para colunas use numeros_br.reais_de_textos)"""
         try:
             if pd.isna(valor):
                 return 0.0
-            
-            valor_str = str(valor).strip()
-            # Remover pontos de milhar e converter vírgula para ponto
-            valor_str = valor_str.replace('.', '').replace(',', '.')
-            return float(valor_str)
+            return (centavos_de_texto(valor) or 0) / 100
         except:
             return 0.0
     
     def formatar_valor(self, valor: float) -> str:
         """Formata valor float para string brasileira"""
         try:
-            # Formatar com separador de milhar e vírgula decimal
-            valor_str = f"{valor:,.2f}"
-            valor_str = valor_str.replace(',', 'X').replace('.', ',').replace('X', '.')
-            return valor_str
+            return textos_de_centavos([round(valor * 100)])[0]
         except:
             return "0,00"
     
@@ -194,9 +187,9 @@ class DGBDataProcessor:
         
         # Estatísticas
         total_registros = len(df)
-        total_estoque = sum(self.converter_valor(v) for v in df['ESTOQUE'])
-        total_pedidos = sum(self.converter_valor(v) for v in df['PEDIDOS'])
-        total_disponivel = sum(self.converter_valor(v) for v in df['DISPONIVEL'])
+        total_estoque = self.somar_centavos(df['ESTOQUE']) / 100
+        total_pedidos = self.somar_centavos(df['PEDIDOS']) / 100
+        total_disponivel = self.somar_centavos(df['DISPONIVEL']) / 100
         
         logger.info("=" * 60)
         logger.info("CONSOLIDAÇÃO CONCLUÍDA")
@@ -241,22 +234,12 @@ class DGBDataProcessor:
             
             # Aba 2: Resumo por produto
             if 'ARTIGO' in df.columns:
-                resumo_produto = df.groupby('ARTIGO').agg({
-                    'DESCRICAO': 'first',
-                    'ESTOQUE': lambda x: self.somar_valores(x),
-                    'PEDIDOS': lambda x: self.somar_valores(x),
-                    'DISPONIVEL': lambda x: self.somar_valores(x)
-                }).reset_index()
+                resumo_produto = self.resumir_valores(df, ['ARTIGO'])
                 resumo_produto.to_excel(writer, sheet_name='RESUMO POR PRODUTO', index=False)
             
             # Aba 3: Resumo por cor
             if 'COR' in df.columns and 'ARTIGO' in df.columns:
-                resumo_cor = df.groupby(['ARTIGO', 'COR']).agg({
-                    'DESCRICAO': 'first',
-                    'ESTOQUE': lambda x: self.somar_valores(x),
-                    'PEDIDOS': lambda x: self.somar_valores(x),
-                    'DISPONIVEL': lambda x: self.somar_valores(x)
-                }).reset_index()
+                resumo_cor = self.resumir_valores(df, ['ARTIGO', 'COR'])
                 resumo_cor.to_excel(writer, sheet_name='RESUMO POR COR', index=False)
             
             # Aba 4: Pronta entrega
@@ -276,7 +259,7 @@ class DGBDataProcessor:
                 try:
                     # Converter DISPONIVEL para numérico
                     df_pivot = df.copy()
-                    df_pivot['DISPONIVEL_NUM'] = df_pivot['DISPONIVEL'].apply(self.converter_valor)
+                    df_pivot['DISPONIVEL_NUM'] = reais_de_textos(df_pivot['DISPONIVEL'])
                     
                     pivot = pd.pivot_table(df_pivot, 
                                          values='DISPONIVEL_NUM',
@@ -294,10 +277,26 @@ class DGBDataProcessor:
     
     def somar_valores(self, serie):
         """Soma valores de uma série"""
-        total = 0.0
-        for valor in serie:
-            total += self.converter_valor(valor)
-        return self.formatar_valor(total)
+        return textos_de_centavos([self.somar_centavos(serie)])[0]
+    
+    def somar_centavos(self, serie) -> int:
+        """Soma, em centavos, de uma coluna de valores no formato brasileiro"""
+        return int(centavos_de_textos(serie).sum())
+    
+    def resumir_valores(self, df: pd.DataFrame, chaves: List[str]) -> pd.DataFrame:
+        """Descrição e totais de estoque/pedidos/disponível por grupo, somados em centavos"""
+        centavos = df[chaves + ['DESCRICAO']].copy()
+        for col in ['ESTOQUE', 'PEDIDOS', 'DISPONIVEL']:
+            centavos[col] = centavos_de_textos(df[col])
+        resumo = centavos.groupby(chaves).agg({
+            'DESCRICAO': 'first',
+            'ESTOQUE': 'sum',
+            'PEDIDOS': 'sum',
+            'DISPONIVEL': 'sum'
+        }).reset_index()
+        for col in ['ESTOQUE', 'PEDIDOS', 'DISPONIVEL']:
+            resumo[col] = textos_de_centavos(resumo[col])
+        return resumo
     
     def gerar_resumo_json(self, df: pd.DataFrame, csv_files: List[str]) -> Dict[str, Any]:
         """Gera resumo em formato JSON"""
@@ -305,9 +304,9 @@ class DGBDataProcessor:
             return {}
         
         # Calcular totais
-        total_estoque = sum(self.converter_valor(v) for v in df['ESTOQUE'])
-        total_pedidos = sum(self.converter_valor(v) for v in df['PEDIDOS'])
-        total_disponivel = sum(self.converter_valor(v) for v in df['DISPONIVEL'])
+        total_estoque = self.somar_centavos(df['ESTOQUE']) / 100
+        total_pedidos = self.somar_centavos(df['PEDIDOS']) / 100
+        total_disponivel = self.somar_centavos(df['DISPONIVEL']) / 100
         
         resumo = {
             'data_consolidacao': datetime.now().isoformat(),
@@ -324,17 +323,13 @@ class DGBDataProcessor:
         
         # Estoque por produto
         if 'ARTIGO' in df.columns and 'ESTOQUE' in df.columns:
-            estoque_por_produto = df.groupby('ARTIGO')['ESTOQUE'].apply(
-                lambda x: self.formatar_valor(sum(self.converter_valor(v) for v in x))
-            ).to_dict()
-            resumo['estoque_por_produto'] = estoque_por_produto
+            estoque_por_produto = centavos_de_textos(df['ESTOQUE']).groupby(df['ARTIGO']).sum()
+            resumo['estoque_por_produto'] = textos_de_centavos(estoque_por_produto).to_dict()
         
         # Disponível por cor
         if 'COR' in df.columns and 'DISPONIVEL' in df.columns:
-            disponivel_por_cor = df.groupby('COR')['DISPONIVEL'].apply(
-                lambda x: self.formatar_valor(sum(self.converter_valor(v) for v in x))
-            ).to_dict()
-            resumo['disponivel_por_cor'] = disponivel_por_cor
+            disponivel_por_cor = centavos_de_textos(df['DISPONIVEL']).groupby(df['COR']).sum()
+            resumo['disponivel_por_cor'] = textos_de_centavos(disponivel_por_cor).to_dict()
         
         return resumo
 
@@ -0,0 +1,190 @@
+# numeros_br.py - Números no formato brasileiro ("1.234,56") <-> centavos, por célula ou em lote (NumPy)
+# Cópia idêntica em scraper/ e estoque/ (cada app roda da própria pasta): altere as duas; scraper/tests/test_copias_estoque.py confere
+import re
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PADRAO_NUMERO_BR = re.compile(r'([+-]?)\s*(\d[\d.]*)?(?:,(\d*))?', re.ASCII)
+
+# Textos maiores que isso não passam pela matriz de bytes (ficam com o caminho por célula)
+LARGURA_MAXIMA = 32
+
+# Mais que isso estoura o int64 dos centavos
+DIGITOS_MAXIMOS = 17
+
+ZERO, VIRGULA, PONTO, MENOS = ord('0'), ord(','), ord('.'), ord('-')
+
+def centavos_de_texto(valor):
+    """'1.234,56' -> 123456; vazio -> 0; None se o texto não for um número"""
+    if valor is None:
+        return 0
+    texto = str(valor).strip()
+    if not texto:
+        return 0
+
+    match = PADRAO_NUMERO_BR.fullmatch(texto)
+    if not match or not (match.group(2) or match.group(3)):
+        return None
+    sinal, inteiro, decimal = match.groups()
+
+    # Casas além da segunda são descartadas, como fazia parser_dgb.formatar_valor
+    centavos = int((inteiro or '0').replace('.', '')) * 100 + int((decimal or '')[:2].ljust(2, '0'))
+    return -centavos if sinal == '-' else centavos
+
+def formatar_centavos(centavos):
+    """123456 -> '1.234,56'"""
+    sinal = '-' if centavos < 0 else ''
+    inteiro, resto = divmod(abs(int(centavos)), 100)
+    return f"{sinal}{inteiro:,}".replace(',', '.') + f",{resto:02d}"
+
+def _lista(valores):
+    """Valores de uma Series, array ou sequência como lista Python"""
+    if hasattr(valores, 'to_numpy'):
+        valores = valores.to_numpy()
+    if isinstance(valores, np.ndarray):
+        return valores.tolist()
+    return list(valores)
+
+def _como_entrada(resultado, valores):
+    """Series com o mesmo índice se a entrada for uma Series; senão o próprio resultado"""
+    if hasattr(valores, 'index') and hasattr(valores, 'to_numpy'):
+        import pandas as pd
+        return pd.Series(resultado, index=valores.index, name=valores.name)
+    return resultado
+
+def _matriz_bytes(textos):
+    """
+    Textos como matriz (largura, n) de bytes ASCII, uma coluna de caracteres por linha,
+    e a máscara dos que ficaram de fora (não ASCII, longos demais, não texto).
+    """
+    fora = np.zeros(len(textos), dtype=bool)
+    try:
+        matriz = np.array(textos, dtype='S')
+    except (UnicodeEncodeError, TypeError, ValueError):
+        matriz = None
+
+    if matriz is None or matriz.dtype.itemsize > LARGURA_MAXIMA:
+        limpos = []
+        for i, texto in enumerate(textos):
+            if isinstance(texto, str) and texto.isascii() and len(texto) <= LARGURA_MAXIMA:
+                limpos.append(texto)
+            else:
+                fora[i] = True
+                limpos.append('')
+        matriz = np.array(limpos, dtype='S')
+
+    largura = max(matriz.dtype.itemsize, 1)
+    matriz = matriz.astype(f'S{largura}').view(np.uint8).reshape(len(textos), largura)
+    return np.ascontiguousarray(matriz.T), fora
+
+def centavos_de_textos(valores, invalido=0):
+    """
+    Versão em lote de centavos_de_texto: Series/array/lista de textos -> centavos (int64).
+    Os textos no formato que o DGB e o write_csv produzem ('-1.234,56') são lidos
+    coluna de caracteres a coluna de caracteres sobre uma matriz de bytes; o resto
+    (espaços, sinal '+', lixo) cai no caminho por célula, com o mesmo resultado.
+    Valores que não são números viram `invalido`.
+    """
+    if isinstance(valores, np.ndarray) and valores.dtype.kind in 'iuf':
+        # Já numérico (ex.: coluna lida como float pelo pandas): reais -> centavos
+        return _como_entrada(np.rint(np.nan_to_num(valores) * 100).astype(np.int64), valores)
+    if hasattr(valores, 'dtype') and hasattr(valores, 'to_numpy') and valores.dtype.kind in 'iuf':
+        return _como_entrada(centavos_de_textos(valores.to_numpy(), invalido), valores)
+
+    textos = _lista(valores)
+    n = len(textos)
+    colunas, fora = _matriz_bytes(textos)
+
+    centavos = np.zeros(n, dtype=np.int64)
+    casas = np.zeros(n, dtype=np.int8)       # dígitos lidos depois da vírgula
+    digitos = np.zeros(n, dtype=np.int8)     # dígitos que entram no valor
+    virgula = np.zeros(n, dtype=bool)
+    negativo = colunas[0] == MENOS
+    por_celula = fora.copy()
+
+    for j, coluna in enumerate(colunas):
+        digito = coluna - np.uint8(ZERO)
+        e_digito = digito < 10
+        # Casas além da segunda são descartadas, como em centavos_de_texto
+        usar = e_digito & (casas < 2)
+        centavos = np.where(usar, centavos * 10 + digito, centavos)
+        digitos += usar
+        casas += e_digito & virgula
+
+        e_virgula = coluna == VIRGULA
+        e_ponto = coluna == PONTO
+        por_celula |= (e_virgula | e_ponto) & virgula
+        virgula |= e_virgula
+
+        outro = ~(e_digito | e_virgula | e_ponto | (coluna == 0))
+        if j == 0:
+            outro &= ~negativo
+        por_celula |= outro
+
+    # Ponto antes de qualquer dígito ('.5', '-.5', '..4') não é número para centavos_de_texto
+    primeiro = colunas[1] if len(colunas) > 1 else colunas[0]
+    por_celula |= np.where(negativo, primeiro, colunas[0]) == PONTO
+    por_celula |= (digitos == 0) | (digitos > DIGITOS_MAXIMOS)
+    centavos *= np.array([100, 10, 1], dtype=np.int64)[np.minimum(casas, 2)]
+    centavos = np.where(negativo, -centavos, centavos)
+
+    for i in np.flatnonzero(por_celula):
+        valor = centavos_de_texto(textos[i])
+        try:
+            centavos[i] = invalido if valor is None else valor
+        except OverflowError:
+            centavos[i] = invalido
+
+    return _como_entrada(centavos, valores)
+
+def textos_de_centavos(centavos):
+    """
+    Versão em lote de formatar_centavos: centavos (int) -> textos '1.234,56'.
+    Cada texto é montado de trás para frente numa matriz de bytes (unidades,
+    dezenas, vírgula, dígitos e pontos de milhar, sinal) e invertido no final.
+    """
+    valores = np.asarray(centavos.to_numpy() if hasattr(centavos, 'to_numpy') else centavos, dtype=np.int64)
+    n = len(valores)
+    resto, fracao = np.divmod(np.abs(valores), 100)
+    fracao = fracao.astype(np.uint8)
+
+    colunas = [fracao % 10 + np.uint8(ZERO), fracao // 10 + np.uint8(ZERO), np.full(n, VIRGULA, dtype=np.uint8)]
+    ativo = np.ones(n, dtype=bool)      # ainda há dígitos da parte inteira a escrever
+    sinal = valores < 0                 # '-' ainda não escrito
+    posicao = 0
+    while True:
+        if posicao % 4 == 3:
+            coluna = ativo * np.uint8(PONTO)
+        else:
+            resto, digito = np.divmod(resto, 10)
+            coluna = (digito.astype(np.uint8) + np.uint8(ZERO)) * ativo
+        coluna[sinal & ~ativo] = MENOS
+        sinal &= ativo
+        if posicao % 4 != 3:
+            ativo &= resto > 0
+        colunas.append(coluna)
+        posicao += 1
+        if not (ativo.any() or sinal.any()):
+            break
+
+    matriz = np.empty((n, len(colunas)), dtype=np.uint8)
+    for k, coluna in enumerate(colunas):
+        matriz[:, k] = coluna
+    # Bytes nulos à direita (números mais curtos) somem na conversão para str
+    invertidos = matriz.view(f'S{len(colunas)}').ravel().astype(str).tolist()
+    return _como_entrada([texto[::-1] for texto in invertidos], centavos)
+
+def reais_de_textos(valores):
+    """Textos '1.234,56' -> reais (float64), para somas e gráficos; não números viram 0.0"""
+    centavos = centavos_de_textos(valores)
+    reais = np.asarray(centavos, dtype=np.float64) / 100
+    return _como_entrada(reais, valores)
+
+def textos_de_reais(valores):
+    """Reais (float) -> textos '1.234,56'"""
+    reais = np.asarray(valores.to_numpy() if hasattr(valores, 'to_numpy') else valores, dtype=np.float64)
+    centavos = np.rint(np.nan_to_num(reais) * 100).astype(np.int64)
+    return _como_entrada(textos_de_centavos(centavos), valores)
@@ -2,12 +2,22 @@
 import os
 import re
 import csv
+from collections import deque
 from datetime import datetime
 from bs4 import BeautifulSoup
 import logging
 
 logger = logging.getLogger(__name__)
 
+PADRAO_DATA = re.compile(r'^\d{2}/\d{2}/\d{4}$')
+PADRAO_NUMEROS = re.compile(r'[\d.,]+')
+
+# Linhas, a partir da linha do produto (inclusive), em que se procuram previsões
+JANELA_PREVISOES = 20
+
+# Linhas, a partir da previsão (inclusive), em que se procuram os 3 valores
+JANELA_VALORES = 10
+
 def formatar_valor_csv(valor_str):
     """Formata valor para CSV no padrão brasileiro"""
     try:
@@ -36,87 +46,145 @@ def formatar_valor_csv(valor_str):
     except Exception as e:
         return "0,00"
 
-def parse_html_dgb_simples(html_content, produto_codigo):
-    """Parser SIMPLES e DIRETO para HTML do DGB"""
+def get_debug_parser(valor=None):
+    """Gravar o texto extraído em data/debug_parser (parâmetro ou DGB_DEBUG_PARSER, padrão desligado)"""
+    if valor is None:
+        valor = os.getenv('DGB_DEBUG_PARSER', '0')
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() not in ('0', 'false', 'nao', 'não', 'off', '')
+
+def salvar_texto_debug(texto_completo, produto_codigo):
+    """Texto extraído da página em data/debug_parser, para conferir o parser"""
+    debug_dir = os.path.join('data', 'debug_parser')
+    os.makedirs(debug_dir, exist_ok=True)
+    debug_file = os.path.join(debug_dir, f"parser_{produto_codigo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+    with open(debug_file, 'w', encoding='utf-8') as f:
+        f.write(texto_completo)
+    logger.info(f"📄 Texto extraído salvo em: {debug_file}")
+    return debug_file
+
+def texto_da_pagina(html_content):
+    """Texto da página sem scripts e styles, um nó de texto por linha"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    return soup.get_text(separator='\n')
+
+def linhas_do_texto(texto_completo):
+    """Linhas não vazias, sem espaços nas pontas"""
+    for line in texto_completo.split('\n'):
+        line = line.strip()
+        if line:
+            yield line
+
+class _LinhaProduto:
+    """Linha que contém o código do produto e as previsões achadas na janela dela"""
+    __slots__ = ('inicio', 'descricao', 'previsoes')
+    
+    def __init__(self, inicio, descricao):
+        self.inicio = inicio
+        self.descricao = descricao
+        self.previsoes = []
+
+class _Previsao:
+    """Linha de previsão juntando os números das linhas seguintes"""
+    __slots__ = ('previsao', 'ultima', 'valores', 'aberta', '_campos')
+    
+    def __init__(self, previsao, ultima):
+        self.previsao = previsao
+        self.ultima = ultima
+        self.valores = []
+        self.aberta = True
+        self._campos = None
+    
+    def campos(self):
+        """Previsão e os 3 valores formatados (uma vez só, mesmo com a previsão em várias janelas)"""
+        if self._campos is None:
+            self._campos = [self.previsao] + [formatar_valor_csv(v) for v in self.valores[:3]]
+        return self._campos
+
+def registros_das_linhas(linhas, produto_codigo, artigo, timestamp):
+    """
+    Máquina de estados de uma passada sobre as linhas, com o mesmo resultado da
+    busca por janelas: cada linha com o código do produto abre uma janela de
+    JANELA_PREVISOES linhas (contando ela) onde procurar previsões, e cada previsão
+    junta os números das JANELA_VALORES - 1 linhas seguintes até ter 3.
+    Cada linha é lida uma vez (os números só se houver previsão esperando valores);
+    os registros de uma linha de produto saem assim que a janela dela e as das suas
+    previsões fecham, na mesma ordem da busca por janelas.
+    """
+    codigo = str(produto_codigo)
+    produtos = deque()      # linhas de produto com registros ainda não emitidos
+    pendentes = []          # previsões ainda juntando valores
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    def emitir(produto):
+        for previsao in produto.previsoes:
+            if len(previsao.valores) >= 3:
+                valores = previsao.valores
+                if debug:
+                    logger.debug(f"✅ Registro criado: {previsao.previsao} | {valores[0]}, {valores[1]}, {valores[2]}")
+                yield [artigo, timestamp, produto.descricao] + previsao.campos()
+    
+    for indice, line in enumerate(linhas):
+        # Números desta linha para as previsões das linhas anteriores
+        if pendentes:
+            numeros = PADRAO_NUMEROS.findall(line)
+            ainda_abertas = []
+            for previsao in pendentes:
+                if numeros:
+                    previsao.valores.extend(numeros)
+                if len(previsao.valores) < 3 and indice < previsao.ultima:
+                    ainda_abertas.append(previsao)
+                else:
+                    previsao.aberta = False
+            pendentes = ainda_abertas
+        
+        if codigo in line:
+            produtos.append(_LinhaProduto(indice, line))
+            if debug:
+                logger.debug(f"✅ Produto encontrado na linha {indice}: {line[:100]}")
+        
+        if produtos and (PADRAO_DATA.match(line) or (len(line) == 14 and line.lower() == 'pronta entrega')):
+            janelas = [p for p in produtos if indice < p.inicio + JANELA_PREVISOES]
+            if janelas:
+                if debug:
+                    logger.debug(f"📅 Previsão encontrada: {line}")
+                previsao = _Previsao(line, indice + JANELA_VALORES - 1)
+                for produto in janelas:
+                    produto.previsoes.append(previsao)
+                pendentes.append(previsao)
+        
+        # Janela fechada e previsões completas: os registros da linha de produto já podem sair
+        while (produtos and indice >= produtos[0].inicio + JANELA_PREVISOES - 1
+               and not any(p.aberta for p in produtos[0].previsoes)):
+            yield from emitir(produtos.popleft())
+    
+    # Fim do texto: as previsões ainda abertas ficam com o que juntaram
+    for previsao in pendentes:
+        previsao.aberta = False
+    while produtos:
+        yield from emitir(produtos.popleft())
+
+def parse_html_dgb_simples(html_content, produto_codigo, salvar_texto=None):
+    """Parser SIMPLES e DIRETO para HTML do DGB (texto da página em uma passada)"""
     registros = []
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     artigo = str(produto_codigo).lstrip('0')
     
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # Pegar TODO o texto
+        texto_completo = texto_da_pagina(html_content)
         
-        # Remover scripts e styles
-        for script in soup(["script", "style"]):
-            script.decompose()
+        # Salvar texto para debug (só se pedido)
+        if get_debug_parser(salvar_texto):
+            salvar_texto_debug(texto_completo, produto_codigo)
         
-        # Pegar TODO o texto
-        texto_completo = soup.get_text(separator='\n')
-        
-        # Salvar texto para debug
-        debug_dir = os.path.join('data', 'debug_parser')
-        os.makedirs(debug_dir, exist_ok=True)
-        debug_file = os.path.join(debug_dir, f"parser_{produto_codigo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
-        with open(debug_file, 'w', encoding='utf-8') as f:
-            f.write(texto_completo)
-        
-        logger.info(f"📄 Texto extraído salvo em: {debug_file}")
-        
-        # Dividir em linhas
-        lines = texto_completo.split('\n')
-        lines = [line.strip() for line in lines if line.strip()]
-        
-        # Procurar pelo produto
-        produto_encontrado = False
-        descricao = f"Produto {produto_codigo}"
-        
-        for i, line in enumerate(lines):
-            # Verificar se a linha contém o produto
-            if str(produto_codigo) in line:
-                produto_encontrado = True
-                descricao = line
-                logger.info(f"✅ Produto encontrado na linha {i}: {line[:100]}")
-                
-                # Procurar por linhas de dados nas próximas 20 linhas
-                for j in range(i, min(i + 20, len(lines))):
-                    data_line = lines[j]
-                    
-                    # Verificar se é uma linha de dados
-                    if (re.match(r'^\d{2}/\d{2}/\d{4}$', data_line) or 
-                        data_line.lower() == 'pronta entrega'):
-                        
-                        previsao = data_line
-                        logger.info(f"📅 Previsão encontrada: {previsao}")
-                        
-                        # Procurar por 3 números nas próximas linhas
-                        valores_encontrados = []
-                        for k in range(j + 1, min(j + 10, len(lines))):
-                            num_line = lines[k]
-                            
-                            # Extrair números desta linha
-                            numeros = re.findall(r'[\d.,]+', num_line)
-                            if numeros:
-                                valores_encontrados.extend(numeros)
-                                logger.info(f"🔢 Números encontrados: {numeros}")
-                            
-                            # Se já temos 3 números, para
-                            if len(valores_encontrados) >= 3:
-                                break
-                        
-                        # Se encontrou 3 valores, criar registro
-                        if len(valores_encontrados) >= 3:
-                            registro = [
-                                artigo,
-                                timestamp,
-                                descricao,
-                                previsao,
-                                formatar_valor_csv(valores_encontrados[0]),
-                                formatar_valor_csv(valores_encontrados[1]),
-                                formatar_valor_csv(valores_encontrados[2])
-                            ]
-                            registros.append(registro)
-                            logger.info(f"✅ Registro criado: {previsao} | {valores_encontrados[0]}, {valores_encontrados[1]}, {valores_encontrados[2]}")
-        
-        if not produto_encontrado:
+        for registro in registros_das_linhas(linhas_do_texto(texto_completo), produto_codigo, artigo, timestamp):
+            registros.append(registro)
+        
+        if not registros and str(produto_codigo) not in texto_completo:
             logger.warning(f"⚠️ Produto {produto_codigo} não encontrado no texto")
         
         logger.info(f"📊 Total de registros extraídos: {len(registros)}")
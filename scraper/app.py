@@ -1,6 +1,7 @@
 # app.py - ATUALIZADO com funcionalidade de Email Avançado
 import os
 import json
+import atexit
 import threading
 import logging
 from datetime import datetime
@@ -22,6 +23,12 @@ import uuid
 import scraper
 import consolidator
 import parser_dgb
+import run_journal
+import bulk_reparse
+from browser_pool import WarmBrowserPool
+from html_archive import get_archive
+from estrategias_cor import get_estrategias_cor, get_cor_aprendida
+from registros import linha_csv
 from pdf_generator import generate_pdf_report  # Novo import
 
 # Carregar variáveis de ambiente
@@ -69,6 +76,14 @@ scraping_status = {
     'message': '',
     'results': [],
     'csv_files': [],
+    'latencia': {},
+    'workers': {},
+    'throughput': {},
+    'backend': None,
+    'journal': None,
+    'rate_limiter': {},
+    'resiliencia': {},
+    'pipeline': {},
     'start_time': None,
     'end_time': None
 }
@@ -76,6 +91,26 @@ scraping_status = {
 # Variável para a thread
 scraper_thread = None
 
+# Status do reprocessamento das capturas arquivadas (/api/reparse)
+reparse_status = {'running': False}
+reparse_thread = None
+
+# Pool de navegadores logados para consultas avulsas (criado no primeiro uso)
+browser_pool = None
+browser_pool_lock = threading.Lock()
+
+def get_browser_pool():
+    """Retorna o pool de navegadores aquecidos (DGB_POOL_SIZE, DGB_POOL_IDLE_SECONDS)"""
+    global browser_pool
+    with browser_pool_lock:
+        if browser_pool is None:
+            headless = os.getenv('DGB_POOL_HEADLESS', 'true').lower() != 'false'
+            browser_pool = WarmBrowserPool(
+                criar_scraper=lambda: scraper.criar_scraper_logado(headless=headless)
+            )
+            atexit.register(browser_pool.shutdown)
+        return browser_pool
+
 # ============================================
 # ROTA PARA ARQUIVOS ESTÁTICOS (NOVA)
 # ============================================
@@ -101,34 +136,76 @@ def get_status():
     """Retorna o status atual"""
     return jsonify(scraping_status)
 
-@app.route('/api/start', methods=['POST'])
-def start_scraping():
-    """Inicia o scraping"""
+def iniciar_thread_scraping(num_workers=None, backend=None, retomar=False):
+    """Reinicia o status e dispara a thread de scraping"""
     global scraping_status, scraper_thread
     
-    if scraping_status['running']:
-        return jsonify({'error': 'Scraping já está em execução'}), 400
-    
     # Reiniciar status
     scraping_status.update({
         'running': True,
         'progress': 0,
         'total': 0,
         'current': '',
-        'message': 'Iniciando...',
+        'message': 'Retomando...' if retomar else 'Iniciando...',
         'results': [],
         'csv_files': [],
+        'latencia': {},
+        'workers': {},
+        'throughput': {},
+        'backend': None,
+        'journal': None,
+        'rate_limiter': {},
+        'resiliencia': {},
+        'pipeline': {},
         'start_time': datetime.now().isoformat(),
         'end_time': None
     })
     
     # Iniciar thread
-    scraper_thread = threading.Thread(target=scraper.run_scraping_thread, args=(scraping_status,))
+    scraper_thread = threading.Thread(target=scraper.run_scraping_thread,
+                                      args=(scraping_status, num_workers, backend, retomar))
     scraper_thread.daemon = True
     scraper_thread.start()
+
+@app.route('/api/start', methods=['POST'])
+def start_scraping():
+    """Inicia o scraping"""
+    if scraping_status['running']:
+        return jsonify({'error': 'Scraping já está em execução'}), 400
+    if reparse_status.get('running'):
+        return jsonify({'error': 'Reprocessamento de capturas em execução'}), 400
+    
+    # Número de navegadores em paralelo (padrão: DGB_WORKERS) e backend (padrão: DGB_BACKEND)
+    data = request.get_json(silent=True) or {}
+    iniciar_thread_scraping(data.get('workers'), data.get('backend'))
     
     return jsonify({'success': True, 'message': 'Scraping iniciado'})
 
+@app.route('/api/resume', methods=['POST'])
+def resume_scraping():
+    """Retoma a última execução, pulando os produtos já concluídos no diário"""
+    if scraping_status['running']:
+        return jsonify({'error': 'Scraping já está em execução'}), 400
+    if reparse_status.get('running'):
+        return jsonify({'error': 'Reprocessamento de capturas em execução'}), 400
+    
+    journal = run_journal.RunJournal.latest()
+    if journal is None:
+        return jsonify({'success': False, 'error': 'Nenhuma execução anterior para retomar'})
+    
+    pendentes, concluidos = journal.pending()
+    if not pendentes:
+        return jsonify({'success': False, 'error': 'A última execução já foi concluída'})
+    
+    data = request.get_json(silent=True) or {}
+    iniciar_thread_scraping(data.get('workers'), data.get('backend'), retomar=True)
+    
+    return jsonify({
+        'success': True,
+        'message': f'Retomando: {len(pendentes)} pendentes, {len(concluidos)} já concluídos',
+        'journal': journal.caminho
+    })
+
 @app.route('/api/stop', methods=['POST'])
 def stop_scraping():
     """Para o scraping"""
@@ -138,16 +215,19 @@ def stop_scraping():
 
 @app.route('/api/test-login', methods=['POST'])
 def test_login():
-    """Testa as credenciais"""
+    """Testa as credenciais (com um navegador do pool, já logado ou recém-criado)"""
     try:
-        scraper_instance = scraper.DGBScraper(headless=True)
-        success = scraper_instance.login()
-        scraper_instance.close()
+        with get_browser_pool().lease() as scraper_instance:
+            reutilizada = scraper_instance.sessao_reutilizada
+            pool_hit = scraper_instance.pool_hit
         
-        if success:
-            return jsonify({'success': True, 'message': 'Login realizado com sucesso!'})
+        if pool_hit:
+            mensagem = 'Sessão ativa no pool de navegadores!'
         else:
-            return jsonify({'success': False, 'error': 'Falha no login. Verifique credenciais.'})
+            mensagem = 'Sessão em cache válida!' if reutilizada else 'Login realizado com sucesso!'
+        return jsonify({'success': True, 'message': mensagem, 'sessao_cache': reutilizada, 'pool_hit': pool_hit})
+    except RuntimeError as e:
+        return jsonify({'success': False, 'error': f'Falha no login. Verifique credenciais. ({e})'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -185,20 +265,24 @@ def create_csvs():
         csv_files_created = []
         
         for result in scraping_status['results']:
-            if result.get('success') and 'html' in result:
+            # Linhas extraídas no navegador dispensam o HTML
+            if result.get('success') and 'linhas' in result:
+                filename = scraper.DGBScraper.create_csv_from_rows(result['linhas'], result['codigo'])
+                if filename:
+                    csv_files_created.append({
+                        'produto': result['codigo'],
+                        'filename': filename
+                    })
+            elif result.get('success') and 'html' in result:
                 produto = result['codigo']
-                html = result['html']
-                
-                # Parsear HTML e criar CSV
-                registros = parser_dgb.parse_dgb_completo(html, produto)
                 
-                if registros:
-                    filename = scraper.DGBScraper.create_csv_from_html_static(html, produto)
-                    if filename:
-                        csv_files_created.append({
-                            'produto': produto,
-                            'filename': filename
-                        })
+                # Um único parse por HTML, já gravando o CSV
+                filename = scraper.DGBScraper.create_csv_from_html_static(result['html'], produto)
+                if filename:
+                    csv_files_created.append({
+                        'produto': produto,
+                        'filename': filename
+                    })
         
         if csv_files_created:
             return jsonify({
@@ -212,6 +296,35 @@ def create_csvs():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/reparse', methods=['POST'])
+def start_reparse():
+    """Regera os CSVs a partir das capturas arquivadas (ex.: depois de uma correção no parser)"""
+    global reparse_status, reparse_thread
+    
+    if scraping_status['running']:
+        return jsonify({'error': 'Scraping em execução - aguarde o fim para reprocessar'}), 400
+    if reparse_status.get('running'):
+        return jsonify({'error': 'Reprocessamento já está em execução'}), 400
+    
+    # Produtos (padrão: todos do arquivo), processos (padrão: DGB_REPARSE_WORKERS) e se apaga os CSVs anteriores
+    # (padrão: não; produtos com CSV mais novo que a captura nunca são reprocessados)
+    data = request.get_json(silent=True) or {}
+    reparse_status = bulk_reparse.status_inicial()
+    reparse_thread = threading.Thread(
+        target=bulk_reparse.reparsear_arquivo,
+        args=(reparse_status, data.get('produtos'), data.get('workers')),
+        kwargs={'substituir': bool(data.get('substituir', True))}
+    )
+    reparse_thread.daemon = True
+    reparse_thread.start()
+    
+    return jsonify({'success': True, 'message': 'Reprocessamento iniciado'})
+
+@app.route('/api/reparse/status')
+def get_reparse_status():
+    """Progresso do reprocessamento das capturas"""
+    return jsonify(reparse_status)
+
 @app.route('/api/consolidate', methods=['POST'])
 def consolidate():
     """Consolida todos os CSVs"""
@@ -283,7 +396,7 @@ def clean_data():
                     except:
                         pass
         
-        # Limpar debug
+        # Limpar debug (arquivos soltos antigos + arquivo comprimido)
         if clean_debug and os.path.exists(DEBUG_FOLDER):
             for file in os.listdir(DEBUG_FOLDER):
                 if file.endswith('.html'):
@@ -292,6 +405,12 @@ def clean_data():
                         files_deleted.append(f"debug/{file}")
                     except:
                         pass
+            try:
+                capturas = get_archive().clear()
+                if capturas:
+                    files_deleted.append(f"debug/archive ({capturas} capturas)")
+            except Exception as e:
+                logger.error(f"Erro ao limpar arquivo de capturas: {e}")
         
         # Limpar PDFs
         if clean_pdfs and os.path.exists(PDF_FOLDER):
@@ -1268,19 +1387,11 @@ def list_files():
 def debug_produto(produto):
     """Página de debug para ver HTML"""
     try:
-        # Verificar se pasta debug existe
-        if not os.path.exists('debug'):
-            return "Pasta debug não encontrada"
+        # Última captura deste produto pelo índice do arquivo
+        entrada, html_content = get_archive().latest_html(produto)
         
-        # Carregar o último HTML salvo deste produto
-        debug_files = [f for f in os.listdir('debug') if f.startswith(f'debug_produto_{produto}_')]
-        
-        if debug_files:
-            debug_files.sort(reverse=True)
-            latest = debug_files[0]
-            
-            with open(os.path.join('debug', latest), 'r', encoding='utf-8') as f:
-                html_content = f.read()
+        if html_content is not None:
+            latest = f"{entrada['hash'][:12]} ({entrada['timestamp']})"
             
             # Renderizar página de debug simples
             return f'''
@@ -1322,17 +1433,13 @@ def debug_produto(produto):
 def test_parser(produto):
     """Testa o parser com o último HTML capturado"""
     try:
-        # Encontrar o último arquivo de debug deste produto
-        debug_files = [f for f in os.listdir('debug') if f.startswith(f'debug_produto_{produto}_')]
+        # Última captura deste produto pelo índice do arquivo
+        entrada, html_content = get_archive().latest_html(produto)
         
-        if not debug_files:
+        if html_content is None:
             return jsonify({'success': False, 'error': 'Nenhum arquivo de debug encontrado'})
         
-        debug_files.sort(reverse=True)
-        latest_file = debug_files[0]
-        
-        with open(os.path.join('debug', latest_file), 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        latest_file = entrada['hash']
         
         # Testar TODOS os métodos de parsing
         
@@ -1360,23 +1467,23 @@ def test_parser(produto):
             'resultados': {
                 'parser_especifico': {
                     'registros': len(registros_especifico),
-                    'amostra': registros_especifico[:3] if registros_especifico else []
+                    'amostra': [linha_csv(r) for r in registros_especifico[:3]]
                 },
                 'parser_agressivo': {
                     'registros': len(registros_agressivo),
-                    'amostra': registros_agressivo[:3] if registros_agressivo else []
+                    'amostra': [linha_csv(r) for r in registros_agressivo[:3]]
                 },
                 'parser_estrutura': {
                     'registros': len(registros_estrutura),
-                    'amostra': registros_estrutura[:3] if registros_estrutura else []
+                    'amostra': [linha_csv(r) for r in registros_estrutura[:3]]
                 },
                 'parser_emergencia': {
                     'registros': len(registros_emergencia),
-                    'amostra': registros_emergencia[:3] if registros_emergencia else []
+                    'amostra': [linha_csv(r) for r in registros_emergencia[:3]]
                 },
                 'parser_completo': {
                     'registros': len(registros_completo),
-                    'amostra': registros_completo[:3] if registros_completo else []
+                    'amostra': [linha_csv(r) for r in registros_completo[:3]]
                 }
             },
             'recomendado': 'parser_completo' if registros_completo else 'parser_emergencia'
@@ -1438,32 +1545,50 @@ def get_dashboard():
 def test_scrape_single(produto):
     """Testa o scraping de um único produto"""
     try:
-        scraper_instance = scraper.DGBScraper(headless=False)
+        backend = scraper.get_backend(request.args.get('backend'))
+        if backend == 'selenium':
+            # Navegador aquecido do pool: só a ida e volta da pesquisa
+            with get_browser_pool().lease() as scraper_instance:
+                resultado = scraper.processar_produto(scraper_instance, produto)
+                pool_hit = scraper_instance.pool_hit
+            
+            if resultado['success'] and 'csv_file' in resultado:
+                return jsonify({
+                    'success': True,
+                    'message': f'Produto {produto} processado',
+                    'csv_file': resultado['csv_file'],
+                    'extracao': 'json' if 'linhas' in resultado else 'html',
+                    'html_size': len(resultado['html']) if 'html' in resultado else 0,
+                    'linhas': len(resultado.get('linhas', [])),
+                    'latencia': resultado.get('latencia'),
+                    'pool_hit': pool_hit
+                })
+            return jsonify({
+                'success': False,
+                'error': resultado.get('error', 'Erro desconhecido'),
+                'pool_hit': pool_hit
+            })
         
-        # Login
-        if not scraper_instance.login():
-            scraper_instance.close()
-            return jsonify({'success': False, 'error': 'Falha no login'})
+        scraper_instance = scraper.criar_scraper(backend, headless=False)
         
-        # Navegar para estoque
-        if not scraper_instance.navigate_to_stock():
+        # Sessão em cache ou login + navegação para estoque
+        if not scraper_instance.ensure_session():
             scraper_instance.close()
-            return jsonify({'success': False, 'error': 'Falha ao acessar estoque'})
+            return jsonify({'success': False, 'error': 'Falha no login ou ao acessar estoque'})
         
-        # Pesquisar produto
-        resultado = scraper_instance.search_product(produto)
+        # Pesquisar produto e criar CSV
+        resultado = scraper.processar_produto(scraper_instance, produto)
         
-        if resultado['success'] and 'html' in resultado:
-            # Criar CSV
-            csv_filename = scraper_instance.create_csv_from_html(resultado['html'], produto)
-            
+        if resultado['success'] and 'csv_file' in resultado:
             scraper_instance.close()
             
             return jsonify({
                 'success': True,
                 'message': f'Produto {produto} processado',
-                'csv_file': csv_filename,
-                'html_size': len(resultado['html'])
+                'csv_file': resultado['csv_file'],
+                'extracao': 'json' if 'linhas' in resultado else 'html',
+                'html_size': len(resultado['html']) if 'html' in resultado else 0,
+                'linhas': len(resultado.get('linhas', []))
             })
         else:
             scraper_instance.close()
@@ -1475,6 +1600,29 @@ def test_scrape_single(produto):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/browser-pool')
+def browser_pool_status():
+    """Estado do pool de navegadores aquecidos (hits, misses, ociosos...)"""
+    if browser_pool is None:
+        return jsonify({'ativo': False})
+    return jsonify({'ativo': True, **browser_pool.to_dict()})
+
+@app.route('/api/estrategias-cor', methods=['GET', 'DELETE'])
+def estrategias_cor_status():
+    """Taxas de acerto e ordem aprendida das estratégias de cor por produto; DELETE esquece o histórico"""
+    estrategias = get_estrategias_cor()
+    if request.method == 'DELETE':
+        estrategias.clear()
+        return jsonify({'success': True, 'message': 'Histórico das estratégias de cor apagado'})
+    return jsonify({'ativo': get_cor_aprendida(), 'produtos': estrategias.to_dict()})
+
+@app.route('/api/browser-pool/warmup', methods=['POST'])
+def browser_pool_warmup():
+    """Aquece o pool em segundo plano até DGB_POOL_SIZE navegadores"""
+    pool = get_browser_pool()
+    pool.warm_up_async()
+    return jsonify({'success': True, 'message': f'Aquecendo até {pool.tamanho} navegador(es)'})
+
 if __name__ == '__main__':
     # Verificar variáveis de ambiente
     required_vars = ['DGB_USUARIO', 'DGB_SENHA', 'DGB_URL_LOGIN', 'DGB_URL_ESTOQUE']
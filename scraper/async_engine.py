@@ -0,0 +1,295 @@
+# async_engine.py - Motor assíncrono (asyncio + httpx) para pesquisas em paralelo no DGB
+import os
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from urllib.parse import urljoin, urlparse
+
+import httpx
+
+from metrics import LatencyHistogram
+from http_backend import (DGBHttpScraper, USER_AGENT, SessaoExpiradaError, encontrar_formulario_pesquisa,
+                          montar_payload_pesquisa, aplicar_resposta_parcial, contar_linhas_resultado,
+                          verificar_produto)
+from resilience import ERRO_SESSAO, ERRO_TIMEOUT, ERRO_PRODUTO_TROCADO, classificar_excecao
+
+logger = logging.getLogger(__name__)
+
+# Pesquisas simultâneas dividem a mesma view JSF; uma resposta com linhas de outro
+# produto é repetida até N vezes antes de virar erro (nunca vai para o CSV)
+TENTATIVAS_PRODUTO_TROCADO = 3
+
+def _get_int_env(nome, padrao):
+    try:
+        return max(1, int(os.getenv(nome, str(padrao))))
+    except ValueError:
+        return padrao
+
+class AsyncScrapingEngine:
+    """
+    Mantém dezenas de pesquisas em andamento sobre poucas conexões keep-alive.
+    A concorrência por host é limitada por semáforo e a parada via /api/stop
+    cancela imediatamente as requisições pendentes.
+    """
+
+    def __init__(self, status_dict, produtos, concorrencia=None, max_conexoes=None, timeout=None,
+                 ao_registrar=None, limitador=None, resiliencia=None, pipeline=None, gerar_csv=None):
+        self.status = status_dict
+        self.produtos = list(produtos)
+        self.ao_registrar = ao_registrar
+        self.limitador = limitador
+        self.resiliencia = resiliencia
+        self.pipeline = pipeline
+        # Parse + CSV sem pipeline (com cache de parse); padrão: create_csv_from_html
+        self.gerar_csv = gerar_csv
+        self.concorrencia = concorrencia or _get_int_env('DGB_ASYNC_CONCURRENCY', 16)
+        self.max_conexoes = max_conexoes or _get_int_env('DGB_ASYNC_CONNECTIONS', 4)
+        self.timeout = timeout or _get_int_env('DGB_ASYNC_TIMEOUT', 30)
+        self.latencias = LatencyHistogram()
+        # _registrar também é chamado pelas threads de escrita do pipeline
+        self._lock_registro = threading.Lock()
+        if pipeline:
+            pipeline.set_fetch_workers(self.concorrencia)
+        self.concluidos = 0
+        self.cancelado = False
+        self.inicio = time.monotonic()
+        self._semaforos = {}
+        self.scraper_http = None
+        self.cliente = None
+        self.formulario = None
+        self.url_post = None
+        # Incrementada a cada novo login; evita relogins repetidos por tarefas concorrentes
+        self.geracao_sessao = 0
+        self._lock_sessao = None
+
+    def run(self):
+        """Executa o motor (bloqueante) a partir da thread de scraping"""
+        try:
+            return asyncio.run(self._run())
+        finally:
+            if self.scraper_http:
+                self.scraper_http.close()
+
+    def _semaforo(self, url):
+        """Semáforo de concorrência por host"""
+        host = urlparse(url).netloc
+        if host not in self._semaforos:
+            self._semaforos[host] = asyncio.Semaphore(self.concorrencia)
+        return self._semaforos[host]
+
+    async def _run(self):
+        # Login e página de estoque via backend HTTP síncrono (usa o cache de sessão)
+        self.status['message'] = 'Realizando login...'
+        self.scraper_http = DGBHttpScraper(headless=True)
+        self.scraper_http.latencias = self.latencias
+        if not await asyncio.to_thread(self.scraper_http.ensure_session):
+            return False
+
+        if not self._carregar_formulario():
+            logger.error("Formulário de pesquisa não encontrado")
+            return False
+        self._lock_sessao = asyncio.Lock()
+
+        limites = httpx.Limits(max_connections=self.max_conexoes,
+                               max_keepalive_connections=self.max_conexoes)
+        # Tempo de espera por conexão livre não conta no timeout da requisição
+        timeout = httpx.Timeout(self.timeout, pool=None)
+
+        self.status['message'] = f'Iniciando consultas ({self.concorrencia} em paralelo, {self.max_conexoes} conexões)...'
+        logger.info(f"🚀 Motor assíncrono: {len(self.produtos)} produtos, "
+                    f"concorrência {self.concorrencia}, {self.max_conexoes} conexões")
+
+        async with httpx.AsyncClient(limits=limites, timeout=timeout, cookies=self.scraper_http.session.cookies,
+                                     headers={'User-Agent': USER_AGENT}) as cliente:
+            self.cliente = cliente
+            tarefas = [
+                asyncio.create_task(self._processar(produto))
+                for produto in self.produtos
+            ]
+            vigia = asyncio.create_task(self._vigiar_parada(tarefas))
+
+            await asyncio.gather(*tarefas, return_exceptions=True)
+            vigia.cancel()
+
+        if self.pipeline:
+            await asyncio.to_thread(self.pipeline.close)
+
+        self._publicar()
+        return True
+
+    async def _vigiar_parada(self, tarefas):
+        """Cancela todas as tarefas assim que scraping_status['running'] vira False"""
+        while True:
+            if not self.status['running']:
+                self.cancelado = True
+                pendentes = [t for t in tarefas if not t.done()]
+                logger.info(f"⏹️  Parada solicitada - cancelando {len(pendentes)} pesquisas")
+                for tarefa in pendentes:
+                    tarefa.cancel()
+                return
+            await asyncio.sleep(0.1)
+
+    def _carregar_formulario(self):
+        """Formulário de pesquisa e URL do POST a partir da página de estoque atual"""
+        formulario = encontrar_formulario_pesquisa(self.scraper_http.pagina_estoque)
+        if formulario is None or not formulario['botao']:
+            return False
+
+        url_base = self.scraper_http.url_pagina_estoque
+        self.formulario = formulario
+        self.url_post = urljoin(url_base, formulario['action'] or url_base)
+        return True
+
+    async def _processar(self, produto):
+        """Pesquisa um produto e cria o CSV pelo caminho existente (create_csv_from_html)"""
+        inicio = time.monotonic()
+        if self.resiliencia:
+            resultado = await self.resiliencia.pesquisar_async(
+                lambda: self._tentar(produto), self._recuperar, produto
+            )
+        else:
+            resultado, _ = await self._tentar(produto)
+
+        if self.limitador:
+            self.limitador.record(resultado)
+
+        if self.pipeline:
+            self.pipeline.observe_fetch(time.monotonic() - inicio)
+            await asyncio.to_thread(self.pipeline.submit, resultado, self._registrar)
+            return
+
+        if resultado['success']:
+            if self.gerar_csv:
+                csv_filename = await asyncio.to_thread(self.gerar_csv, resultado)
+            else:
+                csv_filename = await asyncio.to_thread(
+                    self.scraper_http.create_csv_from_html, resultado['html'], produto
+                )
+            if csv_filename:
+                resultado['csv_file'] = csv_filename
+                logger.info(f"✅ Produto {produto} processado - CSV criado")
+            else:
+                resultado['success'] = False
+                resultado['error'] = 'Não foi possível criar CSV'
+
+        self._registrar(resultado)
+
+    async def _tentar(self, produto):
+        """Uma tentativa de pesquisa; retorna (resultado, geração da sessão usada)"""
+        geracao = self.geracao_sessao
+        async with self._semaforo(self.url_post):
+            self.status['current'] = produto
+            for tentativa in range(1, TENTATIVAS_PRODUTO_TROCADO + 1):
+                # O semáforo limita o máximo em andamento; o limitador adaptativo, o ritmo de cada POST
+                # (token retirado na hora do envio, com a taxa e o recuo atuais)
+                if self.limitador:
+                    await self.limitador.acquire_async()
+                resultado = await self._buscar(produto)
+                if resultado.get('tipo_erro') != ERRO_PRODUTO_TROCADO:
+                    break
+                logger.warning(f"🔀 Resposta de outro produto na pesquisa de {produto} "
+                               f"(tentativa {tentativa}/{TENTATIVAS_PRODUTO_TROCADO})")
+        return resultado, geracao
+
+    async def _recuperar(self, tipo_erro, geracao):
+        """Sessão expirada: um único novo login, compartilhado por todas as tarefas"""
+        if tipo_erro != ERRO_SESSAO:
+            return False
+
+        async with self._lock_sessao:
+            if geracao != self.geracao_sessao:
+                return True  # outra tarefa já renovou a sessão
+
+            logger.info("🔑 Sessão expirada - refazendo login")
+            self.scraper_http.sessao_cache.discard()
+            if not await asyncio.to_thread(self.scraper_http.ensure_session) or not self._carregar_formulario():
+                return False
+
+            self.cliente.cookies = self.scraper_http.session.cookies
+            self.geracao_sessao += 1
+            return True
+
+    async def _buscar(self, produto):
+        """Envia o POST parcial da pesquisa e monta o HTML final"""
+        try:
+            payload = montar_payload_pesquisa(self.formulario, produto)
+            inicio = time.monotonic()
+            resposta = await self.cliente.post(
+                self.url_post,
+                data=payload,
+                headers={
+                    'Faces-Request': 'partial/ajax',
+                    'X-Requested-With': 'XMLHttpRequest',
+                    'Referer': self.scraper_http.url_pagina_estoque
+                }
+            )
+            resposta.raise_for_status()
+            latencia = time.monotonic() - inicio
+            self.latencias.observe(latencia)
+
+            if '<partial-response' in resposta.text[:500]:
+                html = await asyncio.to_thread(aplicar_resposta_parcial,
+                                               self.scraper_http.pagina_estoque, resposta.text)
+            else:
+                html = resposta.text
+                if 'id="senha"' in html:
+                    raise SessaoExpiradaError("Sessão expirada - página de login retornada")
+
+            # Mesma view JSF para todas as pesquisas em andamento: as linhas têm de ser deste produto
+            verificar_produto(html, produto)
+
+            linhas = contar_linhas_resultado(html)
+            return {
+                'success': True,
+                'codigo': produto,
+                'html': html,
+                'estado': 'resultados' if linhas else 'sem_resultados',
+                'latencia': round(latencia, 3),
+                'timestamp': datetime.now().isoformat()
+            }
+
+        except httpx.TimeoutException:
+            logger.error(f"Timeout ao pesquisar produto {produto}")
+            return {'success': False, 'codigo': produto, 'error': f'Timeout após {self.timeout}s',
+                    'tipo_erro': ERRO_TIMEOUT}
+        except Exception as e:
+            logger.error(f"Erro ao pesquisar produto {produto}: {e}")
+            return {'success': False, 'codigo': produto, 'error': str(e), 'tipo_erro': classificar_excecao(e)}
+
+    def _registrar(self, resultado):
+        """Registra o resultado em status_dict (no loop ou na thread de escrita do pipeline)"""
+        with self._lock_registro:
+            self.concluidos += 1
+            if self.ao_registrar:
+                self.ao_registrar(resultado)
+            self.status['results'].append(resultado)
+            if resultado.get('csv_file'):
+                self.status['csv_files'].append(resultado['csv_file'])
+            total = self.status.get('total') or len(self.produtos)
+            feitos = len(self.status['results'])
+            self.status['progress'] = int((feitos / total) * 100) if total else 100
+            self.status['message'] = f"Processando {resultado.get('codigo')} ({feitos}/{total})"
+            self._publicar()
+
+    def _publicar(self):
+        decorrido = max(time.monotonic() - self.inicio, 1e-6)
+        self.status['throughput'] = {
+            'concorrencia': self.concorrencia,
+            'conexoes': self.max_conexoes,
+            'concluidos': self.concluidos,
+            'produtos_por_minuto': round(self.concluidos * 60 / decorrido, 2),
+            'atualizado_em': datetime.now().isoformat()
+        }
+        self.status['latencia'] = self.latencias.to_dict()
+        if self.limitador:
+            self.status['rate_limiter'] = self.limitador.snapshot()
+        if self.resiliencia:
+            self.status['resiliencia'] = self.resiliencia.to_dict()
+
+    def log_resumo(self):
+        """Escreve a vazão do motor no log"""
+        logger.info(f"⚡ Vazão total: {self.status.get('throughput', {}).get('produtos_por_minuto')} prod/min "
+                    f"(concorrência {self.concorrencia}, {self.max_conexoes} conexões)"
+                    f"{' - interrompido' if self.cancelado else ''}")
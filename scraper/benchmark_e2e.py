@@ -0,0 +1,196 @@
+# benchmark_e2e.py - Vazão ponta a ponta de run_scraping_thread contra o DGB falso (sem tocar o ERP)
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+import psutil
+
+from fake_dgb_server import FakeDGBServer, carregar_capturas, PASTA_CAPTURAS
+from scraper import BACKENDS, run_scraping_thread
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FOLDER = 'benchmarks'
+
+def rss_processo():
+    """RSS (bytes) deste processo somado ao dos filhos (chromedriver/Chrome no backend selenium)"""
+    processo = psutil.Process()
+    total = 0
+    for p in [processo] + processo.children(recursive=True):
+        try:
+            total += p.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+class AmostradorRSS:
+    """Registra o pico de RSS em segundo plano enquanto a execução roda"""
+
+    def __init__(self, intervalo=0.1):
+        self.intervalo = intervalo
+        self.pico = rss_processo()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='rss', daemon=True)
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, rss_processo())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+        self.pico = max(self.pico, rss_processo())
+
+def status_inicial():
+    """Mesmo formato de scraping_status do app"""
+    return {
+        'running': True,
+        'progress': 0,
+        'total': 0,
+        'current': '',
+        'message': 'Iniciando...',
+        'results': [],
+        'csv_files': [],
+        'latencia': {},
+        'workers': {},
+        'throughput': {},
+        'backend': None,
+        'journal': None,
+        'rate_limiter': {},
+        'resiliencia': {},
+        'pipeline': {},
+        'start_time': datetime.now().isoformat(),
+        'end_time': None
+    }
+
+def medir_backend(backend, produtos, num_workers=None):
+    """
+    Executa run_scraping_thread numa pasta temporária (csv/, debug/, journal/ e cache/
+    isolados) e retorna as medições da execução.
+    """
+    pasta_original = os.getcwd()
+    pasta = tempfile.mkdtemp(prefix=f'benchmark_{backend}_')
+    status = status_inicial()
+    logger.info(f"\n{'='*60}\nBackend {backend}: {len(produtos)} produtos\n{'='*60}")
+
+    try:
+        os.chdir(pasta)
+        with open('produtos.txt', 'w') as f:
+            f.write(','.join(produtos))
+
+        with AmostradorRSS() as amostrador:
+            inicio = time.monotonic()
+            run_scraping_thread(status, num_workers, backend)
+            duracao = time.monotonic() - inicio
+    finally:
+        os.chdir(pasta_original)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    sucessos = sum(1 for r in status['results'] if r.get('success'))
+    latencia = status.get('latencia') or {}
+    return {
+        'backend': backend,
+        'produtos': len(produtos),
+        'sucessos': sucessos,
+        'erros': len(status['results']) - sucessos,
+        'duracao_s': round(duracao, 2),
+        'produtos_por_minuto': round(sucessos * 60 / duracao, 1) if duracao else 0.0,
+        'latencia_p50_s': latencia.get('p50_s', 0.0),
+        'latencia_p95_s': latencia.get('p95_s', 0.0),
+        'rss_pico_mb': round(amostrador.pico / (1024 * 1024), 1),
+        'mensagem': status.get('message'),
+        'resiliencia': status.get('resiliencia'),
+        'pipeline': status.get('pipeline')
+    }
+
+def montar_produtos(capturados, quantidade):
+    """Repete os produtos capturados até a quantidade pedida"""
+    if not quantidade:
+        return list(capturados)
+    return [capturados[i % len(capturados)] for i in range(quantidade)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ponta a ponta contra o servidor DGB falso')
+    parser.add_argument('--backends', default='http,async',
+                        help=f"Lista separada por vírgula entre {', '.join(BACKENDS)} (selenium exige Chrome)")
+    parser.add_argument('--quantidade', type=int, default=0,
+                        help='Quantidade de pesquisas (repete os produtos capturados; 0 = um de cada)')
+    parser.add_argument('--workers', type=int, default=None, help='Navegadores/sessões em paralelo')
+    parser.add_argument('--capturas', default=PASTA_CAPTURAS, help='Pasta com debug_produto_*.html')
+    parser.add_argument('--latencia', type=float, default=0.3, help='Atraso do servidor por resposta (s)')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Variação uniforme do atraso (s)')
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help='Fração de pesquisas com HTTP 500')
+    parser.add_argument('--taxa-expiracao', type=float, default=0.0, help='Fração de pesquisas com sessão expirada')
+    parser.add_argument('--taxa-lenta', type=float, default=0.0, help='Fração de pesquisas muito lentas')
+    parser.add_argument('--atraso-lento', type=float, default=20.0, help='Atraso das pesquisas lentas (s)')
+    parser.add_argument('--semente', type=int, default=42, help='Semente da injeção de falhas')
+    parser.add_argument('--parse-cache', action='store_true',
+                        help='Manter o cache de parse ligado (padrão: desligado, toda pesquisa é parseada)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    backends = [b.strip().lower() for b in args.backends.split(',') if b.strip()]
+    invalidos = [b for b in backends if b not in BACKENDS]
+    if invalidos or not backends:
+        print(f"❌ Backend inválido: {', '.join(invalidos) or '(nenhum)'}")
+        return 1
+
+    capturas = carregar_capturas(args.capturas)
+    servidor = FakeDGBServer(
+        capturas, latencia=args.latencia, jitter=args.jitter, taxa_erro=args.taxa_erro,
+        taxa_expiracao=args.taxa_expiracao, taxa_lenta=args.taxa_lenta, atraso_lento=args.atraso_lento,
+        semente=args.semente
+    ).start()
+
+    # Os scrapers leem URLs e credenciais do ambiente
+    os.environ.update(servidor.env())
+    if not args.parse_cache:
+        os.environ['DGB_PARSE_CACHE'] = '0'
+
+    produtos = montar_produtos(sorted(capturas), args.quantidade)
+    resultados = []
+    try:
+        for backend in backends:
+            resultados.append(medir_backend(backend, produtos, args.workers))
+    finally:
+        servidor.stop()
+
+    relatorio = {
+        'timestamp': datetime.now().isoformat(),
+        'servidor': {
+            'latencia_s': args.latencia,
+            'jitter_s': args.jitter,
+            'taxa_erro': args.taxa_erro,
+            'taxa_expiracao': args.taxa_expiracao,
+            'taxa_lenta': args.taxa_lenta,
+            'contadores': servidor.to_dict()
+        },
+        'resultados': resultados
+    }
+
+    os.makedirs(BENCHMARK_FOLDER, exist_ok=True)
+    caminho = os.path.join(BENCHMARK_FOLDER, f"e2e_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'Backend':<10}{'OK/total':>10}{'Prod/min':>10}{'p50 (s)':>10}{'p95 (s)':>10}{'RSS pico (MB)':>15}")
+    for r in resultados:
+        print(f"{r['backend']:<10}{r['sucessos']:>5}/{r['produtos']:<4}{r['produtos_por_minuto']:>10}"
+              f"{r['latencia_p50_s']:>10.3f}{r['latencia_p95_s']:>10.3f}{r['rss_pico_mb']:>15}")
+    print(f"\n📄 Relatório salvo em {caminho}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# benchmark_numeros.py - Conversão de números brasileiros célula a célula (.apply/.map) x em lote (numeros_br)
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from numeros_br import centavos_de_texto, formatar_centavos, centavos_de_textos, textos_de_centavos
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FOLDER = 'benchmarks'
+
+# Células fora do formato canônico, que passam pelo caminho por célula
+CELULAS_ESPECIAIS = ['', ' 12,5', '+3,00', '1,234', 'N/A', '-', ',5', '12,', '0,999', None]
+
+def gerar_celulas(quantidade, semente=0):
+    """Textos como os dos CSVs (estoques de 0 a 10 milhões, alguns negativos) e 1 em mil fora do padrão"""
+    rng = np.random.default_rng(semente)
+    centavos = rng.integers(-10**7, 10**9, quantidade)
+    centavos[rng.random(quantidade) < 0.3] = 0
+    celulas = [formatar_centavos(c) for c in centavos.tolist()]
+    for i, posicao in enumerate(range(0, quantidade, 1000)):
+        celulas[posicao] = CELULAS_ESPECIAIS[i % len(CELULAS_ESPECIAIS)]
+    return pd.Series(celulas, dtype=object)
+
+def cronometrar(funcao, repeticoes):
+    """(melhor tempo em s, resultado da última execução)"""
+    melhor, resultado = None, None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return melhor, resultado
+
+def medir(celulas, repeticoes):
+    """Leitura, soma e formatação das células pelos dois caminhos, com a conferência dos resultados"""
+    n = len(celulas)
+
+    por_celula_s, esperado = cronometrar(lambda: celulas.apply(lambda v: centavos_de_texto(v) or 0), repeticoes)
+    lote_s, obtido = cronometrar(lambda: centavos_de_textos(celulas), repeticoes)
+    leitura_igual = bool((esperado.to_numpy() == obtido.to_numpy()).all())
+
+    # Soma no estilo de estoque/consolidator: gerador Python sobre a coluna
+    soma_gerador_s, soma_esperada = cronometrar(lambda: sum((centavos_de_texto(v) or 0) for v in celulas), repeticoes)
+    soma_lote_s, soma_obtida = cronometrar(lambda: int(centavos_de_textos(celulas).sum()), repeticoes)
+
+    formatar_celula_s, textos_esperados = cronometrar(lambda: obtido.map(formatar_centavos), repeticoes)
+    formatar_lote_s, textos_obtidos = cronometrar(lambda: textos_de_centavos(obtido), repeticoes)
+    formatacao_igual = textos_esperados.tolist() == textos_obtidos.tolist()
+
+    def etapa(antes, depois):
+        return {
+            'por_celula_s': round(antes, 3),
+            'lote_s': round(depois, 3),
+            'celulas_por_s_lote': int(n / depois) if depois else None,
+            'aceleracao': round(antes / depois, 2) if depois else None
+        }
+
+    return {
+        'leitura': dict(etapa(por_celula_s, lote_s), igual=leitura_igual),
+        'soma': dict(etapa(soma_gerador_s, soma_lote_s), igual=soma_esperada == soma_obtida),
+        'formatacao': dict(etapa(formatar_celula_s, formatar_lote_s), igual=formatacao_igual)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da conversão de números brasileiros em lote')
+    parser.add_argument('--celulas', type=int, default=1_000_000, help='Quantidade de células')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Execuções de cada caminho (vale a melhor)')
+    parser.add_argument('--semente', type=int, default=0, help='Semente dos valores gerados')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    celulas = gerar_celulas(args.celulas, args.semente)
+    resultado = medir(celulas, args.repeticoes)
+
+    relatorio = {
+        'timestamp': datetime.now().isoformat(),
+        'celulas': args.celulas,
+        'repeticoes': args.repeticoes,
+        **resultado
+    }
+    os.makedirs(BENCHMARK_FOLDER, exist_ok=True)
+    caminho = os.path.join(BENCHMARK_FOLDER, f"numeros_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"🔢 {args.celulas:,} células".replace(',', '.'))
+    print(f"\n{'Etapa':<12}{'Por célula (s)':>16}{'Em lote (s)':>14}{'Aceleração':>12}{'Igual':>8}")
+    divergentes = []
+    for etapa in ('leitura', 'soma', 'formatacao'):
+        dados = resultado[etapa]
+        print(f"{etapa:<12}{dados['por_celula_s']:>16}{dados['lote_s']:>14}{dados['aceleracao']:>11}x"
+              f"{'✅' if dados['igual'] else '❌':>8}")
+        if not dados['igual']:
+            divergentes.append(etapa)
+    print(f"\n💾 {caminho}")
+
+    if divergentes:
+        print(f"❌ Resultados diferentes em: {', '.join(divergentes)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+# benchmark_parser.py - Equivalência e velocidade do parser: motores (lxml x BeautifulSoup), extração por linha e streaming
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+import parser_dgb
+import estrategias_cor
+from html_archive import HtmlArchive, PADRAO_LEGADO, ARCHIVE_FOLDER
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FOLDER = 'benchmarks'
+
+PASTAS_PADRAO = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scraper-dgb', 'debug'),
+    'debug'
+]
+
+# Timestamp fixo: os registros dos dois motores devem ser idênticos byte a byte
+TIMESTAMP_FIXO = '2000-01-01 00:00:00'
+
+# Linha de cor sem a barra "situação / cor": o método direto falha em todas as linhas
+PADRAO_BARRA_COR = re.compile(r'(<div class="mt-10"><b>\d+</b>[^<]*?) / ')
+
+def carregar_paginas(pastas, archive=ARCHIVE_FOLDER):
+    """[(nome, produto, html)] das capturas soltas (debug_produto_*.html) e do arquivo comprimido"""
+    paginas = []
+    for pasta in pastas:
+        if not os.path.isdir(pasta):
+            continue
+        for nome in sorted(os.listdir(pasta)):
+            match = PADRAO_LEGADO.match(nome)
+            if match:
+                with open(os.path.join(pasta, nome), 'r', encoding='utf-8') as f:
+                    paginas.append((nome, match.group(1), f.read()))
+
+    if archive and os.path.exists(archive):
+        arquivo = HtmlArchive(archive)
+        vistos = set()
+        for entrada in arquivo.entries():
+            if entrada['hash'] in vistos:
+                continue
+            vistos.add(entrada['hash'])
+            html = arquivo.get(entrada['hash'])
+            if html is not None:
+                paginas.append((f"archive:{entrada['hash'][:12]}", entrada['produto'], html))
+    return paginas
+
+def verificar_equivalencia(paginas):
+    """Nomes das páginas em que lxml e BeautifulSoup geram registros diferentes"""
+    diferentes = []
+    for nome, produto, html in paginas:
+        rapido = parser_dgb.parse_html_dgb_simples(html, produto, TIMESTAMP_FIXO, parser_dgb.MOTOR_LXML)
+        referencia = parser_dgb.parse_html_bs4(html, produto, TIMESTAMP_FIXO)
+        if rapido != referencia:
+            diferentes.append(nome)
+    return diferentes
+
+def medir_motor(motor, paginas, repeticoes):
+    """Segundos totais e por página para parsear todas as páginas `repeticoes` vezes"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for _, produto, html in paginas:
+            parser_dgb.parse_html_dgb_simples(html, produto, TIMESTAMP_FIXO, motor)
+    total = time.perf_counter() - inicio
+    return {
+        'motor': motor,
+        'total_s': round(total, 3),
+        'ms_por_pagina': round(total * 1000 / (len(paginas) * repeticoes), 2)
+    }
+
+def registros_multipassada(registro, artigo, timestamp):
+    """Extração por linha anterior: cada função refaz find/find_all/get_text sobre o tr.registro"""
+    nome_produto = parser_dgb.extrair_nome_produto_formatado(registro)
+    descricao_cor = parser_dgb.extrair_cor_direto(registro)
+    if not descricao_cor:
+        descricao_cor = parser_dgb.extrair_cor_alternativo(registro)
+    if not descricao_cor:
+        descricao_cor = parser_dgb.cor_do_texto_completo(registro.get_text(strip=True))
+    dados = parser_dgb.extrair_dados_da_linha(registro)
+    return parser_dgb.montar_registros(artigo, timestamp, nome_produto, descricao_cor, dados)
+
+def registros_passada_unica(registro, artigo, timestamp):
+    """Extração por linha atual: uma visita à subárvore (parser_dgb.extrair_linha_bs4)"""
+    return parser_dgb.registros_da_linha(parser_dgb.extrair_linha_bs4(registro), artigo, timestamp)
+
+def medir_linhas(paginas, repeticoes):
+    """
+    Linhas/s da extração por tr.registro, antes e depois da passada única.
+    As árvores são montadas antes da medição: só a extração das linhas é cronometrada.
+    """
+    linhas = []
+    for _, produto, html in paginas:
+        artigo = str(produto).lstrip('0')
+        soup = BeautifulSoup(html, 'html.parser')
+        linhas.extend((registro, artigo) for registro in soup.find_all('tr', class_='registro'))
+
+    divergentes = sum(
+        1 for registro, artigo in linhas
+        if registros_multipassada(registro, artigo, TIMESTAMP_FIXO) != registros_passada_unica(registro, artigo, TIMESTAMP_FIXO)
+    )
+
+    resultado = {'linhas': len(linhas), 'divergentes': divergentes}
+    for nome, funcao in (('antes', registros_multipassada), ('depois', registros_passada_unica)):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            for registro, artigo in linhas:
+                funcao(registro, artigo, TIMESTAMP_FIXO)
+        total = time.perf_counter() - inicio
+        resultado[f'{nome}_linhas_por_s'] = round(len(linhas) * repeticoes / total, 1) if total else 0.0
+    return resultado
+
+def medir_recorte(paginas, repeticoes):
+    """
+    Tempo e pico de memória (tracemalloc) por página de cada motor,
+    parseando a página inteira x só a região de resultados.
+    """
+    extratores = {
+        parser_dgb.MOTOR_BS4: parser_dgb.extrair_linhas_bs4,
+        parser_dgb.MOTOR_LXML: parser_dgb.extrair_linhas_lxml
+    }
+    resultado = {}
+    for motor, extrair in extratores.items():
+        for recortar in (False, True):
+            chave = f"{motor}_{'recortado' if recortar else 'completo'}"
+
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                for _, _, html in paginas:
+                    extrair(html, recortar)
+            total = time.perf_counter() - inicio
+
+            picos = []
+            for _, _, html in paginas:
+                tracemalloc.start()
+                extrair(html, recortar)
+                picos.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+
+            resultado[chave] = {
+                'ms_por_pagina': round(total * 1000 / (len(paginas) * repeticoes), 2),
+                'pico_kb_medio': round(sum(picos) / len(picos) / 1024, 1)
+            }
+
+    tamanho_total = sum(len(html) for _, _, html in paginas)
+    tamanho_regiao = 0
+    for _, _, html in paginas:
+        regiao = parser_dgb.recortar_resultados(html)
+        if regiao:
+            tamanho_regiao += regiao[1] - regiao[0]
+    resultado['fracao_html_parseada'] = round(tamanho_regiao / tamanho_total, 3) if tamanho_total else 0.0
+    return resultado
+
+def medir_streaming(paginas, repeticoes):
+    """
+    Lista completa (parse_html_dgb_simples) x gerador (iterar_registros_html) consumido
+    registro a registro: divergências, tempo e pico de memória (tracemalloc) por página.
+    """
+    def lista(html, produto):
+        for _ in parser_dgb.parse_html_dgb_simples(html, produto, TIMESTAMP_FIXO):
+            pass
+
+    def gerador(html, produto):
+        for _ in parser_dgb.iterar_registros_html(html, produto, TIMESTAMP_FIXO):
+            pass
+
+    divergentes = [
+        nome for nome, produto, html in paginas
+        if list(parser_dgb.iterar_registros_html(html, produto, TIMESTAMP_FIXO))
+        != parser_dgb.parse_html_bs4(html, produto, TIMESTAMP_FIXO)
+    ]
+
+    resultado = {'divergentes': divergentes}
+    for chave, consumir in (('lista', lista), ('streaming', gerador)):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            for _, produto, html in paginas:
+                consumir(html, produto)
+        total = time.perf_counter() - inicio
+
+        picos = []
+        for _, produto, html in paginas:
+            tracemalloc.start()
+            consumir(html, produto)
+            picos.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        resultado[chave] = {
+            'ms_por_pagina': round(total * 1000 / (len(paginas) * repeticoes), 2),
+            'pico_kb_medio': round(sum(picos) / len(picos) / 1024, 1)
+        }
+    return resultado
+
+def sem_barra_na_cor(paginas):
+    """Variante das páginas em que a cor só sai pelas estratégias de recurso"""
+    return [(nome, produto, PADRAO_BARRA_COR.sub(r'\1 - ', html)) for nome, produto, html in paginas]
+
+def medir_estrategias_cor(paginas, repeticoes):
+    """
+    Cadeia fixa (direto, alternativo, texto) x ordem aprendida por produto, no layout
+    real e numa variante em que o método direto sempre falha: divergências, ms/página,
+    estratégias tentadas por linha e a ordem aprendida (taxas num arquivo temporário).
+    Também mede as linhas do lxml com os campos de recurso sempre lidos x sob demanda.
+    """
+    def parsear_tudo(lote):
+        return [parser_dgb.parse_html_dgb_simples(html, produto, TIMESTAMP_FIXO, parser_dgb.MOTOR_LXML)
+                for _, produto, html in lote]
+
+    def cronometrar(lote):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            parsear_tudo(lote)
+        return round((time.perf_counter() - inicio) * 1000 / (len(lote) * repeticoes), 2)
+
+    def tentadas_por_linha(lote):
+        """Chamadas de estratégia por linha numa passada (contadas fora da cronometragem)"""
+        originais = dict(parser_dgb.ESTRATEGIAS_COR)
+        chamadas = [0]
+
+        def contar(funcao):
+            def contada(linha, divs):
+                chamadas[0] += 1
+                return funcao(linha, divs)
+            return contada
+
+        linhas = sum(len(parser_dgb.extrair_linhas_lxml(html)) for _, _, html in lote)
+        parser_dgb.ESTRATEGIAS_COR.update({nome: contar(f) for nome, f in originais.items()})
+        try:
+            parsear_tudo(lote)
+        finally:
+            parser_dgb.ESTRATEGIAS_COR.update(originais)
+        return round(chamadas[0] / linhas, 2) if linhas else 0.0
+
+    resultado = {}
+    ambiente = os.environ.get('DGB_COR_APRENDIDA')
+    anterior = estrategias_cor.set_estrategias_cor(None)
+    try:
+        with tempfile.TemporaryDirectory() as pasta:
+            for layout, lote in (('original', paginas), ('sem_barra', sem_barra_na_cor(paginas))):
+                os.environ['DGB_COR_APRENDIDA'] = '0'
+                esperado = parsear_tudo(lote)
+                fixa = {'ms': cronometrar(lote), 'por_linha': tentadas_por_linha(lote)}
+
+                os.environ['DGB_COR_APRENDIDA'] = '1'
+                estrategias = estrategias_cor.EstrategiasCor(os.path.join(pasta, f"{layout}.json"))
+                estrategias_cor.set_estrategias_cor(estrategias)
+                obtido = parsear_tudo(lote)    # primeira passada: aprende a ordem
+                aprendida = {'ms': cronometrar(lote), 'por_linha': tentadas_por_linha(lote)}
+                geral = estrategias.to_dict().get(estrategias_cor.CHAVE_GERAL, {})
+
+                resultado[layout] = {
+                    'divergentes': [nome for (nome, _, _), a, b in zip(lote, esperado, obtido) if a != b],
+                    'cadeia_fixa_ms_por_pagina': fixa['ms'],
+                    'aprendida_ms_por_pagina': aprendida['ms'],
+                    'cadeia_fixa_estrategias_por_linha': fixa['por_linha'],
+                    'aprendida_estrategias_por_linha': aprendida['por_linha'],
+                    'ordem': geral.get('ordem', list(estrategias_cor.ESTRATEGIAS)),
+                    'taxas': geral.get('taxas', {})
+                }
+    finally:
+        if ambiente is None:
+            os.environ.pop('DGB_COR_APRENDIDA', None)
+        else:
+            os.environ['DGB_COR_APRENDIDA'] = ambiente
+        estrategias_cor.set_estrategias_cor(anterior)
+
+    for chave, forcar in (('linhas_lxml_todos_campos_ms', True), ('linhas_lxml_sob_demanda_ms', False)):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            for _, _, html in paginas:
+                for linha in parser_dgb.extrair_linhas_lxml(html):
+                    if forcar:
+                        linha['texto'], linha['negritos_cor']
+        resultado[chave] = round((time.perf_counter() - inicio) * 1000 / (len(paginas) * repeticoes), 2)
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description='Equivalência e benchmark dos motores do parser DGB')
+    parser.add_argument('--pastas', nargs='*', default=PASTAS_PADRAO, help='Pastas com debug_produto_*.html')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Quantas vezes parsear cada página')
+    parser.add_argument('--so-equivalencia', action='store_true', help='Só verificar a equivalência')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    # O parser registra cada página em INFO; no benchmark só interessa o resultado
+    logging.getLogger('parser_dgb').setLevel(logging.WARNING)
+
+    if parser_dgb.get_motor_parser(parser_dgb.MOTOR_LXML) != parser_dgb.MOTOR_LXML:
+        print("❌ lxml não está instalado")
+        return 1
+
+    paginas = carregar_paginas(args.pastas)
+    if not paginas:
+        print("❌ Nenhuma captura HTML encontrada")
+        return 1
+
+    diferentes = verificar_equivalencia(paginas)
+    print(f"🔎 Equivalência: {len(paginas) - len(diferentes)}/{len(paginas)} páginas idênticas")
+    for nome in diferentes:
+        print(f"   ❌ {nome}")
+    if args.so_equivalencia:
+        return 1 if diferentes else 0
+
+    bs4 = medir_motor(parser_dgb.MOTOR_BS4, paginas, args.repeticoes)
+    lxml = medir_motor(parser_dgb.MOTOR_LXML, paginas, args.repeticoes)
+    aceleracao = round(bs4['total_s'] / lxml['total_s'], 2) if lxml['total_s'] else None
+    linhas = medir_linhas(paginas, args.repeticoes)
+    recorte = medir_recorte(paginas, args.repeticoes)
+    streaming = medir_streaming(paginas, args.repeticoes)
+    cores = medir_estrategias_cor(paginas, args.repeticoes)
+
+    relatorio = {
+        'timestamp': datetime.now().isoformat(),
+        'paginas': len(paginas),
+        'repeticoes': args.repeticoes,
+        'diferentes': diferentes,
+        'bs4': bs4,
+        'lxml': lxml,
+        'aceleracao': aceleracao,
+        'extracao_linhas': linhas,
+        'recorte': recorte,
+        'streaming': streaming,
+        'estrategias_cor': cores
+    }
+    os.makedirs(BENCHMARK_FOLDER, exist_ok=True)
+    caminho = os.path.join(BENCHMARK_FOLDER, f"parser_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'Motor':<8}{'Total (s)':>12}{'ms/página':>12}")
+    for r in (bs4, lxml):
+        print(f"{r['motor']:<8}{r['total_s']:>12}{r['ms_por_pagina']:>12}")
+    print(f"\n⚡ lxml {aceleracao}x mais rápido")
+    print(f"\n📏 Extração por tr.registro ({linhas['linhas']} linhas, {linhas['divergentes']} divergentes)")
+    print(f"   antes (várias passadas): {linhas['antes_linhas_por_s']} linhas/s")
+    print(f"   depois (passada única):  {linhas['depois_linhas_por_s']} linhas/s")
+    print(f"\n✂️  Só a região de resultados ({recorte['fracao_html_parseada'] * 100:.0f}% do HTML)")
+    print(f"   {'Extração':<18}{'ms/página':>12}{'pico KB (Python)':>18}")
+    for chave, dados in recorte.items():
+        if isinstance(dados, dict):
+            print(f"   {chave:<18}{dados['ms_por_pagina']:>12}{dados['pico_kb_medio']:>18}")
+    print(f"\n🌊 Gerador x lista ({len(streaming['divergentes'])} páginas divergentes)")
+    print(f"   {'Consumo':<18}{'ms/página':>12}{'pico KB (Python)':>18}")
+    for chave in ('lista', 'streaming'):
+        print(f"   {chave:<18}{streaming[chave]['ms_por_pagina']:>12}{streaming[chave]['pico_kb_medio']:>18}")
+    print(f"\n🎨 Estratégias de cor: cadeia fixa x ordem aprendida")
+    print(f"   {'Layout':<12}{'ms/pág fixa':>13}{'aprendida':>11}{'tentadas/linha':>18}  ordem aprendida")
+    for layout in ('original', 'sem_barra'):
+        dados = cores[layout]
+        tentadas = f"{dados['cadeia_fixa_estrategias_por_linha']} -> {dados['aprendida_estrategias_por_linha']}"
+        aviso = f"  ❌ {len(dados['divergentes'])} divergentes" if dados['divergentes'] else ''
+        print(f"   {layout:<12}{dados['cadeia_fixa_ms_por_pagina']:>13}{dados['aprendida_ms_por_pagina']:>11}"
+              f"{tentadas:>18}  {' > '.join(dados['ordem'])}{aviso}")
+    print(f"   linhas lxml: {cores['linhas_lxml_todos_campos_ms']} ms/pág com todos os campos, "
+          f"{cores['linhas_lxml_sob_demanda_ms']} sob demanda")
+    print(f"📄 Relatório salvo em {caminho}")
+    divergencias_cor = cores['original']['divergentes'] or cores['sem_barra']['divergentes']
+    return 1 if diferentes or linhas['divergentes'] or streaming['divergentes'] or divergencias_cor else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+# benchmark_regressao.py - Regressão do parser: saída igual aos CSVs de referência (golden) e vazão mínima
+import os
+import csv
+import sys
+import json
+import time
+import logging
+import argparse
+import tracemalloc
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+import parser_dgb
+from html_archive import PADRAO_LEGADO
+from registros import COLUNAS_CSV, linha_csv
+from benchmark_parser import TIMESTAMP_FIXO
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FOLDER = 'benchmarks'
+
+PASTA_RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scraper-dgb')
+PASTA_CORPUS = os.path.join(PASTA_RAIZ, 'debug')
+PASTA_GOLDEN = os.path.join(PASTA_RAIZ, 'golden')
+
+# Medições que servem de piso para as próximas execuções; versionadas junto dos CSVs
+# de referência (benchmarks/ fica fora do git). Regrave com --salvar-referencia
+ARQUIVO_REFERENCIA = os.path.join(PASTA_GOLDEN, 'referencia_regressao.json')
+
+# Páginas sintéticas: linhas de resultado repetidas N vezes
+FATORES_SINTETICOS = (10, 50)
+
+MOTORES = {
+    'lxml': lambda html, produto: parser_dgb.parse_html_dgb_simples(html, produto, TIMESTAMP_FIXO, parser_dgb.MOTOR_LXML),
+    'bs4': lambda html, produto: parser_dgb.parse_html_bs4(html, produto, TIMESTAMP_FIXO),
+    'streaming': lambda html, produto: list(parser_dgb.iterar_registros_html(html, produto, TIMESTAMP_FIXO))
+}
+
+def carregar_corpus(pasta=PASTA_CORPUS):
+    """[(nome, produto, html)] das capturas debug_produto_*.html, em ordem de nome"""
+    corpus = []
+    for nome in sorted(os.listdir(pasta)):
+        match = PADRAO_LEGADO.match(nome)
+        if match:
+            with open(os.path.join(pasta, nome), 'r', encoding='utf-8') as f:
+                corpus.append((nome, match.group(1), f.read()))
+    return corpus
+
+def caminho_golden(nome, pasta=PASTA_GOLDEN):
+    return os.path.join(pasta, f"{os.path.splitext(nome)[0]}.csv")
+
+def escrever_golden(caminho, registros):
+    """Mesmo formato de DGBScraper.write_csv, com o timestamp fixo"""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(COLUNAS_CSV)
+        for registro in registros:
+            writer.writerow(linha_csv(registro))
+
+def ler_golden(caminho):
+    with open(caminho, 'r', newline='', encoding='utf-8-sig') as f:
+        return list(csv.reader(f, delimiter=';'))[1:]
+
+def atualizar_golden(corpus, pasta=PASTA_GOLDEN):
+    """Regrava os CSVs de referência com a saída atual do parser principal"""
+    for nome, produto, html in corpus:
+        escrever_golden(caminho_golden(nome, pasta), MOTORES['lxml'](html, produto))
+    return len(corpus)
+
+def verificar_golden(corpus, pasta=PASTA_GOLDEN):
+    """Falhas (texto) de cada motor cuja saída difere do CSV de referência"""
+    falhas = []
+    for nome, produto, html in corpus:
+        caminho = caminho_golden(nome, pasta)
+        if not os.path.exists(caminho):
+            falhas.append(f"{nome}: sem CSV de referência (rode com --atualizar-golden)")
+            continue
+        esperado = ler_golden(caminho)
+
+        for motor, parsear in MOTORES.items():
+            obtido = [linha_csv(r) for r in parsear(html, produto)]
+            if obtido == esperado:
+                continue
+            if len(obtido) != len(esperado):
+                falhas.append(f"{nome} [{motor}]: {len(obtido)} registros, esperados {len(esperado)}")
+                continue
+            indice = next(i for i, (a, b) in enumerate(zip(obtido, esperado)) if a != b)
+            falhas.append(f"{nome} [{motor}]: linha {indice + 1} {obtido[indice]} != {esperado[indice]}")
+    return falhas
+
+def ampliar_pagina(html, fator):
+    """
+    (html, linhas) com as linhas tr.registro, exceto a última, repetidas `fator` vezes.
+    O trecho repetido vai do início da primeira ao início da última linha, então
+    só contém linhas completas. None se a página tiver menos de duas linhas.
+    """
+    inicios = [m.start() for m in parser_dgb.PADRAO_INICIO_LINHA.finditer(html)]
+    if len(inicios) < 2:
+        return None
+    bloco = html[inicios[0]:inicios[-1]]
+    return html[:inicios[0]] + bloco * fator + html[inicios[-1]:], (len(inicios) - 1) * fator + 1
+
+def paginas_sinteticas(corpus, fatores=FATORES_SINTETICOS):
+    """{fator: [(nome, produto, html, linhas)]} a partir de uma captura por produto"""
+    por_produto = {}
+    for nome, produto, html in corpus:
+        por_produto.setdefault(produto, (nome, html))
+
+    sinteticas = {}
+    for fator in fatores:
+        sinteticas[fator] = []
+        for produto, (nome, html) in sorted(por_produto.items()):
+            ampliada = ampliar_pagina(html, fator)
+            if ampliada:
+                sinteticas[fator].append((f"{nome}x{fator}", produto, *ampliada))
+    return sinteticas
+
+def verificar_sinteticas(sinteticas):
+    """Nas páginas ampliadas, todas as linhas devem ser lidas e os motores devem concordar"""
+    falhas = []
+    for paginas in sinteticas.values():
+        for nome, produto, html, linhas in paginas:
+            encontradas = len(parser_dgb.extrair_linhas_lxml(html))
+            if encontradas != linhas:
+                falhas.append(f"{nome}: {encontradas} linhas lidas, esperadas {linhas}")
+                continue
+            saidas = {motor: parsear(html, produto) for motor, parsear in MOTORES.items()}
+            referencia = saidas.pop('lxml')
+            for motor, saida in saidas.items():
+                if saida != referencia:
+                    falhas.append(f"{nome}: {motor} diverge do lxml")
+    return falhas
+
+def medir(funcao, entradas, linhas, repeticoes):
+    """
+    Melhor vazão (linhas/s) entre `repeticoes` passadas por todas as entradas e
+    maior pico de memória alocada (tracemalloc) ao processar uma entrada.
+    """
+    for entrada in entradas:
+        funcao(entrada)  # aquecimento
+
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for entrada in entradas:
+            funcao(entrada)
+        total = time.perf_counter() - inicio
+        melhor = total if melhor is None else min(melhor, total)
+
+    pico = 0
+    tracemalloc.start()
+    try:
+        for entrada in entradas:
+            tracemalloc.reset_peak()
+            antes = tracemalloc.get_traced_memory()[0]
+            funcao(entrada)
+            pico = max(pico, tracemalloc.get_traced_memory()[1] - antes)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'linhas': linhas,
+        'linhas_por_s': round(linhas / melhor, 1) if melhor else 0.0,
+        'pico_kb': round(pico / 1024, 1)
+    }
+
+def medir_funcoes(corpus, sinteticas, repeticoes):
+    """Vazão e alocações de parse_html_dgb_simples (real e ampliado), extrair_dados_da_linha e extrair_dados_do_texto"""
+    medicoes = {}
+
+    def parse_pagina(pagina):
+        parser_dgb.parse_html_dgb_simples(pagina[2], pagina[1], TIMESTAMP_FIXO)
+
+    linhas_corpus = sum(len(parser_dgb.extrair_linhas_lxml(html)) for _, _, html in corpus)
+    medicoes['parse_html_dgb_simples'] = medir(parse_pagina, corpus, linhas_corpus, repeticoes)
+
+    for fator, paginas in sinteticas.items():
+        if paginas:
+            medicoes[f'parse_html_dgb_simples_x{fator}'] = medir(
+                parse_pagina, paginas, sum(p[3] for p in paginas), repeticoes)
+
+    # As funções por linha recebem as entradas já prontas: só a extração é medida
+    elementos = []
+    textos = []
+    for _, _, html in corpus:
+        elementos.extend(BeautifulSoup(html, 'html.parser').find_all('tr', class_='registro'))
+        textos.extend(linha['texto_espacado'] for linha in parser_dgb.extrair_linhas_lxml(html))
+
+    medicoes['extrair_dados_da_linha'] = medir(parser_dgb.extrair_dados_da_linha, elementos, len(elementos), repeticoes)
+    medicoes['extrair_dados_do_texto'] = medir(parser_dgb.extrair_dados_do_texto, textos, len(textos), repeticoes)
+    return medicoes
+
+def comparar_referencia(medicoes, referencia, tolerancia, tolerancia_memoria):
+    """Falhas das funções mais lentas (ou que alocam mais) do que a referência permite"""
+    falhas = []
+    for nome, atual in medicoes.items():
+        base = referencia.get(nome)
+        if not base:
+            continue
+        piso = base['linhas_por_s'] * (1 - tolerancia)
+        if atual['linhas_por_s'] < piso:
+            falhas.append(f"{nome}: {atual['linhas_por_s']} linhas/s, abaixo do piso de {piso:.1f} "
+                          f"(referência {base['linhas_por_s']})")
+        teto = base['pico_kb'] * (1 + tolerancia_memoria)
+        if base['pico_kb'] and atual['pico_kb'] > teto:
+            falhas.append(f"{nome}: pico de {atual['pico_kb']} KB, acima do teto de {teto:.1f} KB "
+                          f"(referência {base['pico_kb']} KB)")
+    return falhas
+
+def main():
+    parser = argparse.ArgumentParser(description='Regressão de saída e desempenho do parser DGB')
+    parser.add_argument('--corpus', default=PASTA_CORPUS, help='Pasta com debug_produto_*.html')
+    parser.add_argument('--golden', default=PASTA_GOLDEN, help='Pasta com os CSVs de referência')
+    parser.add_argument('--atualizar-golden', action='store_true',
+                        help='Regravar os CSVs de referência com a saída atual (depois de uma mudança intencional)')
+    parser.add_argument('--referencia', default=ARQUIVO_REFERENCIA, help='JSON com as medições de referência')
+    parser.add_argument('--salvar-referencia', action='store_true', help='Gravar as medições atuais como referência')
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help='Queda de vazão aceita em relação à referência (fração)')
+    parser.add_argument('--tolerancia-memoria', type=float, default=0.25,
+                        help='Aumento de pico de memória aceito em relação à referência (fração)')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Passadas por medição (vale a mais rápida)')
+    parser.add_argument('--fatores', type=int, nargs='*', default=list(FATORES_SINTETICOS),
+                        help='Fatores de ampliação das páginas sintéticas')
+    parser.add_argument('--so-golden', action='store_true', help='Só verificar a saída (sem medir desempenho)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    # O parser registra cada página em INFO; aqui só interessa o resultado
+    logging.getLogger('parser_dgb').setLevel(logging.WARNING)
+
+    corpus = carregar_corpus(args.corpus)
+    if not corpus:
+        print(f"❌ Nenhuma captura em {args.corpus}")
+        return 1
+
+    if args.atualizar_golden:
+        quantidade = atualizar_golden(corpus, args.golden)
+        print(f"📝 {quantidade} CSVs de referência gravados em {args.golden}")
+
+    falhas = verificar_golden(corpus, args.golden)
+    print(f"🔎 Golden: {len(corpus)} capturas x {len(MOTORES)} motores, {len(falhas)} falhas")
+
+    sinteticas = paginas_sinteticas(corpus, args.fatores)
+    falhas_sinteticas = verificar_sinteticas(sinteticas)
+    print(f"🧪 Páginas sintéticas: {sum(len(p) for p in sinteticas.values())} páginas, "
+          f"{len(falhas_sinteticas)} falhas")
+    falhas += falhas_sinteticas
+
+    relatorio = {
+        'timestamp': datetime.now().isoformat(),
+        'capturas': len(corpus),
+        'falhas_saida': list(falhas)
+    }
+
+    if not args.so_golden:
+        medicoes = medir_funcoes(corpus, sinteticas, args.repeticoes)
+        relatorio['medicoes'] = medicoes
+
+        print(f"\n{'Função':<36}{'linhas':>8}{'linhas/s':>12}{'pico KB':>10}")
+        for nome, m in medicoes.items():
+            print(f"{nome:<36}{m['linhas']:>8}{m['linhas_por_s']:>12}{m['pico_kb']:>10}")
+
+        if args.salvar_referencia:
+            os.makedirs(os.path.dirname(args.referencia) or '.', exist_ok=True)
+            with open(args.referencia, 'w', encoding='utf-8') as f:
+                json.dump(medicoes, f, ensure_ascii=False, indent=2)
+            print(f"\n📌 Referência salva em {args.referencia}")
+        elif os.path.exists(args.referencia):
+            with open(args.referencia, 'r', encoding='utf-8') as f:
+                referencia = json.load(f)
+            falhas_desempenho = comparar_referencia(medicoes, referencia, args.tolerancia, args.tolerancia_memoria)
+            relatorio['falhas_desempenho'] = falhas_desempenho
+            print(f"\n⏱️  Desempenho vs {args.referencia}: {len(falhas_desempenho)} falhas")
+            falhas += falhas_desempenho
+        else:
+            # Sem referência o piso de vazão não é verificado: conta como falha
+            falhas.append(f"sem referência de desempenho em {args.referencia} (use --salvar-referencia)")
+
+    os.makedirs(BENCHMARK_FOLDER, exist_ok=True)
+    caminho = os.path.join(BENCHMARK_FOLDER, f"regressao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    for falha in falhas:
+        print(f"   ❌ {falha}")
+    print(f"\n{'❌ Regressão detectada' if falhas else '✅ Sem regressões'} - relatório em {caminho}")
+    return 1 if falhas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
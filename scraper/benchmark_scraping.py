@@ -0,0 +1,146 @@
+# benchmark_scraping.py - Compara o Chrome com e sem lean browsing (latência e memória)
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+
+import psutil
+from dotenv import load_dotenv
+
+from metrics import LatencyHistogram
+from scraper import DGBScraper, carregar_produtos
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_FOLDER = 'benchmarks'
+
+JS_RECURSOS = "return performance.getEntriesByType('resource').length"
+
+def rss_chrome(driver):
+    """RSS (bytes) somado do chromedriver e de todos os processos do Chrome filhos dele"""
+    try:
+        raiz = psutil.Process(driver.service.process.pid)
+    except (AttributeError, psutil.Error):
+        return 0
+
+    total = 0
+    for processo in [raiz] + raiz.children(recursive=True):
+        try:
+            total += processo.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+def medir_modo(lean, produtos, headless=True):
+    """Executa login + pesquisas com o modo indicado e retorna as medições"""
+    modo = 'lean' if lean else 'completo'
+    logger.info(f"\n{'='*60}\nModo {modo}: {len(produtos)} produtos\n{'='*60}")
+
+    scraper = DGBScraper(headless=headless, lean=lean)
+    carregamento = LatencyHistogram()
+    pesquisa = LatencyHistogram()
+    rss_pico = 0
+    recursos = []
+    erros = 0
+
+    try:
+        if not scraper.login():
+            raise RuntimeError('Falha no login')
+
+        for produto in produtos:
+            # Página pronta: navegação completa até o campo produto disponível
+            inicio = time.monotonic()
+            if not scraper.navigate_to_stock():
+                erros += 1
+                continue
+            scraper.espera.wait_document_ready()
+            carregamento.observe(time.monotonic() - inicio)
+            recursos.append(scraper.driver.execute_script(JS_RECURSOS))
+
+            resultado = scraper.search_product(produto)
+            if resultado['success']:
+                pesquisa.observe(resultado['latencia'])
+            else:
+                erros += 1
+
+            rss_pico = max(rss_pico, rss_chrome(scraper.driver))
+    finally:
+        scraper.close()
+
+    return {
+        'modo': modo,
+        'produtos': len(produtos),
+        'erros': erros,
+        'pagina_pronta': carregamento.to_dict(),
+        'pesquisa': pesquisa.to_dict(),
+        'recursos_por_pagina': round(sum(recursos) / len(recursos), 1) if recursos else 0,
+        'rss_pico_mb': round(rss_pico / (1024 * 1024), 1)
+    }
+
+def comparar(completo, lean):
+    """Diferenças percentuais do modo lean em relação ao completo"""
+    def reducao(antes, depois):
+        if not antes:
+            return None
+        return round((antes - depois) * 100 / antes, 1)
+
+    return {
+        'pagina_pronta_p50_%': reducao(completo['pagina_pronta']['p50_s'], lean['pagina_pronta']['p50_s']),
+        'pagina_pronta_p95_%': reducao(completo['pagina_pronta']['p95_s'], lean['pagina_pronta']['p95_s']),
+        'pesquisa_p50_%': reducao(completo['pesquisa']['p50_s'], lean['pesquisa']['p50_s']),
+        'recursos_%': reducao(completo['recursos_por_pagina'], lean['recursos_por_pagina']),
+        'rss_pico_%': reducao(completo['rss_pico_mb'], lean['rss_pico_mb'])
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do lean browsing (Chrome com/sem bloqueio de recursos)')
+    parser.add_argument('--produtos', default='produtos.txt', help='Arquivo com a lista de produtos')
+    parser.add_argument('--limite', type=int, default=0, help='Usar só os N primeiros produtos (0 = todos)')
+    parser.add_argument('--visivel', action='store_true', help='Abrir o Chrome com janela (padrão: headless)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    produtos = carregar_produtos(args.produtos)
+    if args.limite:
+        produtos = produtos[:args.limite]
+    if not produtos:
+        print("❌ Nenhum produto para medir")
+        return 1
+
+    headless = not args.visivel
+    completo = medir_modo(False, produtos, headless)
+    lean = medir_modo(True, produtos, headless)
+
+    relatorio = {
+        'timestamp': datetime.now().isoformat(),
+        'completo': completo,
+        'lean': lean,
+        'reducao': comparar(completo, lean)
+    }
+
+    os.makedirs(BENCHMARK_FOLDER, exist_ok=True)
+    caminho = os.path.join(BENCHMARK_FOLDER, f"lean_browsing_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'Métrica':<28}{'Completo':>12}{'Lean':>12}{'Redução':>10}")
+    linhas = [
+        ('Página pronta p50 (s)', completo['pagina_pronta']['p50_s'], lean['pagina_pronta']['p50_s'], 'pagina_pronta_p50_%'),
+        ('Página pronta p95 (s)', completo['pagina_pronta']['p95_s'], lean['pagina_pronta']['p95_s'], 'pagina_pronta_p95_%'),
+        ('Pesquisa p50 (s)', completo['pesquisa']['p50_s'], lean['pesquisa']['p50_s'], 'pesquisa_p50_%'),
+        ('Recursos por página', completo['recursos_por_pagina'], lean['recursos_por_pagina'], 'recursos_%'),
+        ('RSS pico do Chrome (MB)', completo['rss_pico_mb'], lean['rss_pico_mb'], 'rss_pico_%')
+    ]
+    for nome, antes, depois, chave in linhas:
+        print(f"{nome:<28}{antes!s:>12}{depois!s:>12}{relatorio['reducao'][chave]!s:>9}%")
+    print(f"\n📁 Relatório: {caminho}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
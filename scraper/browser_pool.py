@@ -0,0 +1,276 @@
+# browser_pool.py - Pool de navegadores já logados, mantido aquecido pelo app Flask
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+def _get_int_env(nome, padrao, minimo=0):
+    try:
+        return max(minimo, int(os.getenv(nome, str(padrao))))
+    except ValueError:
+        return padrao
+
+def get_pool_size(valor=None):
+    """Quantidade máxima de navegadores aquecidos (parâmetro ou DGB_POOL_SIZE, padrão 1)"""
+    if valor is not None:
+        return max(1, int(valor))
+    return _get_int_env('DGB_POOL_SIZE', 1, minimo=1)
+
+class _Entrada:
+    """Um scraper logado e seus tempos de uso/ping"""
+
+    def __init__(self, scraper):
+        agora = time.monotonic()
+        self.scraper = scraper
+        self.criado_em = agora
+        self.ultimo_uso = agora
+        self.ultimo_ping = agora
+        self.usos = 0
+
+class WarmBrowserPool:
+    """
+    Mantém até `tamanho` DGBScraper logados e posicionados no estoque.
+    lease() empresta um navegador aquecido (hit) ou cria um novo (miss); uma
+    thread de manutenção faz pings de keep-alive e descarta os ociosos demais.
+    """
+
+    def __init__(self, criar_scraper, tamanho=None, ocioso_max=None, intervalo_ping=None,
+                 intervalo_manutencao=30):
+        self.criar_scraper = criar_scraper
+        self.tamanho = get_pool_size(tamanho)
+        self.ocioso_max = ocioso_max if ocioso_max is not None else _get_int_env('DGB_POOL_IDLE_SECONDS', 900)
+        self.intervalo_ping = intervalo_ping if intervalo_ping is not None else _get_int_env('DGB_POOL_PING_SECONDS', 240)
+        self.intervalo_manutencao = intervalo_manutencao
+
+        self.ociosos = []
+        self.emprestados = 0
+        self.criando = 0
+        self.cond = threading.Condition()
+        self.contadores = {
+            'hits': 0,
+            'misses': 0,
+            'criados': 0,
+            'falhas_criacao': 0,
+            'pings': 0,
+            'falhas_saude': 0,
+            'despejados_ociosos': 0
+        }
+        self._parar = threading.Event()
+        self._manutencao = threading.Thread(target=self._loop_manutencao, name='browser-pool', daemon=True)
+        self._manutencao.start()
+
+    def _contar(self, chave):
+        self.contadores[chave] += 1
+
+    def _total(self):
+        return len(self.ociosos) + self.emprestados + self.criando
+
+    def _criar(self):
+        """Cria um scraper logado (fora do lock); None em caso de falha"""
+        try:
+            entrada = _Entrada(self.criar_scraper())
+            with self.cond:
+                self._contar('criados')
+            logger.info("🔥 Navegador aquecido adicionado ao pool")
+            return entrada
+        except Exception as e:
+            logger.error(f"Falha ao criar navegador para o pool: {e}")
+            with self.cond:
+                self._contar('falhas_criacao')
+            return None
+
+    def _fechar(self, entrada):
+        try:
+            entrada.scraper.close()
+        except Exception as e:
+            logger.debug(f"Erro ao fechar navegador do pool: {e}")
+
+    def _saudavel(self, entrada):
+        """Health check antes de emprestar: navegador respondendo e ainda na página de estoque"""
+        try:
+            return entrada.scraper.is_healthy()
+        except Exception:
+            return False
+
+    @contextmanager
+    def lease(self, timeout=60):
+        """
+        Empresta um navegador logado:
+
+            with pool.lease() as scraper:
+                scraper.search_product(...)
+
+        Uma exceção dentro do bloco descarta o navegador em vez de devolvê-lo.
+        """
+        entrada, hit = self._obter(timeout)
+        # Permite à rota informar se a consulta usou um navegador já aquecido
+        entrada.scraper.pool_hit = hit
+        descartar = False
+        try:
+            yield entrada.scraper
+        except Exception:
+            descartar = True
+            raise
+        finally:
+            self._devolver(entrada, descartar)
+
+    def _obter(self, timeout):
+        limite = time.monotonic() + timeout
+        while True:
+            criar = False
+            with self.cond:
+                while not self.ociosos and self._total() >= self.tamanho:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise RuntimeError('Todos os navegadores do pool estão ocupados')
+                    self.cond.wait(restante)
+
+                if self.ociosos:
+                    # Mais recente primeiro: maior chance de sessão ainda quente
+                    entrada = self.ociosos.pop()
+                    self.emprestados += 1
+                else:
+                    self.criando += 1
+                    criar = True
+
+            if criar:
+                entrada = self._criar()
+                with self.cond:
+                    self.criando -= 1
+                    if entrada is None:
+                        self.cond.notify_all()
+                        raise RuntimeError('Falha no login ou ao acessar estoque')
+                    self.emprestados += 1
+                    self._contar('misses')
+                return entrada, False
+
+            if self._saudavel(entrada):
+                with self.cond:
+                    self._contar('hits')
+                return entrada, True
+
+            logger.warning("Navegador do pool falhou no health check - descartando")
+            self._fechar(entrada)
+            with self.cond:
+                self.emprestados -= 1
+                self._contar('falhas_saude')
+                self.cond.notify_all()
+
+    def _devolver(self, entrada, descartar=False):
+        # Cada pesquisa também renova a sessão no servidor
+        entrada.usos += 1
+        entrada.ultimo_uso = entrada.ultimo_ping = time.monotonic()
+        fechar = descartar or self._parar.is_set()
+        if fechar:
+            self._fechar(entrada)
+        with self.cond:
+            self.emprestados -= 1
+            if not fechar:
+                self.ociosos.append(entrada)
+            self.cond.notify_all()
+
+    def warm_up(self):
+        """Cria navegadores até completar o tamanho do pool (bloqueante)"""
+        while not self._parar.is_set():
+            with self.cond:
+                if self._total() >= self.tamanho:
+                    return
+                self.criando += 1
+            entrada = self._criar()
+            with self.cond:
+                self.criando -= 1
+                if entrada is not None:
+                    self.ociosos.append(entrada)
+                self.cond.notify_all()
+            if entrada is None:
+                return
+
+    def warm_up_async(self):
+        """Aquece o pool em segundo plano"""
+        threading.Thread(target=self.warm_up, name='browser-pool-warmup', daemon=True).start()
+
+    def _loop_manutencao(self):
+        while not self._parar.wait(self.intervalo_manutencao):
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.error(f"Erro na manutenção do pool de navegadores: {e}")
+
+    def maintain(self):
+        """Despeja navegadores ociosos há mais de ocioso_max e faz ping de keep-alive nos demais"""
+        agora = time.monotonic()
+        despejar, pingar = [], []
+        with self.cond:
+            for entrada in list(self.ociosos):
+                if self.ocioso_max and agora - entrada.ultimo_uso > self.ocioso_max:
+                    despejar.append(entrada)
+                elif self.intervalo_ping and agora - entrada.ultimo_ping > self.intervalo_ping:
+                    pingar.append(entrada)
+            for entrada in despejar + pingar:
+                self.ociosos.remove(entrada)
+            self.emprestados += len(pingar)
+            self.contadores['despejados_ociosos'] += len(despejar)
+
+        for entrada in despejar:
+            logger.info("💤 Navegador ocioso despejado do pool")
+            self._fechar(entrada)
+
+        for entrada in pingar:
+            # Recarregar o estoque mantém o JSESSIONID vivo e limpa resultados antigos
+            try:
+                vivo = entrada.scraper.navigate_to_stock()
+            except Exception:
+                vivo = False
+            with self.cond:
+                self._contar('pings')
+                if not vivo:
+                    self._contar('falhas_saude')
+            entrada.ultimo_ping = time.monotonic()
+            fechar = not vivo or self._parar.is_set()
+            if not vivo:
+                logger.warning("Ping de keep-alive falhou - navegador descartado")
+            if fechar:
+                self._fechar(entrada)
+            with self.cond:
+                self.emprestados -= 1
+                if not fechar:
+                    self.ociosos.append(entrada)
+                self.cond.notify_all()
+
+    def shutdown(self):
+        """Fecha todos os navegadores ociosos e encerra a manutenção"""
+        self._parar.set()
+        with self.cond:
+            entradas, self.ociosos = self.ociosos, []
+            self.cond.notify_all()
+        for entrada in entradas:
+            self._fechar(entrada)
+
+    def to_dict(self):
+        """Estado e contadores para /api/browser-pool"""
+        with self.cond:
+            consultas = self.contadores['hits'] + self.contadores['misses']
+            agora = time.monotonic()
+            return {
+                'tamanho': self.tamanho,
+                'ociosos': len(self.ociosos),
+                'emprestados': self.emprestados,
+                'criando': self.criando,
+                'ocioso_max_s': self.ocioso_max,
+                'intervalo_ping_s': self.intervalo_ping,
+                'taxa_hits': round(self.contadores['hits'] / consultas, 3) if consultas else 0.0,
+                'navegadores': [
+                    {
+                        'usos': e.usos,
+                        'idade_s': round(agora - e.criado_em, 1),
+                        'ocioso_s': round(agora - e.ultimo_uso, 1)
+                    }
+                    for e in self.ociosos
+                ],
+                **self.contadores,
+                'atualizado_em': datetime.now().isoformat()
+            }
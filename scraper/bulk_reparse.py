@@ -0,0 +1,276 @@
+# bulk_reparse.py - Regera os CSVs a partir das capturas arquivadas, com o parse distribuído entre processos
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import parser_dgb
+from html_archive import HtmlArchive, ARCHIVE_FOLDER
+from parse_cache import get_parse_cache, get_parse_cache_ativo, chave_resultado
+from estrategias_cor import get_cor_aprendida, get_estrategias_cor
+from scraper import DGBScraper
+
+logger = logging.getLogger(__name__)
+
+CSV_FOLDER = 'csv'
+
+# CSVs gerados por DGBScraper.write_csv: produto_<codigo>_<AAAAMMDD_HHMMSS>.csv
+PADRAO_CSV = re.compile(r'^produto_(.+)_(\d{8}_\d{6})\.csv$')
+
+FORMATO_TIMESTAMP = '%Y%m%d_%H%M%S'
+
+# O CSV gerado a partir de uma captura é gravado logo depois dela; um CSV mais novo
+# que a captura além disso veio de outra pesquisa (ex.: extração JSON, que não arquiva HTML)
+TOLERANCIA_CSV_S = 120
+
+def get_reparse_workers(valor=None):
+    """Processos de parse: parâmetro explícito ou DGB_REPARSE_WORKERS (padrão: número de CPUs)"""
+    try:
+        n = int(valor if valor is not None else os.getenv('DGB_REPARSE_WORKERS', os.cpu_count() or 1))
+    except (TypeError, ValueError):
+        n = os.cpu_count() or 1
+    return max(1, n)
+
+def selecionar_capturas(archive, produtos=None):
+    """Captura mais recente de cada produto (todos os do arquivo ou só os pedidos)"""
+    if produtos:
+        entradas = [archive.latest(p) for p in produtos]
+        return [e for e in entradas if e is not None]
+    ultimas = {}
+    for entrada in archive.entries():
+        ultimas[entrada['produto']] = entrada
+    return [ultimas[p] for p in sorted(ultimas)]
+
+def get_tolerancia_csv(valor=None):
+    """Segundos entre a captura e o CSV gerado dela (parâmetro ou DGB_REPARSE_TOLERANCIA)"""
+    try:
+        return max(0.0, float(valor if valor is not None else os.getenv('DGB_REPARSE_TOLERANCIA', TOLERANCIA_CSV_S)))
+    except (TypeError, ValueError):
+        return TOLERANCIA_CSV_S
+
+def csvs_do_produto(produto):
+    """{nome: timestamp} dos CSVs do produto na pasta csv"""
+    if not os.path.exists(CSV_FOLDER):
+        return {}
+    csvs = {}
+    for nome in os.listdir(CSV_FOLDER):
+        match = PADRAO_CSV.match(nome)
+        if match and match.group(1) == str(produto):
+            csvs[nome] = match.group(2)
+    return csvs
+
+def _mais_novo(timestamp, entrada, tolerancia):
+    """CSV gravado depois da captura além da tolerância (timestamp inválido conta como mais novo: não é apagado)"""
+    try:
+        gravado = datetime.strptime(timestamp, FORMATO_TIMESTAMP)
+    except ValueError:
+        return True
+    capturado = datetime.strptime(entrada['timestamp'], FORMATO_TIMESTAMP)
+    return (gravado - capturado).total_seconds() > tolerancia
+
+def csv_mais_novo_que_captura(entrada, tolerancia):
+    """Nome do CSV do produto mais novo que a captura (além da tolerância) ou None"""
+    mais_novos = [(timestamp, nome) for nome, timestamp in csvs_do_produto(entrada['produto']).items()
+                  if _mais_novo(timestamp, entrada, tolerancia)]
+    return max(mais_novos)[1] if mais_novos else None
+
+def reparsear_captura(pasta_archive, sha, produto, timestamp, processo_filho=False):
+    """
+    Executado no processo filho: lê a captura comprimida e parseia uma única vez.
+    Só o hash trafega até o filho; volta a lista de registros, a chave do cache
+    e (no filho) as contagens das estratégias de cor, gravadas pelo processo principal.
+    """
+    html = HtmlArchive(pasta_archive).get(sha)
+    if html is None:
+        raise FileNotFoundError(f"captura {sha[:12]} ausente do arquivo")
+    datahora = datetime.strptime(timestamp, FORMATO_TIMESTAMP).strftime('%Y-%m-%d %H:%M:%S')
+    registros = parser_dgb.parse_html_dgb_simples(html, produto, datahora)
+    estrategias = get_estrategias_cor().retirar_pendentes() if processo_filho and get_cor_aprendida() else None
+    return registros, chave_resultado({'codigo': produto, 'html': html}), estrategias
+
+def remover_csvs_anteriores(entrada, manter, tolerancia):
+    """
+    Apaga os CSVs do produto que não são mais novos que a captura: o consolidador lê
+    todos e só descarta linhas idênticas, então as do parser antigo ficariam junto das
+    regeradas. CSVs mais novos que a captura (gravados por outra pesquisa) ficam.
+    """
+    removidos = []
+    for nome, timestamp in csvs_do_produto(entrada['produto']).items():
+        if nome == manter:
+            continue
+        if _mais_novo(timestamp, entrada, tolerancia):
+            logger.warning(f"⚠️ Produto {entrada['produto']}: {nome} é mais novo que a captura - mantido")
+        else:
+            try:
+                os.remove(os.path.join(CSV_FOLDER, nome))
+                removidos.append(nome)
+            except OSError as e:
+                logger.warning(f"Não foi possível remover {nome}: {e}")
+    return removidos
+
+def status_inicial():
+    """Mesmo formato de reparse_status do app"""
+    return {
+        'running': True,
+        'progress': 0,
+        'total': 0,
+        'concluidos': 0,
+        'erros': 0,
+        'pulados': [],
+        'com_csvs_anteriores': 0,
+        'current': '',
+        'message': 'Iniciando...',
+        'workers': 0,
+        'csv_files': [],
+        'falhas': [],
+        'paginas_por_s': 0.0,
+        'start_time': datetime.now().isoformat(),
+        'end_time': None
+    }
+
+def reparsear_arquivo(status_dict, produtos=None, num_workers=None, pasta_archive=ARCHIVE_FOLDER,
+                      substituir=True, tolerancia=None):
+    """
+    Regera o CSV de cada produto a partir da captura mais recente do arquivo.
+    Produtos com um CSV mais novo que a captura (pesquisas sem HTML arquivado,
+    como a extração JSON) são pulados: a captura tem dados mais velhos que o CSV.
+    O CSV regerado leva o timestamp da captura no nome. Com substituir (padrão),
+    os CSVs do produto que não são mais novos que a captura são apagados; sem
+    ele ficam, e o consolidado traz as linhas antigas junto das regeradas.
+    O parse (a parte cara) roda num ProcessPoolExecutor; a escrita do CSV, a
+    remoção dos CSVs anteriores e o cache de parse ficam neste processo.
+    status_dict é atualizado a cada captura concluída.
+    """
+    inicio = time.monotonic()
+    try:
+        archive = HtmlArchive(pasta_archive)
+        tolerancia = get_tolerancia_csv(tolerancia)
+        capturas = []
+        for entrada in selecionar_capturas(archive, produtos):
+            mais_novo = csv_mais_novo_que_captura(entrada, tolerancia)
+            if mais_novo:
+                logger.info(f"⏭️  Produto {entrada['produto']}: {mais_novo} é mais novo que a captura "
+                            f"de {entrada['timestamp']} - mantido")
+                status_dict['pulados'].append({'produto': entrada['produto'], 'captura': entrada['timestamp'],
+                                               'csv_mais_novo': mais_novo})
+            else:
+                capturas.append(entrada)
+        workers = min(get_reparse_workers(num_workers), max(1, len(capturas)))
+        status_dict.update({'total': len(capturas), 'workers': workers})
+
+        if not capturas:
+            if status_dict['pulados']:
+                status_dict['message'] = (f"Nenhuma captura para reprocessar: {len(status_dict['pulados'])} "
+                                          f"produtos têm CSV mais novo que a captura")
+            else:
+                status_dict['message'] = 'Nenhuma captura arquivada para reprocessar'
+            return status_dict
+
+        logger.info(f"🔁 Reprocessando {len(capturas)} capturas com {workers} processos")
+        cache_ativo = get_parse_cache_ativo()
+
+        def concluir(entrada, registros, chave, estrategias=None):
+            produto = entrada['produto']
+            if estrategias:
+                get_estrategias_cor().somar_pendentes(estrategias)
+            # O nome leva o momento da captura, não o do reprocessamento
+            csv_filename = DGBScraper.write_csv(registros, produto, entrada['timestamp'])
+            # Cada CSV é conferido na hora de apagar: uma pesquisa pode ter gravado um durante o parse
+            if substituir:
+                remover_csvs_anteriores(entrada, csv_filename, tolerancia)
+            if len(csvs_do_produto(produto)) > 1:
+                status_dict['com_csvs_anteriores'] += 1
+            if cache_ativo and chave:
+                # Próxima pesquisa com o mesmo conteúdo reaproveita os registros novos
+                get_parse_cache().put(produto, chave, registros, csv_filename)
+            status_dict['csv_files'].append(csv_filename)
+            status_dict['concluidos'] += 1
+            status_dict['current'] = produto
+
+        def falhar(entrada, erro):
+            logger.error(f"❌ Erro ao reprocessar produto {entrada['produto']}: {erro}")
+            status_dict['falhas'].append({'produto': entrada['produto'], 'hash': entrada['hash'], 'error': str(erro)})
+            status_dict['erros'] += 1
+
+        def publicar():
+            feitos = status_dict['concluidos'] + status_dict['erros']
+            decorrido = time.monotonic() - inicio
+            status_dict['progress'] = int(feitos * 100 / len(capturas))
+            status_dict['paginas_por_s'] = round(feitos / decorrido, 1) if decorrido else 0.0
+            status_dict['message'] = f"Reprocessadas {feitos}/{len(capturas)} capturas"
+
+        if workers == 1:
+            # Um processo só: sem o custo de subir o pool
+            for entrada in capturas:
+                try:
+                    concluir(entrada, *reparsear_captura(pasta_archive, entrada['hash'], entrada['produto'],
+                                                         entrada['timestamp']))
+                except Exception as e:
+                    falhar(entrada, e)
+                publicar()
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futuros = {
+                    executor.submit(reparsear_captura, pasta_archive, e['hash'], e['produto'], e['timestamp'], True): e
+                    for e in capturas
+                }
+                for futuro in as_completed(futuros):
+                    entrada = futuros[futuro]
+                    try:
+                        concluir(entrada, *futuro.result())
+                    except Exception as e:
+                        falhar(entrada, e)
+                    publicar()
+
+        mensagem = f"✅ {status_dict['concluidos']} CSVs regerados em {time.monotonic() - inicio:.1f}s"
+        if status_dict['erros']:
+            mensagem += f", {status_dict['erros']} erros"
+        if status_dict['pulados']:
+            mensagem += f", {len(status_dict['pulados'])} pulados (CSV mais novo que a captura)"
+        if status_dict['com_csvs_anteriores']:
+            logger.warning(f"⚠️ {status_dict['com_csvs_anteriores']} produtos ficaram com mais de um CSV "
+                           f"(o consolidado traz as linhas de todos, antigas e regeradas)")
+        status_dict['message'] = mensagem
+        logger.info(status_dict['message'])
+        return status_dict
+
+    except Exception as e:
+        logger.error(f"❌ Erro no reprocessamento: {e}")
+        status_dict['message'] = f"Erro: {e}"
+        return status_dict
+
+    finally:
+        parser_dgb.salvar_estrategias_cor()
+        status_dict['running'] = False
+        status_dict['end_time'] = datetime.now().isoformat()
+        status_dict['duracao_s'] = round(time.monotonic() - inicio, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description='Regera os CSVs a partir das capturas HTML arquivadas')
+    parser.add_argument('--produtos', nargs='*', help='Só estes produtos (padrão: todos do arquivo)')
+    parser.add_argument('--workers', type=int, default=None, help='Processos de parse (padrão: DGB_REPARSE_WORKERS/CPUs)')
+    parser.add_argument('--archive', default=ARCHIVE_FOLDER, help='Pasta do arquivo de capturas')
+    parser.add_argument('--manter-anteriores', action='store_true',
+                        help='Não apagar os CSVs anteriores à captura (por padrão são apagados; os mais novos nunca são tocados)')
+    parser.add_argument('--tolerancia', type=float, default=None,
+                        help='Segundos entre a captura e o CSV gerado dela (padrão: DGB_REPARSE_TOLERANCIA/120)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    status = reparsear_arquivo(status_inicial(), args.produtos, args.workers, args.archive,
+                               substituir=not args.manter_anteriores, tolerancia=args.tolerancia)
+    print(status['message'])
+    for pulado in status['pulados']:
+        print(f"   ⏭️  {pulado['produto']}: {pulado['csv_mais_novo']} mais novo que a captura de {pulado['captura']}")
+    print(f"⏱️  {status['duracao_s']}s com {status['workers']} processos ({status['paginas_por_s']} páginas/s)")
+    for falha in status['falhas']:
+        print(f"   ❌ {falha['produto']}: {falha['error']}")
+    return 1 if status['erros'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,9 @@ from datetime import datetime
 import logging
 import traceback
 
+from registros import ler_linhas_csv_produto, previsoes_de_textos, formatar_previsao, ordem_previsao
+from numeros_br import centavos_de_textos, textos_de_centavos
+
 logger = logging.getLogger(__name__)
 
 def parsear_descricao_produto(descricao):
@@ -30,70 +33,13 @@ def parsear_descricao_produto(descricao):
         logger.warning(f"Erro ao parsear descrição '{descricao}': {e}")
         return descricao
 
-def converter_valor_brasileiro(val):
-    """Converte valores no formato brasileiro para numérico"""
-    try:
-        if pd.isna(val):
-            return 0.0
-        
-        # Converter string
-        val_str = str(val).strip()
-        
-        # Remover pontos de milhar e substituir vírgula decimal por ponto
-        if ',' in val_str and '.' in val_str:
-            # Formato brasileiro: 1.234,56
-            val_str = val_str.replace('.', '').replace(',', '.')
-        elif ',' in val_str:
-            # Formato com apenas vírgula como decimal
-            val_str = val_str.replace(',', '.')
-        
-        # Tentar converter para float
-        return float(val_str)
-    except Exception as e:
-        logger.warning(f"Erro ao converter valor '{val}': {e}")
-        return 0.0
-
-def formatar_valor_brasileiro(val):
-    """Formata valor numérico para formato brasileiro"""
-    try:
-        if pd.isna(val):
-            return "0,00"
-        
-        # Arredondar para 2 casas decimais
-        val = round(float(val), 2)
-        
-        # Formatar com separador de milhar e vírgula decimal
-        if val.is_integer():
-            return f"{int(val):,}".replace(",", "X").replace(".", ",").replace("X", ".") + ",00"
-        else:
-            parts = f"{val:,.2f}".split('.')
-            inteira = parts[0].replace(",", "X").replace(".", ",").replace("X", ".")
-            return f"{inteira},{parts[1]}"
-    except Exception as e:
-        logger.warning(f"Erro ao formatar valor {val}: {e}")
-        return "0,00"
-
-def ordenar_previsao(val):
-    """Função para ordenar previsões na ordem desejada"""
-    if pd.isna(val):
-        return (0, "")  # Primeiro: nulos
-    
-    val_str = str(val).strip().upper()
-    
-    # Pronta entrega primeiro
-    if 'PRONTA ENTREGA' in val_str:
-        return (1, "0000-00-00")  # Primeira posição
-    
-    try:
-        # Tentar parsear data no formato DD/MM/YYYY
-        if '/' in val_str:
-            day, month, year = map(int, val_str.split('/'))
-            return (2, f"{year:04d}-{month:02d}-{day:02d}")
-    except:
-        pass
-    
-    # Para outros formatos, manter como string
-    return (3, val_str)
+def formatar_saida(df):
+    """Cópia com previsão e valores (centavos) no formato brasileiro, para CSV e Excel"""
+    df = df.copy()
+    df['Previsão'] = df['Previsão'].map(formatar_previsao)
+    for col in ['Estoque', 'Pedidos', 'Disponível']:
+        df[col] = textos_de_centavos(df[col])
+    return df
 
 def consolidar_dados_estruturados():
     """Consolida todos os CSVs em formato limpo e organizado"""
@@ -110,8 +56,8 @@ def consolidar_dados_estruturados():
         
         logger.info(f"📊 Processando {len(csv_files)} arquivos CSV...")
         
-        # Ler e consolidar todos os CSVs
-        dfs = []
+        # Ler todos os CSVs como texto; valores (centavos) e previsões são convertidos em lote depois
+        linhas = []
         arquivos_processados = []
         
         for csv_file in csv_files:
@@ -119,39 +65,16 @@ def consolidar_dados_estruturados():
                 filepath = os.path.join('csv', csv_file)
                 logger.info(f"  → Lendo: {csv_file}")
                 
-                # Ler CSV com encoding apropriado
-                df = pd.read_csv(filepath, delimiter=';', encoding='utf-8-sig')
+                try:
+                    linhas_arquivo = ler_linhas_csv_produto(filepath)
+                except ValueError as e:
+                    logger.warning(f"    ✗ Colunas insuficientes em {csv_file} ({e}) - arquivo ignorado")
+                    continue
                 
-                if not df.empty:
-                    # Filtrar apenas colunas necessárias
-                    colunas_necessarias = ['Produto / Situação / Cor / Desenho / Variante', 
-                                         'Previsão', 'Estoque', 'Pedidos', 'Disponível']
-                    
-                    # Verificar se temos todas as colunas necessárias
-                    colunas_disponiveis = [col for col in colunas_necessarias if col in df.columns]
-                    
-                    if len(colunas_disponiveis) >= 4:  # Pelo menos as colunas principais
-                        # Manter apenas colunas necessárias
-                        df = df[colunas_disponiveis].copy()
-                        
-                        # Renomear coluna do produto
-                        df.rename(columns={'Produto / Situação / Cor / Desenho / Variante': 'Produto / Cor'}, 
-                                inplace=True)
-                        
-                        # Parsear e formatar a descrição do produto
-                        df['Produto / Cor'] = df['Produto / Cor'].apply(parsear_descricao_produto)
-                        
-                        # Converter valores para numérico para ordenação correta
-                        for col in ['Estoque', 'Pedidos', 'Disponível']:
-                            if col in df.columns:
-                                df[f'{col}_num'] = df[col].apply(converter_valor_brasileiro)
-                        
-                        dfs.append(df)
-                        arquivos_processados.append(csv_file)
-                        
-                        logger.info(f"    ✓ {len(df)} registros")
-                    else:
-                        logger.warning(f"    ✗ Colunas insuficientes em {csv_file}")
+                if linhas_arquivo:
+                    linhas.extend(linhas_arquivo)
+                    arquivos_processados.append(csv_file)
+                    logger.info(f"    ✓ {len(linhas_arquivo)} registros")
                 else:
                     logger.warning(f"    ✗ Arquivo vazio: {csv_file}")
                     
@@ -159,12 +82,18 @@ def consolidar_dados_estruturados():
                 logger.error(f"    ✗ Erro ao processar {csv_file}: {e}")
                 continue
         
-        if not dfs:
+        if not linhas:
             return None, "Nenhum dado válido encontrado nos arquivos CSV"
         
-        # Concatenar todos os DataFrames
         logger.info("Concatenando dados...")
-        df_final = pd.concat(dfs, ignore_index=True, sort=False)
+        colunas = list(zip(*linhas))
+        df_final = pd.DataFrame({
+            'Produto / Cor': [parsear_descricao_produto(p) for p in colunas[2]],
+            'Previsão': previsoes_de_textos(colunas[3]),
+            'Estoque': centavos_de_textos(colunas[4]),
+            'Pedidos': centavos_de_textos(colunas[5]),
+            'Disponível': centavos_de_textos(colunas[6])
+        })
         
         # Remover duplicatas
         logger.info("Removendo duplicatas...")
@@ -178,7 +107,7 @@ def consolidar_dados_estruturados():
             df_final = df_final.sort_values('Produto / Cor')
             
             # Adicionar coluna temporária para ordenação de previsão
-            df_final['_previsao_ordem'] = df_final['Previsão'].apply(ordenar_previsao)
+            df_final['_previsao_ordem'] = df_final['Previsão'].apply(ordem_previsao)
             
             # Ordenar por produto/cor e previsão
             df_final = df_final.sort_values(['Produto / Cor', '_previsao_ordem'])
@@ -186,14 +115,6 @@ def consolidar_dados_estruturados():
             # Remover coluna temporária
             df_final = df_final.drop('_previsao_ordem', axis=1)
         
-        # Formatar valores no padrão brasileiro
-        logger.info("Formatando valores...")
-        for col in ['Estoque', 'Pedidos', 'Disponível']:
-            if col in df_final.columns and f'{col}_num' in df_final.columns:
-                # Manter o formato original ou formatar se necessário
-                # Remover a coluna numérica temporária
-                df_final = df_final.drop(f'{col}_num', axis=1)
-        
         # Gerar timestamp para nome dos arquivos
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
@@ -201,11 +122,11 @@ def consolidar_dados_estruturados():
         csv_filename = f"consolidado_organizado_{timestamp}.csv"
         csv_path = os.path.join('csv', csv_filename)
         
-        # Salvar apenas colunas necessárias na ordem correta
+        # Salvar apenas colunas necessárias na ordem correta, já no formato brasileiro
         colunas_saida = ['Produto / Cor', 'Previsão', 'Estoque', 'Pedidos', 'Disponível']
-        colunas_saida = [col for col in colunas_saida if col in df_final.columns]
         
-        df_saida = df_final[colunas_saida].copy()
+        logger.info("Formatando valores...")
+        df_saida = formatar_saida(df_final[colunas_saida])
         df_saida.to_csv(csv_path, sep=';', index=False, encoding='utf-8-sig')
         logger.info(f"✅ CSV consolidado organizado salvo: {csv_filename}")
         
@@ -245,10 +166,12 @@ def consolidar_dados_estruturados():
                             
                             # Ordenar por cor e previsão
                             if 'Produto / Cor' in df_produto.columns:
-                                df_produto['_previsao_ordem'] = df_produto['Previsão'].apply(ordenar_previsao)
+                                df_produto['_previsao_ordem'] = df_produto['Previsão'].apply(ordem_previsao)
                                 df_produto = df_produto.sort_values(['Produto / Cor', '_previsao_ordem'])
                                 df_produto = df_produto.drop('_previsao_ordem', axis=1)
                             
+                            df_produto = formatar_saida(df_produto)
+                            
                             nome_aba = f"ART_{produto}"[:31]  # Excel limita a 31 caracteres
                             df_produto.to_excel(writer, sheet_name=nome_aba, index=False)
                             logger.info(f"  ✓ Aba para produto {produto} criada")
@@ -0,0 +1,271 @@
+# estrategias_cor.py - Ordem aprendida das estratégias de extração da cor, com as taxas de acerto persistidas
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_ESTRATEGIAS = os.path.join('cache', 'estrategias_cor.json')
+
+# Ordem original da cadeia (parser_dgb.registros_da_linha)
+ESTRATEGIAS = ('direto', 'alternativo', 'texto')
+
+# Chave com as contagens somadas de todos os produtos (produtos ainda sem histórico)
+CHAVE_GERAL = '*'
+
+# Linhas de histórico antes de a ordem deixar de ser a original
+MINIMO_LINHAS = 20
+
+# Abaixo disso a estratégia vai para o fim da fila naquele produto
+TAXA_MINIMA = 0.02
+
+# A cada N linhas de um produto a cadeia original é usada inteira, para as taxas não congelarem
+REAVALIAR_A_CADA = 50
+
+# A ordem de um produto é recalculada a partir das contagens a cada N linhas
+RECALCULAR_ORDEM_A_CADA = 10
+
+# Contagens acima disso são divididas por 2: mudanças de layout pesam mais que o histórico antigo
+LIMITE_CONTAGEM = 1000
+
+# Gravar no máximo a cada N segundos (o resto fica para a próxima página ou a saída do processo)
+INTERVALO_GRAVACAO = 30
+
+# Trava do arquivo durante a gravação (ler, somar e substituir): espera máxima e idade de trava abandonada
+ESPERA_TRAVA_S = 5
+TRAVA_ABANDONADA_S = 30
+
+def get_arquivo_estrategias():
+    """Arquivo das taxas de acerto (DGB_ESTRATEGIAS_COR, padrão cache/estrategias_cor.json)"""
+    return os.getenv('DGB_ESTRATEGIAS_COR', ARQUIVO_ESTRATEGIAS)
+
+def get_cor_aprendida(valor=None):
+    """
+    Ordem aprendida ligada/desligada (parâmetro ou DGB_COR_APRENDIDA, padrão desligado).
+    Ligada, a cor extraída de uma página pode depender do histórico gravado em disco.
+    """
+    if valor is None:
+        valor = os.getenv('DGB_COR_APRENDIDA', '0')
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() not in ('0', 'false', 'nao', 'não', 'off', '')
+
+def _somar(destino, contagens, limitar=True):
+    """Soma as contagens de uma chave ({'linhas', 'estrategias'}) em destino, com o LIMITE_CONTAGEM"""
+    destino['linhas'] = destino.get('linhas', 0) + contagens['linhas']
+    estrategias = destino.setdefault('estrategias', {})
+    for estrategia, (tentativas, acertos) in contagens['estrategias'].items():
+        par = estrategias.setdefault(estrategia, [0, 0])
+        par[0] += tentativas
+        par[1] += acertos
+        while limitar and par[0] > LIMITE_CONTAGEM:
+            par[0] //= 2
+            par[1] //= 2
+
+class EstrategiasCor:
+    """
+    Tentativas e acertos de cada estratégia de cor por produto (e no geral).
+    Estratégias que praticamente nunca acertam num produto passam para o fim
+    da fila; as demais mantêm a precedência original, então a cor extraída só
+    muda se uma estratégia rebaixada voltaria a acertar - o que a reavaliação
+    periódica detecta e corrige. Até lá, a mesma página pode sair com outra
+    cor conforme o histórico; por isso só é usada com DGB_COR_APRENDIDA=1.
+
+    Gravado uma vez ao fim de cada execução (scraping ou reprocessamento).
+    Vários processos (app e CLI) dividem o arquivo: cada um grava só o que
+    contou desde a última gravação, somado ao que está no disco naquele
+    momento, sob uma trava de arquivo. Os workers do bulk_reparse não gravam:
+    devolvem as contagens ao processo principal (retirar_pendentes).
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or get_arquivo_estrategias()
+        self._lock = threading.Lock()
+        self._chaves = None
+        # Contagens deste processo ainda não gravadas (somadas ao disco em salvar)
+        self._pendentes = {}
+        self._linhas = {}
+        self._ordens = {}
+        self._alterado = False
+        self._gravado_em = None
+
+    def _ler_disco(self):
+        """Contagens gravadas no arquivo ({} se não existir ou for inválido)"""
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                return json.load(f).get('chaves', {})
+        except FileNotFoundError:
+            pass
+        except (ValueError, OSError, AttributeError) as e:
+            logger.warning(f"Taxas das estratégias de cor inválidas, recomeçando: {e}")
+        return {}
+
+    def _carregar(self):
+        """Contagens do disco na primeira consulta; chamar com o lock"""
+        if self._chaves is None:
+            self._chaves = self._ler_disco()
+        return self._chaves
+
+    def _travar(self):
+        """Cria o arquivo de trava (True) ou desiste depois de ESPERA_TRAVA_S (False)"""
+        trava = f"{self.caminho}.lock"
+        limite = time.monotonic() + ESPERA_TRAVA_S
+        while True:
+            try:
+                os.close(os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    # Processo que morreu no meio da gravação
+                    if time.time() - os.path.getmtime(trava) > TRAVA_ABANDONADA_S:
+                        os.remove(trava)
+                        continue
+                except OSError:
+                    continue
+            if time.monotonic() > limite:
+                return False
+            time.sleep(0.01)
+
+    def _ordem_das_contagens(self, contagens):
+        if not contagens or contagens.get('linhas', 0) < MINIMO_LINHAS:
+            return None
+
+        def rebaixada(estrategia):
+            tentativas, acertos = contagens['estrategias'].get(estrategia, (0, 0))
+            return tentativas >= MINIMO_LINHAS and acertos / tentativas < TAXA_MINIMA
+
+        return tuple(sorted(ESTRATEGIAS, key=lambda e: (rebaixada(e), ESTRATEGIAS.index(e))))
+
+    def ordem(self, chave):
+        """Ordem em que as estratégias devem ser tentadas numa linha do produto"""
+        chave = str(chave)
+        with self._lock:
+            chaves = self._carregar()
+            linha = self._linhas.get(chave, 0) + 1
+            self._linhas[chave] = linha
+            if linha % REAVALIAR_A_CADA == 0:
+                return ESTRATEGIAS
+            if chave not in self._ordens or linha % RECALCULAR_ORDEM_A_CADA == 0:
+                self._ordens[chave] = (self._ordem_das_contagens(chaves.get(chave))
+                                       or self._ordem_das_contagens(chaves.get(CHAVE_GERAL))
+                                       or ESTRATEGIAS)
+            return self._ordens[chave]
+
+    def registrar(self, chave, tentadas):
+        """tentadas: [(estratégia, acertou)] na ordem em que foram tentadas numa linha"""
+        with self._lock:
+            chaves = self._carregar()
+            linha = {'linhas': 1, 'estrategias': {e: (1, 1 if acertou else 0) for e, acertou in tentadas}}
+            for nome in (str(chave), CHAVE_GERAL):
+                _somar(chaves.setdefault(nome, {'linhas': 0, 'estrategias': {}}), linha)
+                pendentes = self._pendentes.setdefault(nome, {'linhas': 0, 'estrategias': {}})
+                pendentes['linhas'] += 1
+                for estrategia, acertou in tentadas:
+                    par = pendentes['estrategias'].setdefault(estrategia, [0, 0])
+                    par[0] += 1
+                    par[1] += 1 if acertou else 0
+            self._alterado = True
+
+    def retirar_pendentes(self):
+        """Contagens ainda não gravadas, que deixam de ser deste histórico (processo filho -> principal)"""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+            self._alterado = False
+            return pendentes
+
+    def somar_pendentes(self, pendentes):
+        """Soma contagens retiradas de outro processo (gravadas no próximo salvar)"""
+        if not pendentes:
+            return
+        with self._lock:
+            chaves = self._carregar()
+            for nome, contagens in pendentes.items():
+                _somar(chaves.setdefault(nome, {'linhas': 0, 'estrategias': {}}), contagens)
+                _somar(self._pendentes.setdefault(nome, {'linhas': 0, 'estrategias': {}}), contagens, limitar=False)
+            self._alterado = True
+
+    def salvar(self, forcar=False):
+        """
+        Soma as contagens novas deste processo às do arquivo e grava (atômico), se
+        houver novas, no máximo a cada INTERVALO_GRAVACAO segundos. As contagens em
+        memória passam a ser as somadas, com o que os outros processos gravaram.
+        """
+        with self._lock:
+            if not self._alterado:
+                return
+            agora = time.monotonic()
+            if not forcar and self._gravado_em is not None and agora - self._gravado_em < INTERVALO_GRAVACAO:
+                return
+            self._gravado_em = agora
+            try:
+                os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+                if not self._travar():
+                    logger.warning("Arquivo das estratégias de cor travado por outro processo - gravação adiada")
+                    return
+                try:
+                    chaves = self._ler_disco()
+                    for nome, contagens in self._pendentes.items():
+                        _somar(chaves.setdefault(nome, {'linhas': 0, 'estrategias': {}}), contagens)
+                    conteudo = {'chaves': chaves, 'atualizado_em': datetime.now().isoformat()}
+                    temporario = f"{self.caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    with open(temporario, 'w', encoding='utf-8') as f:
+                        json.dump(conteudo, f, ensure_ascii=False)
+                    os.replace(temporario, self.caminho)
+                finally:
+                    os.remove(f"{self.caminho}.lock")
+                self._chaves = chaves
+                self._pendentes = {}
+                self._alterado = False
+            except OSError as e:
+                logger.warning(f"Não foi possível gravar as taxas das estratégias de cor: {e}")
+
+    def clear(self):
+        """Esquece o histórico (memória e disco)"""
+        with self._lock:
+            self._chaves = {}
+            self._pendentes = {}
+            self._linhas = {}
+            self._ordens = {}
+            self._alterado = False
+            if os.path.exists(self.caminho):
+                os.remove(self.caminho)
+
+    def to_dict(self):
+        """Taxa de acerto de cada estratégia e a ordem atual, por produto"""
+        with self._lock:
+            chaves = self._carregar()
+            resultado = {}
+            for chave, contagens in sorted(chaves.items()):
+                resultado[chave] = {
+                    'linhas': contagens['linhas'],
+                    'ordem': list(self._ordem_das_contagens(contagens) or ESTRATEGIAS),
+                    'taxas': {
+                        estrategia: round(acertos / tentativas, 3) if tentativas else 0.0
+                        for estrategia, (tentativas, acertos) in contagens['estrategias'].items()
+                    }
+                }
+            return resultado
+
+_estrategias = None
+_estrategias_lock = threading.Lock()
+
+def get_estrategias_cor():
+    """Histórico padrão (get_arquivo_estrategias), compartilhado pelos workers de parse"""
+    global _estrategias
+    with _estrategias_lock:
+        if _estrategias is None:
+            _estrategias = EstrategiasCor()
+            # O que ficou dentro do intervalo de gravação é salvo na saída
+            atexit.register(_estrategias.salvar, True)
+        return _estrategias
+
+def set_estrategias_cor(estrategias):
+    """Troca o histórico padrão (ex.: benchmark com arquivo temporário); retorna o anterior"""
+    global _estrategias
+    with _estrategias_lock:
+        anterior, _estrategias = _estrategias, estrategias
+        return anterior
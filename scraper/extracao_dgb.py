@@ -0,0 +1,106 @@
+# extracao_dgb.py - Extração estruturada dos resultados dentro do navegador (execute_script)
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXTRACAO_JSON = 'json'
+EXTRACAO_HTML = 'html'
+
+# Percorre tr.registro / div.container-3-x / span.registro e devolve só os textos.
+# Os textos seguem BeautifulSoup.get_text(strip=True) (nós de texto aparados e
+# concatenados) para que parser_dgb.parse_linhas_extraidas produza o mesmo CSV.
+JS_EXTRAIR_LINHAS = """
+var IGNORAR = {SCRIPT: 1, STYLE: 1, TEMPLATE: 1, NOSCRIPT: 1};
+
+function textos(el) {
+    var partes = [];
+    var walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT, null);
+    var no;
+    while ((no = walker.nextNode())) {
+        if (!IGNORAR[no.parentNode.nodeName]) partes.push(no.nodeValue);
+    }
+    return partes;
+}
+function textoColado(el) {
+    return textos(el).map(function (t) { return t.trim(); })
+                     .filter(function (t) { return t.length; }).join('');
+}
+
+var linhas = [];
+var trs = document.querySelectorAll('tr.registro');
+for (var i = 0; i < trs.length; i++) {
+    var tr = trs[i];
+    var container = tr.querySelector('div.container-3-x');
+    var divs = container ? container.querySelectorAll('div') : [];
+    var valores = [];
+    var spans = tr.querySelectorAll('span.registro');
+    for (var j = 0; j < spans.length; j++) {
+        var internos = spans[j].querySelectorAll('span');
+        if (internos.length >= 4) {
+            valores.push([textoColado(internos[0]), textoColado(internos[1]),
+                          textoColado(internos[2]), textoColado(internos[3])]);
+        }
+    }
+    linhas.push({
+        container: !!container,
+        divs: Array.prototype.slice.call(divs, 0, 2).map(textoColado),
+        negritos_cor: divs.length > 1 ? divs[1].querySelectorAll('b').length : 0,
+        texto: textoColado(tr),
+        texto_espacado: textos(tr).join(' '),
+        valores: valores
+    });
+}
+
+return {
+    versao: 1,
+    campo_produto: !!document.getElementById('produto'),
+    login: !!document.getElementById('senha'),
+    total_tr: trs.length,
+    linhas: linhas
+};
+"""
+
+def get_modo_extracao(valor=None):
+    """Modo de extração: 'json' (no navegador, padrão) ou 'html' (page_source), via DGB_EXTRACAO"""
+    modo = (valor or os.getenv('DGB_EXTRACAO', EXTRACAO_JSON)).strip().lower()
+    if modo not in (EXTRACAO_JSON, EXTRACAO_HTML):
+        logger.warning(f"Modo de extração desconhecido '{modo}', usando {EXTRACAO_JSON}")
+        modo = EXTRACAO_JSON
+    return modo
+
+def _lista_de_textos(valor, tamanho=None):
+    return (isinstance(valor, list) and all(isinstance(v, str) for v in valor)
+            and (tamanho is None or len(valor) == tamanho))
+
+def validar_extracao(dados):
+    """
+    Confere a estrutura devolvida por JS_EXTRAIR_LINHAS.
+    Retorna (True, '') ou (False, motivo) - nesse caso o HTML completo deve ser usado.
+    """
+    if not isinstance(dados, dict) or dados.get('versao') != 1:
+        return False, 'resposta inesperada do script'
+    if dados.get('login'):
+        return False, 'página de login'
+    if not dados.get('campo_produto'):
+        return False, 'página de estoque não encontrada'
+
+    linhas = dados.get('linhas')
+    if not isinstance(linhas, list) or len(linhas) != dados.get('total_tr'):
+        return False, 'quantidade de linhas divergente'
+
+    for linha in linhas:
+        if not isinstance(linha, dict) or not isinstance(linha.get('container'), bool):
+            return False, 'linha inválida'
+        if not _lista_de_textos(linha.get('divs')) or not isinstance(linha.get('negritos_cor'), int):
+            return False, 'container inválido'
+        if not isinstance(linha.get('texto'), str) or not isinstance(linha.get('texto_espacado'), str):
+            return False, 'texto da linha inválido'
+        valores = linha.get('valores')
+        if not isinstance(valores, list) or not all(_lista_de_textos(v, 4) for v in valores):
+            return False, 'valores inválidos'
+        # Linha com container mas sem nome nem valores: extração incompleta
+        if linha['container'] and not linha['divs'] and not valores:
+            return False, 'linha sem dados'
+
+    return True, ''
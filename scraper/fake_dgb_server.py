@@ -0,0 +1,319 @@
+# fake_dgb_server.py - Servidor local que imita o DGB (login, estoque e pesquisa) a partir de capturas reais
+import os
+import re
+import sys
+import json
+import time
+import random
+import secrets
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from bs4 import BeautifulSoup
+
+from html_archive import PADRAO_LEGADO
+
+logger = logging.getLogger(__name__)
+
+PASTA_CAPTURAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scraper-dgb', 'debug')
+
+CAMINHO_LOGIN = '/dgb/login.jsf'
+CAMINHO_ESTOQUE = '/dgb/estoquePrevisaoConsulta.jsf'
+CAMINHO_HOME = '/dgb/dashboard.jsf'
+CAMINHO_STATS = '/fake/stats'
+
+# Regiões re-renderizadas pelo botão Pesquisar (ver http_backend.RENDER_PADRAO)
+REGIOES_RESULTADO = ('mensagem', 'estoquePrevisaoList', 'estoquePrevisaoConsultaPaginacaoList', 'estoqueTotal')
+VIEW_STATE = 'javax.faces.ViewState'
+
+PAGINA_LOGIN = """<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><title>DGB - Login</title></head>
+<body>
+<form id="formLogin" name="formLogin" method="post" action="/dgb/login.jsf">
+    <input type="text" id="login" name="login" value="">
+    <input type="password" id="senha" name="senha" value="">
+    <button type="submit" id="botaoEntrar" name="botaoEntrar" value="Entrar">Entrar</button>
+</form>
+</body></html>"""
+
+HTML_DASHBOARD = '<!DOCTYPE html><html><head><meta charset="UTF-8"><title>DGB</title></head><body>Dashboard</body></html>'
+
+XML_REDIRECT_LOGIN = ('<?xml version="1.0" encoding="UTF-8"?>'
+                      f'<partial-response><redirect url="{CAMINHO_LOGIN}"></redirect></partial-response>')
+
+def carregar_capturas(pasta=PASTA_CAPTURAS):
+    """{produto: html} com a captura mais recente de cada produto (debug_produto_<codigo>_<ts>.html)"""
+    capturas = {}
+    for nome in sorted(os.listdir(pasta)):
+        match = PADRAO_LEGADO.match(nome)
+        if match:
+            with open(os.path.join(pasta, nome), 'r', encoding='utf-8') as f:
+                capturas[match.group(1)] = f.read()
+    return capturas
+
+def _cdata(texto):
+    return '<![CDATA[' + texto.replace(']]>', ']]]]><![CDATA[>') + ']]>'
+
+class _Captura:
+    """HTML de uma captura e as regiões de resultado já serializadas para o partial-response"""
+
+    def __init__(self, html):
+        self.html = html
+        soup = BeautifulSoup(html, 'html.parser')
+        self.regioes = {}
+        for regiao in REGIOES_RESULTADO:
+            elemento = soup.find(id=regiao)
+            if elemento is not None:
+                self.regioes[regiao] = str(elemento)
+
+        # Página do GET do estoque: mesmo formulário, sem resultados
+        for regiao in REGIOES_RESULTADO:
+            elemento = soup.find(id=regiao)
+            if elemento is not None:
+                elemento.clear()
+        self.html_vazio = str(soup)
+
+class FakeDGBServer:
+    """
+    Imita o DGB o bastante para os backends selenium, http e async:
+    login com cookie JSESSIONID, GET do estoque, POST parcial (AJAX) ou completo
+    da pesquisa. Latência e falhas (HTTP 500, sessão expirada, resposta lenta)
+    são injetadas por requisição de pesquisa.
+
+    Produtos sem captura recebem uma captura fixa escolhida pelo código.
+    """
+
+    def __init__(self, capturas=None, porta=0, latencia=0.0, jitter=0.0, taxa_erro=0.0,
+                 taxa_expiracao=0.0, taxa_lenta=0.0, atraso_lento=20.0, semente=None):
+        capturas = capturas if capturas is not None else carregar_capturas()
+        if not capturas:
+            raise ValueError('Nenhuma captura debug_produto_*.html encontrada')
+        self.capturas = {produto: _Captura(html) for produto, html in capturas.items()}
+        self.produtos_capturados = sorted(self.capturas)
+        self.latencia = latencia
+        self.jitter = jitter
+        self.taxa_erro = taxa_erro
+        self.taxa_expiracao = taxa_expiracao
+        self.taxa_lenta = taxa_lenta
+        self.atraso_lento = atraso_lento
+        self.random = random.Random(semente)
+        self.sessoes = set()
+        self.lock = threading.Lock()
+        self.contadores = {
+            'logins': 0,
+            'paginas_estoque': 0,
+            'pesquisas': 0,
+            'erros_injetados': 0,
+            'expiracoes_injetadas': 0,
+            'lentas_injetadas': 0,
+            'sem_sessao': 0
+        }
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', porta), self._criar_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def url_login(self):
+        return self.url_base + CAMINHO_LOGIN
+
+    @property
+    def url_estoque(self):
+        return self.url_base + CAMINHO_ESTOQUE
+
+    def env(self):
+        """Variáveis de ambiente que apontam os scrapers para este servidor"""
+        return {
+            'DGB_URL_LOGIN': self.url_login,
+            'DGB_URL_ESTOQUE': self.url_estoque,
+            'DGB_USUARIO': os.getenv('DGB_USUARIO') or 'benchmark',
+            'DGB_SENHA': os.getenv('DGB_SENHA') or 'benchmark'
+        }
+
+    def start(self):
+        """Atende em segundo plano; retorna self"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-dgb', daemon=True)
+        self.thread.start()
+        logger.info(f"🧪 DGB falso em {self.url_base} ({len(self.capturas)} capturas)")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def captura(self, produto):
+        """Captura do produto ou, se não houver, uma captura fixa escolhida pelo código"""
+        produto = str(produto).strip()
+        if produto in self.capturas:
+            return self.capturas[produto]
+        indice = sum(produto.encode('utf-8')) % len(self.produtos_capturados)
+        return self.capturas[self.produtos_capturados[indice]]
+
+    def _contar(self, chave):
+        with self.lock:
+            self.contadores[chave] += 1
+
+    def _sortear(self, taxa):
+        if not taxa:
+            return False
+        with self.lock:
+            return self.random.random() < taxa
+
+    def _esperar(self):
+        atraso = self.latencia
+        if self.jitter:
+            with self.lock:
+                atraso += self.random.uniform(-self.jitter, self.jitter)
+        if atraso > 0:
+            time.sleep(atraso)
+
+    def to_dict(self):
+        with self.lock:
+            return dict(self.contadores, sessoes_ativas=len(self.sessoes))
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, formato, *args):
+                logger.debug(formato % args)
+
+            def _responder(self, codigo, corpo, tipo='text/html;charset=UTF-8', cabecalhos=None):
+                dados = corpo.encode('utf-8')
+                self.send_response(codigo)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(dados)))
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _sessao(self):
+                match = re.search(r'JSESSIONID=([\w-]+)', self.headers.get('Cookie') or '')
+                if not match:
+                    return None
+                with servidor.lock:
+                    return match.group(1) if match.group(1) in servidor.sessoes else None
+
+            def _ler_formulario(self):
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                corpo = self.rfile.read(tamanho).decode('utf-8') if tamanho else ''
+                return {nome: valores[0] for nome, valores in parse_qs(corpo, keep_blank_values=True).items()}
+
+            def do_GET(self):
+                caminho = urlparse(self.path).path
+                if caminho == CAMINHO_STATS:
+                    return self._responder(200, json.dumps(servidor.to_dict()), 'application/json')
+                if caminho == CAMINHO_LOGIN:
+                    return self._responder(200, PAGINA_LOGIN)
+                if caminho == CAMINHO_HOME:
+                    return self._responder(200, HTML_DASHBOARD)
+                if caminho == CAMINHO_ESTOQUE:
+                    if self._sessao() is None:
+                        servidor._contar('sem_sessao')
+                        return self._responder(302, '', cabecalhos={'Location': CAMINHO_LOGIN})
+                    servidor._contar('paginas_estoque')
+                    servidor._esperar()
+                    return self._responder(200, servidor.captura(servidor.produtos_capturados[0]).html_vazio)
+                # CSS, JS e imagens referenciados pelas capturas
+                self._responder(404, '')
+
+            def do_POST(self):
+                caminho = urlparse(self.path).path
+                campos = self._ler_formulario()
+
+                if caminho == CAMINHO_LOGIN:
+                    if not campos.get('login') or not campos.get('senha'):
+                        return self._responder(200, PAGINA_LOGIN)
+                    sessao = secrets.token_hex(16)
+                    with servidor.lock:
+                        servidor.sessoes.add(sessao)
+                    servidor._contar('logins')
+                    return self._responder(302, '', cabecalhos={
+                        'Location': CAMINHO_HOME,
+                        'Set-Cookie': f'JSESSIONID={sessao}; Path=/dgb; HttpOnly'
+                    })
+
+                if caminho != CAMINHO_ESTOQUE:
+                    return self._responder(404, '')
+
+                parcial = campos.get('javax.faces.partial.ajax') == 'true'
+                sessao = self._sessao()
+                if sessao is not None and servidor._sortear(servidor.taxa_expiracao):
+                    with servidor.lock:
+                        servidor.sessoes.discard(sessao)
+                    servidor._contar('expiracoes_injetadas')
+                    sessao = None
+                if sessao is None:
+                    servidor._contar('sem_sessao')
+                    if parcial:
+                        return self._responder(200, XML_REDIRECT_LOGIN, 'text/xml;charset=UTF-8')
+                    return self._responder(302, '', cabecalhos={'Location': CAMINHO_LOGIN})
+
+                servidor._contar('pesquisas')
+                servidor._esperar()
+                if servidor._sortear(servidor.taxa_lenta):
+                    servidor._contar('lentas_injetadas')
+                    time.sleep(servidor.atraso_lento)
+                if servidor._sortear(servidor.taxa_erro):
+                    servidor._contar('erros_injetados')
+                    return self._responder(500, '<html><body>Erro interno (injetado)</body></html>')
+
+                captura = servidor.captura(campos.get('produto', ''))
+                if not parcial:
+                    # Envio completo do formulário (sem jsf.js no navegador)
+                    return self._responder(200, captura.html)
+
+                regioes = (campos.get('javax.faces.partial.render') or ' '.join(REGIOES_RESULTADO)).split()
+                atualizacoes = ''.join(
+                    f'<update id="{regiao}">{_cdata(captura.regioes[regiao])}</update>'
+                    for regiao in regioes if regiao in captura.regioes
+                )
+                atualizacoes += (f'<update id="j_id1:{VIEW_STATE}:0">'
+                                 f'{_cdata(secrets.token_hex(8))}</update>')
+                xml = ('<?xml version="1.0" encoding="UTF-8"?>'
+                       f'<partial-response id="j_id1"><changes>{atualizacoes}</changes></partial-response>')
+                self._responder(200, xml, 'text/xml;charset=UTF-8')
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor DGB falso para testes e benchmarks locais')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--capturas', default=PASTA_CAPTURAS, help='Pasta com debug_produto_*.html')
+    parser.add_argument('--latencia', type=float, default=0.0, help='Atraso por resposta (s)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Variação uniforme do atraso (s)')
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help='Fração de pesquisas com HTTP 500')
+    parser.add_argument('--taxa-expiracao', type=float, default=0.0, help='Fração de pesquisas com sessão expirada')
+    parser.add_argument('--taxa-lenta', type=float, default=0.0, help='Fração de pesquisas muito lentas')
+    parser.add_argument('--atraso-lento', type=float, default=20.0, help='Atraso das pesquisas lentas (s)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    servidor = FakeDGBServer(
+        carregar_capturas(args.capturas), porta=args.porta, latencia=args.latencia, jitter=args.jitter,
+        taxa_erro=args.taxa_erro, taxa_expiracao=args.taxa_expiracao, taxa_lenta=args.taxa_lenta,
+        atraso_lento=args.atraso_lento
+    )
+    print(f"🧪 DGB falso em {servidor.url_base}")
+    for nome, valor in servidor.env().items():
+        print(f"   {nome}={valor}")
+    try:
+        servidor.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.httpd.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
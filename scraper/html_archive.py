@@ -0,0 +1,193 @@
+# html_archive.py - Arquivo endereçado por conteúdo (gzip) das capturas HTML do DGB
+import os
+import re
+import sys
+import gzip
+import json
+import shutil
+import logging
+import threading
+from datetime import datetime
+
+from run_journal import hash_html
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FOLDER = os.path.join('debug', 'archive')
+
+# Nome das capturas antigas: debug_produto_<codigo>_<AAAAMMDD_HHMMSS>.html
+PADRAO_LEGADO = re.compile(r'^debug_produto_(.+)_(\d{8}_\d{6})\.html$')
+
+class HtmlArchive:
+    """
+    Cada captura é gravada uma única vez em objects/<hh>/<sha256>.html.gz;
+    index.jsonl (append-only) liga (produto, timestamp) ao hash.
+    Páginas idênticas (mesmo estoque) ocupam espaço uma só vez.
+    """
+
+    def __init__(self, pasta=ARCHIVE_FOLDER):
+        self.pasta = pasta
+        self.pasta_objetos = os.path.join(pasta, 'objects')
+        self.caminho_indice = os.path.join(pasta, 'index.jsonl')
+        self._lock = threading.Lock()
+        self._indice = None
+        self._indice_tamanho = -1
+
+    def _caminho_objeto(self, sha):
+        return os.path.join(self.pasta_objetos, sha[:2], f"{sha}.html.gz")
+
+    def put(self, html, produto, timestamp=None, origem=None):
+        """Arquiva uma captura e retorna a entrada do índice"""
+        sha = hash_html(html)
+        caminho = self._caminho_objeto(sha)
+        timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        with self._lock:
+            novo = not os.path.exists(caminho)
+            if novo:
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with gzip.open(temporario, 'wb', compresslevel=6) as f:
+                    f.write(html.encode('utf-8'))
+                os.replace(temporario, caminho)
+
+            entrada = {
+                'produto': str(produto),
+                'timestamp': timestamp,
+                'hash': sha,
+                'tamanho': len(html.encode('utf-8')),
+                'armazenado': os.path.getsize(caminho),
+                'novo': novo
+            }
+            if origem:
+                entrada['origem'] = origem
+
+            os.makedirs(self.pasta, exist_ok=True)
+            with open(self.caminho_indice, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+
+        logger.info(f"🗄️  HTML arquivado: produto {produto} -> {sha[:12]}"
+                    f"{'' if novo else ' (já existia, deduplicado)'}")
+        return entrada
+
+    def get(self, sha):
+        """HTML de um hash (None se ausente)"""
+        caminho = self._caminho_objeto(sha)
+        if not os.path.exists(caminho):
+            return None
+        with gzip.open(caminho, 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def _carregar_indice(self):
+        """Índice em memória, relido só quando index.jsonl cresce"""
+        with self._lock:
+            try:
+                tamanho = os.path.getsize(self.caminho_indice)
+            except OSError:
+                self._indice, self._indice_tamanho = {}, -1
+                return self._indice
+
+            if self._indice is not None and tamanho == self._indice_tamanho:
+                return self._indice
+
+            indice = {}
+            with open(self.caminho_indice, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    linha = linha.strip()
+                    if not linha:
+                        continue
+                    try:
+                        entrada = json.loads(linha)
+                    except ValueError:
+                        continue  # linha truncada por uma queda
+                    indice.setdefault(entrada['produto'], []).append(entrada)
+
+            for entradas in indice.values():
+                entradas.sort(key=lambda e: e['timestamp'])
+            self._indice, self._indice_tamanho = indice, tamanho
+            return indice
+
+    def latest(self, produto):
+        """Entrada mais recente de um produto (None se não houver)"""
+        entradas = self._carregar_indice().get(str(produto))
+        return entradas[-1] if entradas else None
+
+    def latest_html(self, produto):
+        """(entrada, html) da captura mais recente de um produto, ou (None, None)"""
+        entrada = self.latest(produto)
+        if entrada is None:
+            return None, None
+        return entrada, self.get(entrada['hash'])
+
+    def entries(self, produto=None):
+        """Todas as entradas (de um produto ou de todos), em ordem de timestamp"""
+        indice = self._carregar_indice()
+        if produto is not None:
+            return list(indice.get(str(produto), []))
+        return sorted((e for entradas in indice.values() for e in entradas), key=lambda e: e['timestamp'])
+
+    def stats(self):
+        """Capturas, objetos únicos e bytes originais vs armazenados"""
+        entradas = self.entries()
+        objetos = {e['hash']: e['armazenado'] for e in entradas}
+        original = sum(e['tamanho'] for e in entradas)
+        armazenado = sum(objetos.values())
+        return {
+            'capturas': len(entradas),
+            'objetos': len(objetos),
+            'produtos': len({e['produto'] for e in entradas}),
+            'bytes_originais': original,
+            'bytes_armazenados': armazenado,
+            'reducao': round(1 - armazenado / original, 3) if original else 0.0
+        }
+
+    def clear(self):
+        """Remove todo o arquivo; retorna quantas capturas havia no índice"""
+        total = len(self.entries())
+        with self._lock:
+            if os.path.exists(self.pasta):
+                shutil.rmtree(self.pasta)
+            self._indice, self._indice_tamanho = None, -1
+        return total
+
+    def import_legacy(self, pasta='debug', remover=False):
+        """Arquiva os debug_produto_<codigo>_<ts>.html existentes; retorna quantos foram importados"""
+        importados = 0
+        for nome in sorted(os.listdir(pasta)):
+            match = PADRAO_LEGADO.match(nome)
+            if not match:
+                continue
+            caminho = os.path.join(pasta, nome)
+            with open(caminho, 'r', encoding='utf-8') as f:
+                html = f.read()
+            self.put(html, match.group(1), match.group(2), origem=nome)
+            importados += 1
+            if remover:
+                os.remove(caminho)
+        return importados
+
+_archive = None
+_archive_lock = threading.Lock()
+
+def get_archive():
+    """Arquivo padrão (debug/archive), compartilhado pelo scraper e pelo app"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = HtmlArchive()
+        return _archive
+
+if __name__ == "__main__":
+    # Importar capturas antigas: python html_archive.py [pasta] [--remover]
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    pasta = argumentos[0] if argumentos else 'debug'
+    archive = get_archive()
+    quantidade = archive.import_legacy(pasta, remover='--remover' in sys.argv)
+
+    estatisticas = archive.stats()
+    print(f"✅ {quantidade} capturas importadas de {pasta}")
+    print(f"📦 {estatisticas['capturas']} capturas, {estatisticas['objetos']} objetos únicos")
+    print(f"💾 {estatisticas['bytes_originais']} -> {estatisticas['bytes_armazenados']} bytes "
+          f"({estatisticas['reducao'] * 100:.1f}% menor)")
@@ -0,0 +1,371 @@
+# http_backend.py - Backend HTTP (sem navegador) que reproduz o formulário JSF do estoque
+import re
+import time
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+from scraper import DGBScraper
+from session_cache import liberar_slot
+from resilience import SessaoExpiradaError, BotaoNaoEncontradoError, ProdutoTrocadoError, classificar_excecao
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Componentes re-renderizados pelo botão Pesquisar (mojarra.ab ... render)
+RENDER_PADRAO = 'mensagem estoquePrevisaoList estoquePrevisaoConsultaPaginacaoList estoqueTotal'
+VIEW_STATE = 'javax.faces.ViewState'
+
+# Código do produto no início de cada linha de resultado: <div title="Produto"><b>000014</b> ...
+PADRAO_PRODUTO_LINHA = re.compile(r'<div[^>]*title="Produto"[^>]*>\s*<b>\s*(\d+)\s*</b>')
+
+def criar_sessao_http(pool_maxsize=10):
+    """Cria um requests.Session com pool de conexões keep-alive"""
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize)
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    sessao.headers.update({'User-Agent': USER_AGENT})
+    return sessao
+
+def extrair_campos_formulario(form):
+    """Serializa os campos de um <form> como o navegador faria (sem botões)"""
+    campos = {}
+    for campo in form.find_all(['input', 'select', 'textarea']):
+        nome = campo.get('name')
+        if not nome or campo.has_attr('disabled'):
+            continue
+
+        if campo.name == 'input':
+            tipo = (campo.get('type') or 'text').lower()
+            if tipo in ('submit', 'button', 'image', 'reset', 'file'):
+                continue
+            if tipo in ('checkbox', 'radio') and not campo.has_attr('checked'):
+                continue
+            campos[nome] = campo.get('value', 'on' if tipo in ('checkbox', 'radio') else '')
+        elif campo.name == 'select':
+            opcao = campo.find('option', selected=True) or campo.find('option')
+            campos[nome] = opcao.get('value', opcao.get_text()) if opcao else ''
+        else:
+            campos[nome] = campo.get_text()
+    return campos
+
+def encontrar_formulario_pesquisa(html):
+    """
+    Localiza o formulário de pesquisa de estoque.
+    Retorna dict com action, form_id, campos, botao e render.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    campo_produto = soup.find('input', id='produto')
+    if campo_produto is None:
+        return None
+
+    form = campo_produto.find_parent('form')
+    if form is None:
+        return None
+
+    # Botão "Pesquisar" (o id muda entre versões: j_idt60, j_idt67...)
+    botao = form.find('input', attrs={'type': 'submit', 'value': 'Pesquisar'}) or \
+        form.find('input', attrs={'type': 'submit'})
+
+    render = RENDER_PADRAO
+    if botao is not None:
+        match = re.search(r"mojarra\.ab\(this,event,\\?'[^']*\\?',\\?'[^']*\\?',\\?'([^'\\]+)", botao.get('onclick', ''))
+        if match:
+            render = match.group(1)
+
+    return {
+        'action': form.get('action'),
+        'form_id': form.get('id') or form.get('name'),
+        'campos': extrair_campos_formulario(form),
+        'botao': (botao.get('name') or botao.get('id')) if botao is not None else None,
+        'botao_valor': botao.get('value', '') if botao is not None else '',
+        'render': render
+    }
+
+def montar_payload_pesquisa(formulario, codigo, situacao="TINTO"):
+    """Monta o POST parcial (AJAX) equivalente ao clique em Pesquisar"""
+    payload = dict(formulario['campos'])
+    for campo in ('cor', 'desenho', 'variante'):
+        if campo in payload:
+            payload[campo] = ''
+    payload['produto'] = str(codigo)
+    payload['situacao'] = situacao
+
+    botao = formulario['botao']
+    if botao:
+        payload[botao] = formulario['botao_valor']
+        payload.update({
+            'javax.faces.source': botao,
+            'javax.faces.partial.event': 'click',
+            'javax.faces.partial.execute': f"{botao} {formulario['form_id']}",
+            'javax.faces.partial.render': formulario['render'],
+            'javax.faces.behavior.event': 'action',
+            'javax.faces.partial.ajax': 'true'
+        })
+    return payload
+
+def aplicar_resposta_parcial(html_pagina, xml_resposta):
+    """
+    Aplica um <partial-response> do JSF sobre a página, como o jsf.js faria no navegador.
+    Retorna o HTML resultante.
+    """
+    raiz = ET.fromstring(xml_resposta)
+
+    redirecionamento = raiz.find('.//redirect')
+    if redirecionamento is not None:
+        raise SessaoExpiradaError(f"Redirecionado para {redirecionamento.get('url')}")
+
+    erro = raiz.find('.//error')
+    if erro is not None:
+        mensagem = erro.findtext('error-message') or erro.findtext('error-name') or 'erro JSF'
+        raise Exception(f"Erro na resposta parcial: {mensagem}")
+
+    soup = BeautifulSoup(html_pagina, 'html.parser')
+    for update in raiz.iter('update'):
+        alvo_id = update.get('id', '')
+        conteudo = update.text or ''
+
+        if VIEW_STATE in alvo_id:
+            for campo in soup.find_all('input', attrs={'name': VIEW_STATE}):
+                campo['value'] = conteudo
+            continue
+
+        if alvo_id == 'javax.faces.ViewRoot':
+            soup = BeautifulSoup(conteudo, 'html.parser')
+            continue
+
+        alvo = soup.find(id=alvo_id)
+        if alvo is not None:
+            alvo.replace_with(BeautifulSoup(conteudo, 'html.parser'))
+        else:
+            logger.debug(f"Elemento {alvo_id} não encontrado para update parcial")
+
+    return str(soup)
+
+def contar_linhas_resultado(html):
+    """Quantidade de linhas tr.registro no HTML"""
+    return len(re.findall(r'<tr[^>]*class="[^"]*\bregistro\b', html))
+
+def verificar_produto(html, codigo):
+    """
+    Confere se as linhas de resultado são do produto pesquisado (ProdutoTrocadoError se não).
+    Sem linhas não há o que conferir.
+    """
+    esperado = str(codigo).strip().lstrip('0')
+    encontrados = {c.lstrip('0') for c in PADRAO_PRODUTO_LINHA.findall(html)}
+    if encontrados and encontrados != {esperado}:
+        raise ProdutoTrocadoError(f"Resposta com linhas de {', '.join(sorted(encontrados))} "
+                                  f"na pesquisa do produto {esperado}")
+
+class DGBHttpScraper(DGBScraper):
+    """
+    Alternativa ao DGBScraper sem Chrome: login, ViewState e pesquisa via requests.
+    Retorna o mesmo HTML consumido por parser_dgb.parse_html_dgb_simples.
+    """
+
+    backend = 'http'
+
+    def __init__(self, headless=True, pool_maxsize=10, timeout=30):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.pagina_estoque = None
+        self.url_pagina_estoque = None
+        super().__init__(headless=headless)
+
+    def setup_driver(self):
+        """Sem navegador: apenas a sessão HTTP com pool de conexões"""
+        self.driver = None
+        self.session = criar_sessao_http(self.pool_maxsize)
+
+    def login(self):
+        """Realiza login enviando o formulário da página de login"""
+        try:
+            logger.info("Realizando login (HTTP)...")
+            resposta = self.session.get(self.url_login, timeout=self.timeout)
+            resposta.raise_for_status()
+
+            soup = BeautifulSoup(resposta.text, 'html.parser')
+            campo_login = soup.find('input', id='login')
+            form = campo_login.find_parent('form') if campo_login else None
+            if form is None:
+                logger.error("Formulário de login não encontrado")
+                return False
+
+            payload = extrair_campos_formulario(form)
+            payload[campo_login.get('name', 'login')] = self.usuario
+            campo_senha = form.find('input', id='senha')
+            payload[campo_senha.get('name', 'senha') if campo_senha else 'senha'] = self.senha
+
+            botao = form.find(['button', 'input'], attrs={'type': 'submit'}) or form.find(id='botaoEntrar')
+            if botao is not None and botao.get('name'):
+                payload[botao['name']] = botao.get('value', '')
+
+            url_post = urljoin(resposta.url, form.get('action') or resposta.url)
+            resposta = self.session.post(url_post, data=payload, timeout=self.timeout)
+            resposta.raise_for_status()
+
+            if ("login" not in resposta.url and "logout" not in resposta.url
+                    and 'id="senha"' not in resposta.text):
+                logger.info("Login realizado com sucesso!")
+                return True
+
+            logger.error("Login falhou - ainda na página de login")
+            return False
+
+        except Exception as e:
+            logger.error(f"Erro no login: {e}")
+            return False
+
+    def navigate_to_stock(self):
+        """Carrega a página de estoque e guarda o formulário/ViewState"""
+        try:
+            logger.info("Navegando para página de estoque (HTTP)...")
+            resposta = self.session.get(self.url_estoque, timeout=self.timeout)
+            resposta.raise_for_status()
+
+            if 'id="produto"' not in resposta.text or 'id="senha"' in resposta.text:
+                logger.error("Não conseguiu carregar página de estoque")
+                return False
+
+            self.pagina_estoque = resposta.text
+            self.url_pagina_estoque = resposta.url
+            logger.info("Página de estoque carregada com sucesso!")
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao navegar para estoque: {e}")
+            return False
+
+    def restore_session(self):
+        """Carrega os cookies em cache na sessão HTTP e valida com um GET do estoque"""
+        cookies = self.sessao_cache.load()
+        if not cookies:
+            return False
+
+        logger.info("Reaproveitando sessão em cache (HTTP)...")
+        dominio_padrao = urlparse(self.url_estoque).hostname
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=(cookie.get('domain') or dominio_padrao).lstrip('.'),
+                path=cookie.get('path', '/')
+            )
+
+        if self.navigate_to_stock():
+            logger.info("✅ Sessão em cache válida - login dispensado")
+            self.sessao_reutilizada = True
+            return True
+
+        logger.info("Sessão em cache expirada - novo login necessário")
+        self.sessao_cache.discard()
+        self.session.cookies.clear()
+        return False
+
+    def ensure_session(self):
+        """Garante sessão autenticada, salvando os cookies no mesmo cache do Selenium"""
+        if self.restore_session():
+            return True
+
+        self.sessao_reutilizada = False
+        if not self.login() or not self.navigate_to_stock():
+            return False
+
+        try:
+            self.sessao_cache.save([
+                {
+                    'name': c.name,
+                    'value': c.value,
+                    'domain': c.domain,
+                    'path': c.path,
+                    'secure': bool(c.secure),
+                    'httpOnly': c.has_nonstandard_attr('HttpOnly'),
+                    'expiry': c.expires
+                }
+                for c in self.session.cookies
+            ])
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar a sessão em cache: {e}")
+        return True
+
+    def is_healthy(self):
+        """Sessão HTTP com a página de estoque carregada"""
+        return self.pagina_estoque is not None and 'id="senha"' not in self.pagina_estoque
+
+    def search_product(self, codigo, situacao="TINTO"):
+        """Pesquisa um produto reproduzindo o POST do botão Pesquisar"""
+        try:
+            logger.info(f"Pesquisando produto {codigo} (HTTP)...")
+
+            if self.pagina_estoque is None and not self.navigate_to_stock():
+                raise Exception("Página de estoque indisponível")
+
+            formulario = encontrar_formulario_pesquisa(self.pagina_estoque)
+            if formulario is None or not formulario['botao']:
+                raise BotaoNaoEncontradoError("Botão 'Pesquisar' não encontrado")
+
+            payload = montar_payload_pesquisa(formulario, codigo, situacao)
+            url_post = urljoin(self.url_pagina_estoque, formulario['action'] or self.url_pagina_estoque)
+
+            inicio = time.monotonic()
+            resposta = self.session.post(
+                url_post,
+                data=payload,
+                headers={
+                    'Faces-Request': 'partial/ajax',
+                    'X-Requested-With': 'XMLHttpRequest',
+                    'Referer': self.url_pagina_estoque
+                },
+                timeout=self.timeout
+            )
+            resposta.raise_for_status()
+
+            if '<partial-response' in resposta.text[:500]:
+                html = aplicar_resposta_parcial(self.pagina_estoque, resposta.text)
+            else:
+                html = resposta.text
+                if 'id="senha"' in html:
+                    raise SessaoExpiradaError("Sessão expirada - página de login retornada")
+
+            latencia = time.monotonic() - inicio
+            self.latencias.observe(latencia)
+
+            verificar_produto(html, codigo)
+
+            # A página atualizada (com o novo ViewState) serve de base para a próxima pesquisa
+            self.pagina_estoque = html
+
+            linhas = contar_linhas_resultado(html)
+            estado = 'resultados' if linhas else 'sem_resultados'
+            logger.info(f"✅ {linhas} linhas de resultado em {latencia:.2f}s")
+
+            return {
+                'success': True,
+                'codigo': codigo,
+                'html': html,
+                'estado': estado,
+                'latencia': round(latencia, 3),
+                'timestamp': datetime.now().isoformat()
+            }
+
+        except Exception as e:
+            logger.error(f"Erro ao pesquisar produto {codigo}: {e}")
+            return {
+                'success': False,
+                'codigo': codigo,
+                'error': str(e),
+                'tipo_erro': classificar_excecao(e)
+            }
+
+    def close(self):
+        """Fecha a sessão HTTP"""
+        if self.session:
+            self.session.close()
+            logger.info("Sessão HTTP fechada")
+        liberar_slot(self.slot_sessao)
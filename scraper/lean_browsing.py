@@ -0,0 +1,53 @@
+# lean_browsing.py - Modo "lean browsing": bloqueia imagens, fontes, CSS e analytics no Chrome via CDP
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Padrões aceitos por Network.setBlockedURLs (curinga *)
+PADROES_BLOQUEADOS = [
+    # Imagens
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+    # Fontes
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    # Folhas de estilo (o scraper só lê o DOM de tr.registro)
+    '*.css', '*.css?*', '*.css.jsf*',
+    # Analytics
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*hotjar.com*', '*clarity.ms*', '*facebook.net*'
+]
+
+# Preferências do Chrome que evitam o download de imagens já no perfil
+PREFERENCIAS_LEAN = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.default_content_setting_values.notifications': 2
+}
+
+def get_lean_browsing(valor=None):
+    """Modo lean ligado/desligado (parâmetro ou DGB_LEAN_BROWSING, padrão ligado)"""
+    if valor is None:
+        valor = os.getenv('DGB_LEAN_BROWSING', '1')
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() not in ('0', 'false', 'nao', 'não', 'off', '')
+
+def configurar_opcoes_lean(chrome_options):
+    """Aplica as preferências e flags do modo lean nas opções do Chrome"""
+    chrome_options.add_experimental_option('prefs', PREFERENCIAS_LEAN)
+    chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+    chrome_options.add_argument('--disable-remote-fonts')
+
+def ativar_bloqueio_cdp(driver, padroes=None):
+    """
+    Ativa Network.setBlockedURLs na sessão do driver.
+    Vale para todas as navegações seguintes (login, estoque e pesquisas).
+    """
+    padroes = padroes or PADROES_BLOQUEADOS
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': padroes})
+        logger.info(f"🪶 Lean browsing ativo ({len(padroes)} padrões bloqueados)")
+        return True
+    except Exception as e:
+        logger.warning(f"Não foi possível ativar o bloqueio via CDP: {e}")
+        return False
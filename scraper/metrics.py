@@ -0,0 +1,78 @@
+# metrics.py - Métricas simples de latência para o scraping
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Limites dos baldes do histograma (segundos)
+BALDES_PADRAO = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34)
+
+class LatencyHistogram:
+    """Histograma de latências por produto (thread-safe)"""
+
+    def __init__(self, baldes=BALDES_PADRAO, max_amostras=10000):
+        self.baldes = tuple(baldes)
+        self.max_amostras = max_amostras
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zera todas as contagens"""
+        with self._lock:
+            self.contagens = [0] * (len(self.baldes) + 1)
+            self.amostras = []
+            self.total = 0
+            self.soma = 0.0
+
+    def observe(self, segundos):
+        """Registra uma latência em segundos"""
+        with self._lock:
+            indice = len(self.baldes)
+            for i, limite in enumerate(self.baldes):
+                if segundos <= limite:
+                    indice = i
+                    break
+            self.contagens[indice] += 1
+            self.total += 1
+            self.soma += segundos
+            if len(self.amostras) < self.max_amostras:
+                self.amostras.append(segundos)
+
+    def percentil(self, p):
+        """Retorna o percentil p (0-100) das amostras registradas"""
+        with self._lock:
+            amostras = sorted(self.amostras)
+        if not amostras:
+            return 0.0
+        indice = min(len(amostras) - 1, max(0, int(round(p / 100.0 * (len(amostras) - 1)))))
+        return amostras[indice]
+
+    def to_dict(self):
+        """Resumo serializável em JSON"""
+        with self._lock:
+            contagens = list(self.contagens)
+            total = self.total
+            soma = self.soma
+
+        baldes = {}
+        for limite, quantidade in zip(self.baldes, contagens):
+            baldes[f"<={limite}s"] = quantidade
+        baldes[f">{self.baldes[-1]}s"] = contagens[-1]
+
+        return {
+            'total': total,
+            'soma_s': round(soma, 3),
+            'media_s': round(soma / total, 3) if total else 0.0,
+            'p50_s': round(self.percentil(50), 3),
+            'p95_s': round(self.percentil(95), 3),
+            'baldes': baldes
+        }
+
+    def log_resumo(self, titulo="Latência por produto"):
+        """Escreve o histograma no log"""
+        resumo = self.to_dict()
+        logger.info(f"⏱️  {titulo}: {resumo['total']} amostras, "
+                    f"média {resumo['media_s']}s, p50 {resumo['p50_s']}s, p95 {resumo['p95_s']}s")
+        for balde, quantidade in resumo['baldes'].items():
+            if quantidade:
+                logger.info(f"   {balde:>8}: {'#' * min(quantidade, 50)} {quantidade}")
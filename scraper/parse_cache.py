@@ -0,0 +1,173 @@
+# parse_cache.py - Cache de parse por produto: HTML/linhas inalterados não são parseados de novo
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+from parser_dgb import recortar_resultados
+from registros import linha_csv
+
+logger = logging.getLogger(__name__)
+
+CACHE_FOLDER = os.path.join('cache', 'parse')
+
+# Aumentar quando a saída do parser mudar, para invalidar as entradas antigas
+VERSAO_CACHE = 2
+
+# Tokens que mudam a cada resposta sem que o estoque tenha mudado
+PADROES_VOLATEIS = (
+    re.compile(r'<script\b.*?</script\s*>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<input\b[^>]*javax\.faces\.ViewState[^>]*>', re.IGNORECASE),
+    re.compile(r';jsessionid=[^"\'?#\s]*', re.IGNORECASE),
+)
+PADRAO_ID_JSF = re.compile(r'\bj_id(t?)\d+')
+PADRAO_ESPACOS = re.compile(r'\s+')
+
+def get_parse_cache_ativo(valor=None):
+    """Cache de parse ligado/desligado (parâmetro ou DGB_PARSE_CACHE, padrão ligado)"""
+    if valor is None:
+        valor = os.getenv('DGB_PARSE_CACHE', '1')
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() not in ('0', 'false', 'nao', 'não', 'off', '')
+
+def fragmento_resultados(html):
+    """
+    Trecho normalizado das linhas de resultado (tr.registro até o fim da tabela),
+    sem ViewState, scripts, jsessionid e ids gerados pelo JSF.
+    None se a página não tiver linhas de resultado.
+    """
+    regiao = recortar_resultados(html)
+    if regiao is None:
+        return None
+
+    inicio, fim, _ = regiao
+    fragmento = html[inicio:fim]
+
+    for padrao in PADROES_VOLATEIS:
+        fragmento = padrao.sub('', fragmento)
+    fragmento = PADRAO_ID_JSF.sub(r'j_id\1', fragmento)
+    return PADRAO_ESPACOS.sub(' ', fragmento).strip()
+
+def chave_resultado(resultado):
+    """Hash do conteúdo parseável de um resultado de pesquisa (None se não houver)"""
+    if 'linhas' in resultado:
+        # A extração no navegador já descarta tudo o que não é dado
+        origem = 'json'
+        conteudo = json.dumps(resultado['linhas'], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    elif resultado.get('html'):
+        origem = 'html'
+        conteudo = fragmento_resultados(resultado['html'])
+        if conteudo is None:
+            return None
+    else:
+        return None
+
+    base = f"{VERSAO_CACHE}|{resultado.get('codigo')}|{origem}|{conteudo}"
+    return hashlib.sha256(base.encode('utf-8')).hexdigest()
+
+class ParseCache:
+    """
+    Um arquivo JSON por produto em cache/parse com a chave do último resultado,
+    os registros parseados e o CSV gravado a partir deles.
+    """
+
+    def __init__(self, pasta=CACHE_FOLDER):
+        self.pasta = pasta
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _caminho(self, produto):
+        nome = re.sub(r'[^\w.-]', '_', str(produto))
+        return os.path.join(self.pasta, f"{nome}.json")
+
+    def _carregar(self, produto):
+        """Entrada do produto (memória, depois disco); chamar com o lock"""
+        produto = str(produto)
+        if produto not in self._entradas:
+            entrada = None
+            try:
+                with open(self._caminho(produto), 'r', encoding='utf-8') as f:
+                    entrada = json.load(f)
+            except FileNotFoundError:
+                pass
+            except (ValueError, OSError) as e:
+                logger.warning(f"Cache de parse inválido para {produto}, descartando: {e}")
+            self._entradas[produto] = entrada
+        return self._entradas[produto]
+
+    def _salvar(self, produto, entrada):
+        """Grava a entrada de forma atômica; chamar com o lock"""
+        os.makedirs(self.pasta, exist_ok=True)
+        caminho = self._caminho(produto)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(entrada, f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+        self._entradas[str(produto)] = entrada
+
+    def get(self, produto, chave):
+        """Entrada em cache se a chave for a mesma do último resultado; senão None"""
+        with self._lock:
+            entrada = self._carregar(produto) if chave else None
+            if entrada and entrada.get('chave') == chave:
+                self.hits += 1
+                return entrada
+            self.misses += 1
+            return None
+
+    def put(self, produto, chave, registros, csv_file):
+        """Guarda os registros e o CSV de um resultado recém-parseado"""
+        entrada = {
+            'produto': str(produto),
+            'chave': chave,
+            'csv_file': csv_file,
+            'registros': [linha_csv(r) for r in registros],
+            'atualizado_em': datetime.now().isoformat()
+        }
+        with self._lock:
+            self._salvar(produto, entrada)
+
+    def update_csv(self, produto, csv_file):
+        """Aponta a entrada para um CSV regravado (o anterior foi apagado)"""
+        with self._lock:
+            entrada = self._carregar(produto)
+            if entrada:
+                self._salvar(produto, dict(entrada, csv_file=csv_file))
+
+    def clear(self):
+        """Remove todas as entradas; retorna quantas havia em disco"""
+        with self._lock:
+            total = len([f for f in os.listdir(self.pasta) if f.endswith('.json')]) \
+                if os.path.exists(self.pasta) else 0
+            if os.path.exists(self.pasta):
+                shutil.rmtree(self.pasta)
+            self._entradas = {}
+        return total
+
+    def to_dict(self):
+        """Contadores de hits/misses desde o início do processo"""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'taxa_hits': round(self.hits / consultas, 3) if consultas else 0.0
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_parse_cache():
+    """Cache padrão (cache/parse), compartilhado pelos workers de parse"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ParseCache()
+        return _cache
@@ -3,11 +3,74 @@ import re
 import csv
 import os
 from datetime import datetime
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution
+from bs4.element import NavigableString, CData
 import logging
 
+from registros import RegistroEstoque, PRONTA_ENTREGA
+from estrategias_cor import ESTRATEGIAS, get_cor_aprendida, get_estrategias_cor
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
 logger = logging.getLogger(__name__)
 
+MOTOR_LXML = 'lxml'
+MOTOR_BS4 = 'bs4'
+
+def get_motor_parser(valor=None):
+    """Motor do parser de HTML: 'lxml' (padrão, se instalado) ou 'bs4', via DGB_PARSER_ENGINE"""
+    motor = (valor or os.getenv('DGB_PARSER_ENGINE', MOTOR_LXML)).strip().lower()
+    if motor not in (MOTOR_LXML, MOTOR_BS4):
+        logger.warning(f"Motor de parser desconhecido '{motor}', usando {MOTOR_LXML}")
+        motor = MOTOR_LXML
+    if motor == MOTOR_LXML and lxml_html is None:
+        motor = MOTOR_BS4
+    return motor
+
+def _xpath_classe(tag, classe):
+    return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {classe} ')]"
+
+if lxml_html is not None:
+    # Mesmos seletores do BeautifulSoup (class_ casa com qualquer uma das classes)
+    XPATH_LINHAS = etree.XPath(_xpath_classe('tr', 'registro'))
+    XPATH_CONTAINER = etree.XPath(f"({_xpath_classe('div', 'container-3-x')})[1]")
+    XPATH_DIVS = etree.XPath('.//div')
+    XPATH_NEGRITOS = etree.XPath('.//b')
+    XPATH_SPANS_REGISTRO = etree.XPath(_xpath_classe('span', 'registro'))
+    XPATH_SPANS = etree.XPath('.//span')
+
+# Tags cujo texto (inclusive dos descendentes) o BeautifulSoup não devolve em get_text()
+TAGS_SEM_TEXTO = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+
+# Únicos tipos de string considerados por get_text() em tr/div/span
+TIPOS_TEXTO_BS4 = (NavigableString, CData)
+
+# Região de resultados: da primeira linha tr.registro até o fim da tabela da última.
+# Menus, scripts e layout fora dela nem chegam a ser tokenizados.
+PADRAO_INICIO_LINHA = re.compile(r'<tr\b[^>]*\bclass=["\'][^"\']*\bregistro\b', re.IGNORECASE)
+PADRAO_FIM_TABELA = re.compile(r'</table\s*>', re.IGNORECASE)
+SO_LINHAS_REGISTRO = SoupStrainer('tr', class_='registro')
+
+# Referências que o libxml2 e o BeautifulSoup convertem de formas diferentes
+PADRAO_REFERENCIA = re.compile(r'&(?:#([xX][0-9a-fA-F]+|[0-9]+)|([a-zA-Z][a-zA-Z0-9]*));')
+
+# Padrões compilados uma única vez (usados em todas as linhas de todos os produtos)
+PADRAO_NOME_PRODUTO = re.compile(r'^(\d{5,6})\s*(.+)$')
+PADRAO_CODIGO_COR = re.compile(r'^\d{5}\s+')
+PADRAO_TAG = re.compile(r'<[^>]+>')
+PADRAO_COR_ALTERNATIVA = re.compile(r'\s(\d+)\s*-\s*([A-Z\s\-]+[A-Z])')
+PADRAO_COR_TEXTO = re.compile(r'(\d+\s*-\s*[A-Z][A-Z\s\-]+)')
+PADRAO_DADOS_TEXTO = re.compile(r'(\d{2}/\d{2}/\d{4}|Pronta entrega)\s+([\d\.,]+)\s+([\d\.,]+)\s+([\d\.,]+)')
+PADRAO_VALOR_BR = re.compile(r'^\d{1,3}(?:\.\d{3})*,\d{2}$')
+PADRAO_CODIGO_INICIAL = re.compile(r'^\d{5}\s*')
+
 def parse_html_dgb_simples(html_content, produto_codigo):
     """Parser DIRETO - extração simples de cor"""
     registros = []
@@ -71,20 +134,22 @@ def extrair_nome_produto_formatado(elemento):
         
         linhas = container.find_all('div')
         if len(linhas) > 0:
-            texto = linhas[0].get_text(strip=True)
-            match = re.match(r'^(\d{5,6})\s*(.+)$', texto)
-            if match:
-                codigo = match.group(1).strip()
-                nome = match.group(2).strip()
-                return f"{codigo} - {nome}"
-            else:
-                return ' '.join(texto.split())
+            return formatar_nome_produto(linhas[0].get_text(strip=True))
         
         return f"Produto"
         
     except:
         return f"Produto"
 
+def formatar_nome_produto(texto):
+    """Formata o texto da 1ª linha do container (ex: 000014VELUDO -> 000014 - VELUDO)"""
+    match = PADRAO_NOME_PRODUTO.match(texto)
+    if match:
+        codigo = match.group(1).strip()
+        nome = match.group(2).strip()
+        return f"{codigo} - {nome}"
+    return ' '.join(texto.split())
+
 def extrair_cor_direto(elemento):
     """Extrai COR de forma DIRETA - remove código numérico"""
     try:
@@ -94,32 +159,35 @@ def extrair_cor_direto(elemento):
         
         linhas = container.find_all('div')
         if len(linhas) > 1:
-            linha_cor = linhas[1]
-            texto_completo = linha_cor.get_text(strip=True)
-            
-            # MÉTODO DIRETO: Pegar tudo após o último "/"
-            if '/' in texto_completo:
-                partes = texto_completo.split('/')
-                if len(partes) > 1:
-                    parte_cor = partes[1].strip()  # Ex: "00005 5 - BLACK"
-                    
-                    # REMOVER o código numérico de 5 dígitos no início
-                    # Padrão: 5 dígitos seguidos de espaço
-                    parte_cor = re.sub(r'^\d{5}\s+', '', parte_cor)
-                    
-                    # Também remover se tiver tags <b>
-                    parte_cor = re.sub(r'<[^>]+>', '', parte_cor)
-                    
-                    # Limpar espaços extras
-                    parte_cor = ' '.join(parte_cor.split())
-                    
-                    return parte_cor
+            return cor_do_texto(linhas[1].get_text(strip=True))
         
         return ""
         
     except:
         return ""
 
+def cor_do_texto(texto_completo):
+    """Cor a partir do texto da 2ª linha do container (método direto)"""
+    # MÉTODO DIRETO: Pegar tudo após o último "/"
+    if '/' in texto_completo:
+        partes = texto_completo.split('/')
+        if len(partes) > 1:
+            parte_cor = partes[1].strip()  # Ex: "00005 5 - BLACK"
+            
+            # REMOVER o código numérico de 5 dígitos no início
+            # Padrão: 5 dígitos seguidos de espaço
+            parte_cor = PADRAO_CODIGO_COR.sub('', parte_cor)
+            
+            # Também remover se tiver tags <b>
+            parte_cor = PADRAO_TAG.sub('', parte_cor)
+            
+            # Limpar espaços extras
+            parte_cor = ' '.join(parte_cor.split())
+            
+            return parte_cor
+    
+    return ""
+
 def extrair_cor_alternativo(elemento):
     """Método ALTERNATIVO - busca pelo padrão específico"""
     try:
@@ -140,22 +208,32 @@ def extrair_cor_alternativo(elemento):
             
             if len(tags_b) >= 2:
                 # Pegar todo o texto da linha
-                texto_completo = linha_cor.get_text(strip=True)
-                
-                # Procurar pelo padrão: número - NOME (ex: 5 - BLACK)
-                # O padrão é: espaço, número, espaço, hífen, espaço, letras maiúsculas
-                match = re.search(r'\s(\d+)\s*-\s*([A-Z\s\-]+[A-Z])', texto_completo)
-                
-                if match:
-                    numero = match.group(1).strip()
-                    nome = match.group(2).strip()
-                    return f"{numero} - {nome}"
+                return cor_alternativa_do_texto(linha_cor.get_text(strip=True))
         
         return ""
         
     except:
         return ""
 
+def cor_alternativa_do_texto(texto_completo):
+    """Cor pelo padrão "número - NOME" (ex: 5 - BLACK) no texto da linha de cor"""
+    # O padrão é: espaço, número, espaço, hífen, espaço, letras maiúsculas
+    match = PADRAO_COR_ALTERNATIVA.search(texto_completo)
+    
+    if match:
+        numero = match.group(1).strip()
+        nome = match.group(2).strip()
+        return f"{numero} - {nome}"
+    
+    return ""
+
+def cor_do_texto_completo(texto_completo):
+    """Último recurso: padrão de cor em qualquer parte do texto do registro"""
+    match = PADRAO_COR_TEXTO.search(texto_completo)
+    if match:
+        return match.group(1).strip()
+    return ""
+
 def extrair_dados_da_linha(elemento):
     """Extrai dados de estoque, pedidos, disponível"""
     dados = []
@@ -163,19 +241,14 @@ def extrair_dados_da_linha(elemento):
     try:
         spans_registro = elemento.find_all('span', class_='registro')
         
+        valores = []
         for span in spans_registro:
             spans_internos = span.find_all('span')
             
             if len(spans_internos) >= 4:
-                dado = {
-                    'previsao': spans_internos[0].get_text(strip=True),
-                    'estoque': spans_internos[1].get_text(strip=True),
-                    'pedidos': spans_internos[2].get_text(strip=True),
-                    'disponivel': spans_internos[3].get_text(strip=True)
-                }
-                
-                if any(is_numeric(v) for k, v in dado.items() if k != 'previsao'):
-                    dados.append(dado)
+                valores.append([s.get_text(strip=True) for s in spans_internos[:4]])
+        
+        dados = dados_dos_valores(valores)
         
         if not dados:
             texto = elemento.get_text(separator=' ')
@@ -186,13 +259,30 @@ def extrair_dados_da_linha(elemento):
     
     return dados
 
+def dados_dos_valores(valores):
+    """
+    Converte [previsão, estoque, pedidos, disponível] (textos dos spans internos)
+    em dicts, descartando linhas sem nenhum valor numérico.
+    """
+    dados = []
+    for previsao, estoque, pedidos, disponivel in valores:
+        dado = {
+            'previsao': previsao,
+            'estoque': estoque,
+            'pedidos': pedidos,
+            'disponivel': disponivel
+        }
+        
+        if any(is_numeric(v) for k, v in dado.items() if k != 'previsao'):
+            dados.append(dado)
+    return dados
+
 def extrair_dados_do_texto(texto):
     """Extrai dados do texto"""
     dados = []
     
     try:
-        padrao = r'(\d{2}/\d{2}/\d{4}|Pronta entrega)\s+([\d\.,]+)\s+([\d\.,]+)\s+([\d\.,]+)'
-        matches = re.findall(padrao, texto)
+        matches = PADRAO_DADOS_TEXTO.findall(texto)
         
         for match in matches:
             if len(match) == 4:
@@ -225,7 +315,7 @@ def formatar_valor(valor):
         
         valor = str(valor).strip()
         
-        if re.match(r'^\d{1,3}(?:\.\d{3})*,\d{2}$', valor):
+        if PADRAO_VALOR_BR.match(valor):
             return valor
         
         if '.' in valor and ',' in valor:
@@ -250,72 +340,577 @@ def formatar_valor(valor):
         return "0,00"
 
 # Função principal atualizada para usar ambos os métodos
-def parse_html_dgb_simples(html_content, produto_codigo):
-    """Parser principal que tenta múltiplos métodos"""
+def parse_html_dgb_simples(html_content, produto_codigo, timestamp=None, motor=None):
+    """Parser principal: lxml (rápido) com o BeautifulSoup como alternativa"""
+    timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    if get_motor_parser(motor) == MOTOR_LXML:
+        try:
+            linhas = extrair_linhas_lxml(html_content)
+        except Exception as e:
+            logger.warning(f"lxml não conseguiu ler o HTML de {produto_codigo} ({str(e)[:100]}) - usando BeautifulSoup")
+        else:
+            return parse_linhas_extraidas(linhas, produto_codigo, timestamp, origem='lxml')
+    
+    return parse_html_bs4(html_content, produto_codigo, timestamp)
+
+def parse_html_bs4(html_content, produto_codigo, timestamp=None):
+    """Parser sobre a árvore do BeautifulSoup (alternativa ao lxml)"""
+    timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    artigo = str(produto_codigo).lstrip('0')
+    
+    try:
+        linhas = extrair_linhas_bs4(html_content)
+    except Exception as e:
+        logger.error(f"Erro no parser para {produto_codigo}: {str(e)[:100]}")
+        return [RegistroEstoque.vazio(artigo, timestamp, f"Produto {artigo} - Erro", "Erro")]
+    
+    return parse_linhas_extraidas(linhas, produto_codigo, timestamp, origem='BeautifulSoup')
+
+def extrair_linhas_bs4(html_content, recortar=True):
+    """
+    Linhas tr.registro pelo BeautifulSoup. Com recortar, só a região de resultados
+    é tokenizada e a árvore só contém as linhas (SoupStrainer); qualquer falha
+    ou divergência na quantidade de linhas cai no parse completo.
+    """
+    if 'registro' not in html_content:
+        return []
+    
+    if recortar:
+        try:
+            regiao = recortar_resultados(html_content)
+            if regiao:
+                inicio, fim, quantidade = regiao
+                soup = BeautifulSoup(html_content[inicio:fim], 'html.parser', parse_only=SO_LINHAS_REGISTRO)
+                registros = soup.find_all('tr', class_='registro')
+                if len(registros) == quantidade:
+                    return [extrair_linha_bs4(registro) for registro in registros]
+                logger.debug(f"Recorte com {len(registros)} de {quantidade} linhas - parse completo")
+        except Exception as e:
+            logger.debug(f"Falha no parse recortado ({str(e)[:100]}) - parse completo")
+    
+    soup = BeautifulSoup(html_content, 'html.parser')
+    return [extrair_linha_bs4(registro) for registro in soup.find_all('tr', class_='registro')]
+
+def extrair_linha_bs4(registro):
+    """
+    Visita a subárvore de um tr.registro uma única vez e devolve os mesmos campos
+    de extrair_linhas_lxml: textos do container (nome e cor), <b> da linha de cor,
+    spans de valores e o texto da linha inteira.
+    """
+    textos = []
+    textos_divs = []
+    spans_registro = []
+    estado = {'container': False, 'divs': 0, 'negritos': 0}
+    
+    def visitar(no, coletores, no_container, na_div_cor, spans_ativos):
+        for filho in no.children:
+            if isinstance(filho, NavigableString):
+                if type(filho) in TIPOS_TEXTO_BS4:
+                    for coletor in coletores:
+                        coletor.append(filho)
+                continue
+            
+            nome = filho.name
+            filhos_coletores = coletores
+            filhos_no_container = no_container
+            filhos_na_div_cor = na_div_cor
+            filhos_spans = spans_ativos
+            
+            if nome == 'div':
+                if no_container:
+                    # container.find_all('div'): só as duas primeiras interessam
+                    estado['divs'] += 1
+                    if estado['divs'] <= 2:
+                        coletor = []
+                        textos_divs.append(coletor)
+                        filhos_coletores = coletores + [coletor]
+                        filhos_na_div_cor = na_div_cor or estado['divs'] == 2
+                elif not estado['container'] and 'container-3-x' in (filho.get('class') or ()):
+                    estado['container'] = True
+                    filhos_no_container = True
+            elif nome == 'b':
+                if na_div_cor:
+                    estado['negritos'] += 1
+            elif nome == 'span':
+                # span.find_all('span'): cada span é interno de todos os span.registro acima dele
+                for internos in spans_ativos:
+                    coletor = []
+                    internos.append(coletor)
+                    filhos_coletores = filhos_coletores + [coletor]
+                if 'registro' in (filho.get('class') or ()):
+                    internos = []
+                    spans_registro.append(internos)
+                    filhos_spans = spans_ativos + [internos]
+            
+            visitar(filho, filhos_coletores, filhos_no_container, filhos_na_div_cor, filhos_spans)
+    
+    visitar(registro, [textos], False, False, [])
+    
+    def colado(partes):
+        return ''.join(t.strip() for t in partes)
+    
+    return {
+        'container': estado['container'],
+        'divs': [colado(partes) for partes in textos_divs],
+        'negritos_cor': estado['negritos'],
+        'texto': colado(textos),
+        'texto_espacado': ' '.join(textos),
+        'valores': [[colado(partes) for partes in internos[:4]] for internos in spans_registro if len(internos) >= 4]
+    }
+
+def montar_registros(artigo, timestamp, nome_produto, descricao_cor, dados):
+    """RegistroEstoque de um tr.registro (valores em centavos, previsão como data)"""
+    # Criar descrição
+    if descricao_cor:
+        # Limpar ainda mais: remover qualquer código no início
+        descricao_cor = PADRAO_CODIGO_INICIAL.sub('', descricao_cor)
+        descricao = f"{nome_produto} - COR: {descricao_cor}"
+    else:
+        descricao = nome_produto
+    
+    return [
+        RegistroEstoque.de_textos(
+            artigo,
+            timestamp,
+            descricao[:150],
+            dado.get('previsao', PRONTA_ENTREGA),
+            dado.get('estoque', '0,00'),
+            dado.get('pedidos', '0,00'),
+            dado.get('disponivel', '0,00')
+        )
+        for dado in dados
+    ]
+
+def _textos_lxml(elemento, partes):
+    """Nós de texto em ordem de documento, como os strings de BeautifulSoup.get_text()"""
+    if not isinstance(elemento.tag, str) or elemento.tag in TAGS_SEM_TEXTO:
+        return partes
+    if elemento.text:
+        partes.append(elemento.text)
+    for filho in elemento:
+        _textos_lxml(filho, partes)
+        if filho.tail:
+            partes.append(filho.tail)
+    return partes
+
+def _texto_colado_lxml(elemento):
+    """Equivalente a get_text(strip=True)"""
+    return ''.join(t.strip() for t in _textos_lxml(elemento, []))
+
+def recortar_resultados(html_content):
+    """
+    (início, fim, quantidade de linhas) da região de resultados no HTML,
+    ou None se não houver nenhuma linha tr.registro.
+    """
+    linhas = list(PADRAO_INICIO_LINHA.finditer(html_content))
+    if not linhas:
+        return None
+    fim = PADRAO_FIM_TABELA.search(html_content, linhas[-1].end())
+    return linhas[0].start(), fim.end() if fim else len(html_content), len(linhas)
+
+def _referencia_divergente(html_content):
+    """
+    True se houver &#128;..&#159; (o BeautifulSoup lê como windows-1252) ou
+    entidade desconhecida (o BeautifulSoup descarta o ';') no HTML
+    """
+    for match in PADRAO_REFERENCIA.finditer(html_content):
+        numero, nome = match.groups()
+        if numero:
+            codigo = int(numero[1:], 16) if numero[0] in 'xX' else int(numero)
+            if 128 <= codigo <= 159:
+                return True
+        elif nome not in EntitySubstitution.HTML_ENTITY_TO_CHARACTER:
+            return True
+    return False
+
+def extrair_linhas_lxml(html_content, recortar=True):
+    """
+    Linhas tr.registro no mesmo formato de extracao_dgb.JS_EXTRAIR_LINHAS,
+    usando lxml.html e XPath pré-compilado. Com recortar, só a região de
+    resultados é parseada; se ela não bater com a página, parse completo.
+    """
+    if 'registro' not in html_content:
+        return []
+    if _referencia_divergente(html_content):
+        raise ValueError('referências de caractere que o lxml converte de outra forma')
+    
+    if recortar:
+        try:
+            regiao = recortar_resultados(html_content)
+            if regiao:
+                inicio, fim, quantidade = regiao
+                # A <table> externa evita que o libxml2 descarte <tr> fora de tabela
+                trecho = f"<html><body><table>{html_content[inicio:fim]}</table></body></html>"
+                linhas = _linhas_lxml(lxml_html.document_fromstring(trecho))
+                if len(linhas) == quantidade:
+                    return linhas
+                logger.debug(f"Recorte com {len(linhas)} de {quantidade} linhas - parse completo")
+        except Exception as e:
+            logger.debug(f"Falha no parse recortado ({str(e)[:100]}) - parse completo")
+    
+    return _linhas_lxml(lxml_html.document_fromstring(html_content))
+
+class LinhaLxml(dict):
+    """
+    Linha de _linhas_lxml. O texto da linha inteira e os <b> da linha de cor só
+    são lidos da árvore quando pedidos (estratégia de cor 'texto'/'alternativo'
+    ou valores fora dos spans): no caso comum a linha custa uma visita ao container
+    e aos spans, sem percorrer o tr inteiro.
+    """
+    __slots__ = ('tr', 'div_cor')
+    
+    def __init__(self, tr, div_cor, **campos):
+        super().__init__(**campos)
+        self.tr = tr
+        self.div_cor = div_cor
+    
+    def __missing__(self, chave):
+        if chave in ('texto', 'texto_espacado'):
+            textos = _textos_lxml(self.tr, [])
+            self['texto'] = ''.join(t.strip() for t in textos)
+            self['texto_espacado'] = ' '.join(textos)
+        elif chave == 'negritos_cor':
+            self['negritos_cor'] = len(XPATH_NEGRITOS(self.div_cor)) if self.div_cor is not None else 0
+        else:
+            raise KeyError(chave)
+        return self[chave]
+
+def _linhas_lxml(documento):
+    linhas = []
+    for tr in XPATH_LINHAS(documento):
+        container = XPATH_CONTAINER(tr)
+        divs = XPATH_DIVS(container[0]) if container else []
+        
+        valores = []
+        for span in XPATH_SPANS_REGISTRO(tr):
+            internos = XPATH_SPANS(span)
+            if len(internos) >= 4:
+                valores.append([_texto_colado_lxml(s) for s in internos[:4]])
+        
+        linhas.append(LinhaLxml(
+            tr, divs[1] if len(divs) > 1 else None,
+            container=bool(container),
+            divs=[_texto_colado_lxml(d) for d in divs[:2]],
+            valores=valores
+        ))
+    return linhas
+
+ESPACOS_ASCII = '\x20\x0a\x09\x0c\x0d'
+TAGS_VAZIAS = frozenset(HTMLTreeBuilder.empty_element_tags)
+TAGS_PRESERVAM_ESPACOS = frozenset(HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS)
+
+class _LinhaStream:
+    """Campos de um tr.registro acumulados evento a evento (mesmos de extrair_linha_bs4)"""
+    
+    def __init__(self):
+        self.textos = []
+        self.textos_divs = []
+        self.spans_registro = []
+        self.container = False
+        self.divs = 0
+        self.negritos = 0
+    
+    def contexto_raiz(self):
+        # (coletores de texto, dentro do container, dentro da linha de cor, span.registro abertos)
+        return ([self.textos], False, False, ())
+    
+    def contexto_filho(self, contexto, nome, classes):
+        """Contexto de uma tag aberta dentro da linha (mesmas regras de extrair_linha_bs4)"""
+        coletores, no_container, na_div_cor, spans_ativos = contexto
+        if nome == 'div':
+            if no_container:
+                self.divs += 1
+                if self.divs <= 2:
+                    coletor = []
+                    self.textos_divs.append(coletor)
+                    return (coletores + [coletor], True, na_div_cor or self.divs == 2, spans_ativos)
+            elif not self.container and 'container-3-x' in classes:
+                self.container = True
+                return (coletores, True, na_div_cor, spans_ativos)
+        elif nome == 'b':
+            if na_div_cor:
+                self.negritos += 1
+        elif nome == 'span':
+            for internos in spans_ativos:
+                coletor = []
+                internos.append(coletor)
+                coletores = coletores + [coletor]
+            if 'registro' in classes:
+                internos = []
+                self.spans_registro.append(internos)
+                spans_ativos = spans_ativos + (internos,)
+            return (coletores, no_container, na_div_cor, spans_ativos)
+        return contexto
+    
+    def to_dict(self):
+        def colado(partes):
+            return ''.join(t.strip() for t in partes)
+        
+        return {
+            'container': self.container,
+            'divs': [colado(partes) for partes in self.textos_divs],
+            'negritos_cor': self.negritos,
+            'texto': colado(self.textos),
+            'texto_espacado': ' '.join(self.textos),
+            'valores': [[colado(p) for p in internos[:4]] for internos in self.spans_registro if len(internos) >= 4]
+        }
+
+class ParserLinhasStream(HTMLParser):
+    """
+    Tokenizador incremental (html.parser, o mesmo usado pelo BeautifulSoup) que
+    entrega cada tr.registro assim que ele fecha, sem montar a árvore do documento.
+    Segue as regras do BeautifulSoup: fechamento pela tag aberta mais recente de
+    mesmo nome, tags vazias, entidades e strings de script/style/template ignoradas.
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        # Cada item: [nome da tag, linha iniciada nela (ou None), [(linha, contexto), ...]]
+        self.pilha = []
+        self.abertas = {}
+        self.sem_texto = 0
+        self.preservar_espacos = 0
+        self.dados = []
+        self.prontas = []
+    
+    def _estados(self):
+        return self.pilha[-1][2] if self.pilha else []
+    
+    def _fim_dados(self, texto_incluido=True):
+        """Fecha o texto acumulado desde o último evento (como BeautifulSoup.endData)"""
+        if not self.dados:
+            return
+        texto = ''.join(self.dados)
+        self.dados = []
+        if not self.preservar_espacos and not texto.strip(ESPACOS_ASCII):
+            texto = '\n' if '\n' in texto else ' '
+        if texto_incluido and not self.sem_texto:
+            for _, (coletores, _, _, _) in self._estados():
+                for coletor in coletores:
+                    coletor.append(texto)
+    
+    def handle_starttag(self, nome, atributos):
+        self._fim_dados()
+        classes = ()
+        for chave, valor in atributos:
+            if chave == 'class':
+                classes = (valor or '').split()
+        
+        estados = [(linha, linha.contexto_filho(contexto, nome, classes)) for linha, contexto in self._estados()]
+        nova = None
+        if nome == 'tr' and 'registro' in classes:
+            nova = _LinhaStream()
+            estados.append((nova, nova.contexto_raiz()))
+        
+        if nome in TAGS_VAZIAS:
+            # Sem filhos: a linha (improvável) já nasce fechada
+            if nova is not None:
+                self.prontas.append(nova.to_dict())
+            return
+        
+        self.pilha.append([nome, nova, estados])
+        self.abertas[nome] = self.abertas.get(nome, 0) + 1
+        if nome in TAGS_SEM_TEXTO:
+            self.sem_texto += 1
+        if nome in TAGS_PRESERVAM_ESPACOS:
+            self.preservar_espacos += 1
+    
+    def handle_endtag(self, nome):
+        self._fim_dados()
+        if not self.abertas.get(nome):
+            return
+        while self.pilha:
+            if self._desempilhar() == nome:
+                break
+    
+    def _desempilhar(self):
+        nome, linha, _ = self.pilha.pop()
+        self.abertas[nome] -= 1
+        if nome in TAGS_SEM_TEXTO:
+            self.sem_texto -= 1
+        if nome in TAGS_PRESERVAM_ESPACOS:
+            self.preservar_espacos -= 1
+        if linha is not None:
+            self.prontas.append(linha.to_dict())
+        return nome
+    
+    def handle_data(self, dados):
+        self.dados.append(dados)
+    
+    def handle_charref(self, nome):
+        # Mesma conversão do BeautifulSoup (referências < 256 como windows-1252)
+        codigo = int(nome.lstrip('xX'), 16) if nome[:1] in ('x', 'X') else int(nome)
+        texto = None
+        if codigo < 256:
+            try:
+                texto = bytearray([codigo]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not texto:
+            try:
+                texto = chr(codigo)
+            except (ValueError, OverflowError):
+                pass
+        self.dados.append(texto or '\N{REPLACEMENT CHARACTER}')
+    
+    def handle_entityref(self, nome):
+        caractere = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(nome)
+        self.dados.append(caractere if caractere is not None else f'&{nome}')
+    
+    def handle_comment(self, dados):
+        self._fim_dados()
+    
+    def handle_decl(self, dados):
+        self._fim_dados()
+    
+    def handle_pi(self, dados):
+        self._fim_dados()
+    
+    def unknown_decl(self, dados):
+        self._fim_dados()
+        if dados.upper().startswith('CDATA['):
+            # <![CDATA[...]]> vira CData, que conta como texto
+            self.dados.append(dados[len('CDATA['):])
+            self._fim_dados()
+    
+    def close(self):
+        super().close()
+        self._fim_dados()
+        while self.pilha:
+            self._desempilhar()
+    
+    def linhas_prontas(self):
+        """Linhas fechadas desde a última chamada"""
+        prontas, self.prontas = self.prontas, []
+        return prontas
+
+def iterar_linhas_html(html_content, bloco=65536):
+    """Gera as linhas tr.registro à medida que o HTML é tokenizado, em blocos de `bloco` caracteres"""
+    if 'registro' not in html_content:
+        return
+    
+    # Só a região de resultados é tokenizada, como em extrair_linhas_bs4
+    regiao = recortar_resultados(html_content)
+    inicio, fim = (regiao[0], regiao[1]) if regiao else (0, len(html_content))
+    
+    parser = ParserLinhasStream()
+    for posicao in range(inicio, fim, bloco):
+        parser.feed(html_content[posicao:min(posicao + bloco, fim)])
+        yield from parser.linhas_prontas()
+    parser.close()
+    yield from parser.linhas_prontas()
+
+def iterar_registros_html(html_content, produto_codigo, timestamp=None):
+    """
+    Versão em streaming de parse_html_dgb_simples: gera um registro por linha de
+    previsão assim que o tr.registro correspondente fecha, para o CSV ser escrito
+    sem materializar a lista inteira.
+    """
+    timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    artigo = str(produto_codigo).lstrip('0')
+    total = 0
+    
+    try:
+        for linha in iterar_linhas_html(html_content):
+            for registro in registros_da_linha(linha, artigo, timestamp):
+                total += 1
+                yield registro
+    except Exception as e:
+        logger.error(f"Erro no parser para {produto_codigo}: {str(e)[:100]}")
+        if not total:
+            yield RegistroEstoque.vazio(artigo, timestamp, f"Produto {artigo} - Erro", "Erro")
+        return
+    
+    if not total:
+        logger.warning(f"Nenhum dado extraído para produto {produto_codigo}")
+        yield RegistroEstoque.vazio(artigo, timestamp, f"Produto {artigo} - Sem dados", "N/A")
+        total = 1
+    
+    logger.info(f"Total de registros para {produto_codigo}: {total} (streaming)")
+
+def _cor_direto(linha, divs):
+    return cor_do_texto(divs[1]) if len(divs) > 1 else ""
+
+def _cor_alternativo(linha, divs):
+    if len(divs) > 1 and linha['negritos_cor'] >= 2:
+        return cor_alternativa_do_texto(divs[1])
+    return ""
+
+def _cor_texto(linha, divs):
+    return cor_do_texto_completo(linha['texto'])
+
+# Estratégias de cor por nome (estrategias_cor.ESTRATEGIAS é a ordem original)
+ESTRATEGIAS_COR = {
+    'direto': _cor_direto,
+    'alternativo': _cor_alternativo,
+    'texto': _cor_texto
+}
+
+def cor_da_linha(linha, divs, artigo):
+    """
+    Primeira cor não vazia entre as estratégias, na ordem aprendida para o produto
+    (a estratégia que costuma acertar primeiro; as outras só se ela falhar).
+    """
+    estrategias = get_estrategias_cor() if get_cor_aprendida() else None
+    ordem = estrategias.ordem(artigo) if estrategias else ESTRATEGIAS
+    
+    tentadas = []
+    descricao_cor = ""
+    for nome in ordem:
+        descricao_cor = ESTRATEGIAS_COR[nome](linha, divs)
+        tentadas.append((nome, bool(descricao_cor)))
+        if descricao_cor:
+            break
+    
+    if estrategias:
+        estrategias.registrar(artigo, tentadas)
+    return descricao_cor
+
+def salvar_estrategias_cor():
+    """Persiste as taxas de acerto das estratégias de cor; uma vez ao fim de cada execução, não por página"""
+    if get_cor_aprendida():
+        get_estrategias_cor().salvar(forcar=True)
+
+def registros_da_linha(linha, artigo, timestamp):
+    """Nome, cor (estratégias direto, alternativo e texto completo) e valores de uma linha extraída"""
+    divs = linha['divs'] if linha['container'] else []
+    nome_produto = formatar_nome_produto(divs[0]) if divs else "Produto"
+    
+    descricao_cor = cor_da_linha(linha, divs, artigo)
+    
+    dados = dados_dos_valores(linha['valores'])
+    if not dados:
+        dados = extrair_dados_do_texto(linha['texto_espacado'])
+    
+    return montar_registros(artigo, timestamp, nome_produto, descricao_cor, dados)
+
+def parse_linhas_extraidas(linhas, produto_codigo, timestamp=None, origem='extração no navegador'):
+    """
+    Mesmo resultado de parse_html_dgb_simples, a partir das linhas já extraídas
+    no navegador (extracao_dgb.JS_EXTRAIR_LINHAS) ou pelo lxml, em vez da árvore do BeautifulSoup.
+    """
     registros = []
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     artigo = str(produto_codigo).lstrip('0')
     
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        registro_elements = soup.find_all('tr', class_='registro')
+        if linhas:
+            logger.info(f"Encontradas {len(linhas)} linhas de registro ({origem})")
         
-        if registro_elements:
-            logger.info(f"Encontradas {len(registro_elements)} linhas de registro")
-            
-            for registro in registro_elements:
-                # Extrair nome do produto
-                nome_produto = extrair_nome_produto_formatado(registro)
-                
-                # TENTAR MÉTODO 1: Direto
-                descricao_cor = extrair_cor_direto(registro)
-                
-                # TENTAR MÉTODO 2: Alternativo se o primeiro falhou
-                if not descricao_cor:
-                    descricao_cor = extrair_cor_alternativo(registro)
-                
-                # MÉTODO 3: Último recurso - busca no texto completo
-                if not descricao_cor:
-                    texto_completo = registro.get_text(strip=True)
-                    # Procurar por padrão simples
-                    match = re.search(r'(\d+\s*-\s*[A-Z][A-Z\s\-]+)', texto_completo)
-                    if match:
-                        descricao_cor = match.group(1).strip()
-                
-                # Criar descrição
-                if descricao_cor:
-                    # Limpar ainda mais: remover qualquer código no início
-                    descricao_cor = re.sub(r'^\d{5}\s*', '', descricao_cor)
-                    descricao = f"{nome_produto} - COR: {descricao_cor}"
-                else:
-                    descricao = nome_produto
-                
-                # Extrair dados
-                dados = extrair_dados_da_linha(registro)
-                
-                for dado in dados:
-                    registro_csv = [
-                        artigo,
-                        timestamp,
-                        descricao[:150],
-                        dado.get('previsao', 'Pronta entrega'),
-                        formatar_valor(dado.get('estoque', '0,00')),
-                        formatar_valor(dado.get('pedidos', '0,00')),
-                        formatar_valor(dado.get('disponivel', '0,00'))
-                    ]
-                    registros.append(registro_csv)
+        for linha in linhas:
+            registros.extend(registros_da_linha(linha, artigo, timestamp))
         
         if not registros:
             logger.warning(f"Nenhum dado extraído para produto {produto_codigo}")
-            registros = [[artigo, timestamp, f"Produto {artigo} - Sem dados", "N/A", "0,00", "0,00", "0,00"]]
+            registros = [RegistroEstoque.vazio(artigo, timestamp, f"Produto {artigo} - Sem dados", "N/A")]
         
         logger.info(f"Total de registros para {produto_codigo}: {len(registros)}")
         return registros
         
     except Exception as e:
         logger.error(f"Erro no parser para {produto_codigo}: {str(e)[:100]}")
-        return [[artigo, timestamp, f"Produto {artigo} - Erro", "Erro", "0,00", "0,00", "0,00"]]
+        return [RegistroEstoque.vazio(artigo, timestamp, f"Produto {artigo} - Erro", "Erro")]
 
 # Funções de compatibilidade
 def parse_dgb_completo(html_content, produto_codigo):
@@ -330,15 +925,15 @@ def parse_emergencia_simples(html_content, produto_codigo):
     try:
         registros = parse_html_dgb_simples(html_content, produto_codigo)
         
-        if not registros or (len(registros) == 1 and registros[0][4] == "0,00"):
+        if not registros or (len(registros) == 1 and registros[0].estoque == 0):
             logger.info("Criando dados de exemplo")
             registros = [
-                [artigo, timestamp, f"{artigo} - Produto - COR: 1 - Exemplo", "Pronta entrega", "1000,00", "500,00", "500,00"],
+                RegistroEstoque(artigo, timestamp, f"{artigo} - Produto - COR: 1 - Exemplo", PRONTA_ENTREGA, 100000, 50000, 50000),
             ]
         
     except:
         registros = [
-            [artigo, timestamp, f"{artigo} - Produto - COR: Emergência", "Pronta entrega", "1000,00", "500,00", "500,00"]
+            RegistroEstoque(artigo, timestamp, f"{artigo} - Produto - COR: Emergência", PRONTA_ENTREGA, 100000, 50000, 50000)
         ]
     
     return registros
@@ -18,6 +18,8 @@ import csv
 import glob
 import re
 
+from numeros_br import centavos_de_textos, formatar_centavos
+
 logger = logging.getLogger(__name__)
 
 def find_latest_consolidated_file():
@@ -252,6 +254,11 @@ def clean_and_prepare_data(df):
         # Cada linha representa uma previsão diferente para o mesmo produto/cor
         logger.info(f"Dados mantidos com múltiplas previsões: {len(df)} linhas")
         
+        # Valores em centavos, convertidos uma única vez para totais e gráficos;
+        # as colunas de texto continuam sendo as exibidas nas tabelas
+        for col in ['Estoque', 'Pedidos', 'Disponível']:
+            df[f'{col}_centavos'] = centavos_de_textos(df[col])
+        
         logger.info(f"Dados limpos: {len(df)} linhas")
         logger.info(f"Colunas finais: {list(df.columns)}")
         
@@ -300,10 +307,10 @@ def generate_product_images(df, timestamp):
                 
                 logger.info(f"Processando produto {produto} com {len(df_produto)} previsões")
                 
-                # Converter valores para numérico
-                df_produto['Estoque_num'] = df_produto['Estoque'].apply(converter_valor_brasileiro)
-                df_produto['Pedidos_num'] = df_produto['Pedidos'].apply(converter_valor_brasileiro)
-                df_produto['Disponível_num'] = df_produto['Disponível'].apply(converter_valor_brasileiro)
+                # Valores em reais para os gráficos
+                df_produto['Estoque_num'] = df_produto['Estoque_centavos'] / 100
+                df_produto['Pedidos_num'] = df_produto['Pedidos_centavos'] / 100
+                df_produto['Disponível_num'] = df_produto['Disponível_centavos'] / 100
                 
                 # Agrupar por produto/cor (somando todas as previsões)
                 df_grouped = df_produto.groupby('Produto / Cor').agg({
@@ -630,14 +637,9 @@ def generate_all_products_pdf(df, output_path, total_registros, file_timestamp_s
         
         try:
             # Calcular estatísticas
-            total_estoque = 0
-            total_pedidos = 0
-            total_disponivel = 0
-            
-            for _, row in df.iterrows():
-                total_estoque += converter_valor_brasileiro(row['Estoque'])
-                total_pedidos += converter_valor_brasileiro(row['Pedidos'])
-                total_disponivel += converter_valor_brasileiro(row['Disponível'])
+            total_estoque = df['Estoque_centavos'].sum()
+            total_pedidos = df['Pedidos_centavos'].sum()
+            total_disponivel = df['Disponível_centavos'].sum()
             
             # Contar previsões únicas
             if 'Previsão' in df.columns:
@@ -646,9 +648,9 @@ def generate_all_products_pdf(df, output_path, total_registros, file_timestamp_s
                 previsoes_unicas = []
             
             stats_text = f"""
-            <b>Estoque Total:</b> {formatar_valor_brasileiro(total_estoque)}<br/>
-            <b>Pedidos Total:</b> {formatar_valor_brasileiro(total_pedidos)}<br/>
-            <b>Disponível Total:</b> {formatar_valor_brasileiro(total_disponivel)}<br/>
+            <b>Estoque Total:</b> {formatar_centavos(total_estoque)}<br/>
+            <b>Pedidos Total:</b> {formatar_centavos(total_pedidos)}<br/>
+            <b>Disponível Total:</b> {formatar_centavos(total_disponivel)}<br/>
             <b>Previsões Únicas:</b> {len(previsoes_unicas)}<br/>
             """
             
@@ -753,20 +755,15 @@ def generate_single_product_pdf(df_produto, output_path, produto_codigo,
         # Resumo estatístico
         try:
             # Calcular totais
-            total_estoque = 0
-            total_pedidos = 0
-            total_disponivel = 0
-            
-            for _, row in df_produto.iterrows():
-                total_estoque += converter_valor_brasileiro(row['Estoque'])
-                total_pedidos += converter_valor_brasileiro(row['Pedidos'])
-                total_disponivel += converter_valor_brasileiro(row['Disponível'])
+            total_estoque = df_produto['Estoque_centavos'].sum()
+            total_pedidos = df_produto['Pedidos_centavos'].sum()
+            total_disponivel = df_produto['Disponível_centavos'].sum()
             
             summary_text = f"""
             <b>RESUMO ESTATÍSTICO:</b><br/>
-            <b>Estoque Total:</b> {formatar_valor_brasileiro(total_estoque)}<br/>
-            <b>Pedidos Total:</b> {formatar_valor_brasileiro(total_pedidos)}<br/>
-            <b>Disponível Total:</b> {formatar_valor_brasileiro(total_disponivel)}<br/>
+            <b>Estoque Total:</b> {formatar_centavos(total_estoque)}<br/>
+            <b>Pedidos Total:</b> {formatar_centavos(total_pedidos)}<br/>
+            <b>Disponível Total:</b> {formatar_centavos(total_disponivel)}<br/>
             """
             
             story.append(Paragraph(summary_text, styles['Normal']))
@@ -922,14 +919,9 @@ def generate_summary_pdf(df, output_path, file_timestamp_str, generation_timesta
         
         # Calcular totais
         try:
-            total_estoque = 0
-            total_pedidos = 0
-            total_disponivel = 0
-            
-            for _, row in df.iterrows():
-                total_estoque += converter_valor_brasileiro(row['Estoque'])
-                total_pedidos += converter_valor_brasileiro(row['Pedidos'])
-                total_disponivel += converter_valor_brasileiro(row['Disponível'])
+            total_estoque = df['Estoque_centavos'].sum()
+            total_pedidos = df['Pedidos_centavos'].sum()
+            total_disponivel = df['Disponível_centavos'].sum()
             
         except:
             total_estoque = total_pedidos = total_disponivel = 0
@@ -948,9 +940,9 @@ def generate_summary_pdf(df, output_path, file_timestamp_str, generation_timesta
         <b>Previsões Únicas:</b> {len(previsoes_counts)}<br/><br/>
         
         <b>TOTAIS:</b><br/>
-        <b>Estoque Total:</b> {formatar_valor_brasileiro(total_estoque)}<br/>
-        <b>Pedidos Total:</b> {formatar_valor_brasileiro(total_pedidos)}<br/>
-        <b>Disponível Total:</b> {formatar_valor_brasileiro(total_disponivel)}<br/><br/>
+        <b>Estoque Total:</b> {formatar_centavos(total_estoque)}<br/>
+        <b>Pedidos Total:</b> {formatar_centavos(total_pedidos)}<br/>
+        <b>Disponível Total:</b> {formatar_centavos(total_disponivel)}<br/><br/>
         """
         
         story.append(Paragraph(stats_text, styles['Normal']))
@@ -964,10 +956,7 @@ def generate_summary_pdf(df, output_path, file_timestamp_str, generation_timesta
             # Calcular estoque por produto
             produtos_estoque = []
             for produto in produtos_unicos:
-                df_produto = df[df['codigo_produto'] == produto]
-                estoque_produto = 0
-                for _, row in df_produto.iterrows():
-                    estoque_produto += converter_valor_brasileiro(row['Estoque'])
+                estoque_produto = df.loc[df['codigo_produto'] == produto, 'Estoque_centavos'].sum()
                 produtos_estoque.append((produto, estoque_produto))
             
             # Ordenar por estoque
@@ -976,7 +965,7 @@ def generate_summary_pdf(df, output_path, file_timestamp_str, generation_timesta
             # Tabela de top produtos
             table_data = [['Produto', 'Estoque Total']]
             for produto, estoque in produtos_estoque[:10]:
-                table_data.append([produto, formatar_valor_brasileiro(estoque)])
+                table_data.append([produto, formatar_centavos(estoque)])
             
             table = Table(table_data, colWidths=[100, 100])
             table.setStyle(TableStyle([
@@ -1028,78 +1017,6 @@ def generate_summary_pdf(df, output_path, file_timestamp_str, generation_timesta
         logger.error(f"Erro ao gerar PDF de resumo: {e}")
         return False
 
-def converter_valor_brasileiro(val):
-    """Converte valores no formato brasileiro para numérico"""
-    try:
-        if pd.isna(val):
-            return 0.0
-        
-        # Converter string
-        val_str = str(val).strip()
-        
-        # Se estiver vazio, retornar 0
-        if not val_str:
-            return 0.0
-        
-        # Remover caracteres não numéricos exceto pontos e vírgulas
-        val_str = ''.join(c for c in val_str if c.isdigit() or c in ',.')
-        
-        # Se ainda estiver vazio, retornar 0
-        if not val_str:
-            return 0.0
-        
-        # Remover pontos de milhar e substituir vírgula decimal por ponto
-        if ',' in val_str and '.' in val_str:
-            # Formato brasileiro: 1.234,56
-            # Contar quantos pontos há antes da vírgula
-            if val_str.rfind('.') < val_str.rfind(','):
-                # Ponto é separador de milhar, vírgula é decimal
-                val_str = val_str.replace('.', '').replace(',', '.')
-            else:
-                # Vírgula é separador de milhar, ponto é decimal
-                val_str = val_str.replace(',', '')
-        elif ',' in val_str:
-            # Formato com apenas vírgula como decimal
-            val_str = val_str.replace(',', '.')
-        
-        # Remover múltiplos pontos
-        if val_str.count('.') > 1:
-            # Manter apenas o último ponto como decimal
-            parts = val_str.split('.')
-            val_str = ''.join(parts[:-1]) + '.' + parts[-1]
-        
-        # Tentar converter para float
-        return float(val_str)
-    except Exception as e:
-        logger.warning(f"Erro ao converter valor '{val}': {e}")
-        return 0.0
-
-def formatar_valor_brasileiro(val):
-    """Formata valor numérico para formato brasileiro"""
-    try:
-        if pd.isna(val) or val == 0:
-            return "0,00"
-        
-        # Arredondar para 2 casas decimais
-        val = round(float(val), 2)
-        
-        # Se for inteiro
-        if val.is_integer():
-            val_int = int(val)
-            # Formatar com separador de milhar
-            val_str = f"{val_int:,}".replace(",", "X").replace(".", ",").replace("X", ".")
-            return f"{val_str},00"
-        else:
-            # Formatar com duas casas decimais
-            val_str = f"{val:,.2f}"
-            # Substituir . por , para decimais e , por . para milhares
-            parts = val_str.split('.')
-            inteira = parts[0].replace(",", "X").replace(".", ",").replace("X", ".")
-            return f"{inteira},{parts[1]}"
-    except Exception as e:
-        logger.warning(f"Erro ao formatar valor {val}: {e}")
-        return "0,00"
-
 def generate_pdf_report(csv_file_path=None):
     """Gera relatórios em PDF a partir do arquivo CSV consolidado - FUNÇÃO PRINCIPAL"""
     try:
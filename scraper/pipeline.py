@@ -0,0 +1,199 @@
+# pipeline.py - Etapas fetch -> parse -> escrita ligadas por filas limitadas
+import os
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+ETAPA_FETCH = 'fetch'
+ETAPA_PARSE = 'parse'
+ETAPA_ESCRITA = 'escrita'
+
+_FIM = object()
+
+def _get_int_env(nome, padrao):
+    try:
+        return max(1, int(os.getenv(nome, str(padrao))))
+    except ValueError:
+        return padrao
+
+def get_pipeline_ativo(valor=None):
+    """Pipeline ligado/desligado (parâmetro ou DGB_PIPELINE, padrão ligado)"""
+    if valor is None:
+        valor = os.getenv('DGB_PIPELINE', '1')
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() not in ('0', 'false', 'nao', 'não', 'off', '')
+
+class ScrapingPipeline:
+    """
+    O fetch (navegador/HTTP) só pesquisa e entrega o resultado em submit();
+    workers em segundo plano fazem o parse e a escrita (HTML de debug + CSV).
+    As filas limitadas seguram o fetch quando parse/escrita ficam para trás.
+
+    parsear(resultado) -> registros
+    escrever(resultado, registros) -> nome do CSV (ou None)
+    """
+
+    def __init__(self, status_dict, parsear, escrever, workers_parse=None, workers_escrita=None,
+                 tamanho_fila=None):
+        self.status = status_dict
+        self.parsear = parsear
+        self.escrever = escrever
+        self.workers = {
+            ETAPA_FETCH: 1,
+            ETAPA_PARSE: workers_parse or _get_int_env('DGB_PARSE_WORKERS', 2),
+            ETAPA_ESCRITA: workers_escrita or _get_int_env('DGB_WRITE_WORKERS', 1)
+        }
+        self.tamanho_fila = tamanho_fila or _get_int_env('DGB_PIPELINE_QUEUE', 8)
+        self.fila_parse = queue.Queue(maxsize=self.tamanho_fila)
+        self.fila_escrita = queue.Queue(maxsize=self.tamanho_fila)
+        self.tempos = {etapa: LatencyHistogram() for etapa in self.workers}
+        self.espera_fila_s = 0.0
+        self.pico_filas = {ETAPA_PARSE: 0, ETAPA_ESCRITA: 0}
+        self.lock = threading.Lock()
+        self.inicio = time.monotonic()
+        self.threads = []
+        self.fechado = False
+
+        for etapa, alvo in ((ETAPA_PARSE, self._worker_parse), (ETAPA_ESCRITA, self._worker_escrita)):
+            for i in range(1, self.workers[etapa] + 1):
+                thread = threading.Thread(target=alvo, name=f'pipeline-{etapa}-{i}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+        logger.info(f"🧵 Pipeline: {self.workers[ETAPA_PARSE]} parse, {self.workers[ETAPA_ESCRITA]} escrita, "
+                    f"filas de {self.tamanho_fila}")
+
+    def set_fetch_workers(self, quantidade):
+        """Quantos produtores (navegadores/tarefas) alimentam o pipeline - só para o cálculo de ocupação"""
+        self.workers[ETAPA_FETCH] = max(1, quantidade)
+
+    def observe_fetch(self, segundos):
+        """Tempo gasto pelo produtor na pesquisa de um produto"""
+        self.tempos[ETAPA_FETCH].observe(segundos)
+
+    def submit(self, resultado, ao_concluir):
+        """
+        Entrega o resultado de uma pesquisa; ao_concluir(resultado) é chamado
+        após a escrita do CSV (ou imediatamente para pesquisas com erro).
+        Bloqueia enquanto a fila de parse estiver cheia.
+        """
+        inicio = time.monotonic()
+        self.fila_parse.put((resultado, ao_concluir))
+        with self.lock:
+            self.espera_fila_s += time.monotonic() - inicio
+            self.pico_filas[ETAPA_PARSE] = max(self.pico_filas[ETAPA_PARSE], self.fila_parse.qsize())
+        self._publicar()
+
+    def _worker_parse(self):
+        while True:
+            item = self.fila_parse.get()
+            if item is _FIM:
+                break
+            resultado, ao_concluir = item
+
+            registros = None
+            if resultado.get('success') and ('linhas' in resultado or 'html' in resultado):
+                inicio = time.monotonic()
+                try:
+                    registros = self.parsear(resultado)
+                except Exception as e:
+                    logger.error(f"❌ Erro no parse do produto {resultado.get('codigo')}: {e}")
+                    resultado['success'] = False
+                    resultado['error'] = f'Erro no parse: {e}'
+                self.tempos[ETAPA_PARSE].observe(time.monotonic() - inicio)
+
+            self.fila_escrita.put((resultado, registros, ao_concluir))
+            with self.lock:
+                self.pico_filas[ETAPA_ESCRITA] = max(self.pico_filas[ETAPA_ESCRITA], self.fila_escrita.qsize())
+
+    def _worker_escrita(self):
+        while True:
+            item = self.fila_escrita.get()
+            if item is _FIM:
+                break
+            resultado, registros, ao_concluir = item
+
+            if registros is not None:
+                inicio = time.monotonic()
+                try:
+                    csv_filename = self.escrever(resultado, registros)
+                except Exception as e:
+                    logger.error(f"❌ Erro ao escrever CSV do produto {resultado.get('codigo')}: {e}")
+                    csv_filename = None
+                self.tempos[ETAPA_ESCRITA].observe(time.monotonic() - inicio)
+
+                if csv_filename:
+                    resultado['csv_file'] = csv_filename
+                    logger.info(f"✅ Produto {resultado.get('codigo')} processado - CSV criado")
+                else:
+                    resultado['success'] = False
+                    resultado['error'] = 'Não foi possível criar CSV'
+                    logger.error(f"❌ Produto {resultado.get('codigo')}: erro ao criar CSV")
+
+            # Diário e status só depois que o CSV existe em disco
+            try:
+                ao_concluir(resultado)
+            except Exception as e:
+                logger.error(f"Erro ao registrar produto {resultado.get('codigo')}: {e}")
+            self._publicar()
+
+    def close(self):
+        """Espera parse e escrita drenarem tudo o que foi entregue"""
+        if self.fechado:
+            return
+        self.fechado = True
+        parse = [t for t in self.threads if ETAPA_PARSE in t.name]
+        escrita = [t for t in self.threads if ETAPA_ESCRITA in t.name]
+        for _ in parse:
+            self.fila_parse.put(_FIM)
+        for thread in parse:
+            thread.join()
+        for _ in escrita:
+            self.fila_escrita.put(_FIM)
+        for thread in escrita:
+            thread.join()
+        self._publicar()
+
+    def to_dict(self):
+        """Profundidade das filas, tempos por etapa e a etapa gargalo"""
+        decorrido = max(time.monotonic() - self.inicio, 1e-6)
+        etapas = {}
+        for etapa, tempos in self.tempos.items():
+            dados = tempos.to_dict()
+            dados.pop('baldes', None)
+            dados['workers'] = self.workers[etapa]
+            # Fração do tempo em que os workers da etapa estiveram ocupados
+            dados['ocupacao'] = round(min(1.0, dados['soma_s'] / (self.workers[etapa] * decorrido)), 3)
+            etapas[etapa] = dados
+
+        with self.lock:
+            espera = self.espera_fila_s
+            picos = dict(self.pico_filas)
+
+        return {
+            'filas': {ETAPA_PARSE: self.fila_parse.qsize(), ETAPA_ESCRITA: self.fila_escrita.qsize()},
+            'pico_filas': picos,
+            'capacidade_fila': self.tamanho_fila,
+            'fetch_bloqueado_s': round(espera, 2),
+            'etapas': etapas,
+            'gargalo': max(etapas, key=lambda e: etapas[e]['ocupacao']),
+            'atualizado_em': datetime.now().isoformat()
+        }
+
+    def _publicar(self):
+        self.status['pipeline'] = self.to_dict()
+
+    def log_resumo(self):
+        """Escreve tempos por etapa e o gargalo no log"""
+        dados = self.to_dict()
+        for etapa, d in dados['etapas'].items():
+            logger.info(f"🧵 {etapa}: {d['total']} itens, média {d['media_s']:.3f}s, "
+                        f"p95 {d['p95_s']:.3f}s, ocupação {d['ocupacao'] * 100:.0f}%")
+        logger.info(f"🧵 Gargalo: {dados['gargalo']} | fetch bloqueado por fila cheia: {dados['fetch_bloqueado_s']}s")
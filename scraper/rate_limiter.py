@@ -0,0 +1,170 @@
+# rate_limiter.py - Limitador adaptativo (token bucket + AIMD) entre consultas ao DGB
+# Cópia idêntica em scraper/ e estoque/ (cada app roda da própria pasta): altere as duas; scraper/tests/test_copias_estoque.py confere
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Quem espera um token reavalia a espera pelo menos a cada N segundos (taxa e recuo mudam no meio)
+INTERVALO_REAVALIACAO = 0.1
+
+def _get_float_env(nome, padrao):
+    try:
+        return float(os.getenv(nome, str(padrao)))
+    except ValueError:
+        return padrao
+
+def avaliar_resultado(resultado, latencia_lenta):
+    """
+    Classifica a resposta de uma pesquisa para o limitador.
+    Retorna None se a resposta foi rápida e limpa, senão o motivo do recuo.
+    """
+    if resultado.get('tipo_erro') == 'session_expired':
+        return 'login'
+    if not resultado.get('success'):
+        erro = str(resultado.get('error', '')).lower()
+        if 'sess' in erro or 'login' in erro:
+            return 'login'
+        return 'erro'
+
+    html = resultado.get('html') or ''
+    if html and 'id="senha"' in html:
+        return 'login'
+    if html and 'id="produto"' not in html:
+        return 'pagina_erro'
+
+    latencia = resultado.get('latencia')
+    if latencia is not None and latencia > latencia_lenta:
+        return 'lento'
+
+    return None
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket cuja taxa sobe de forma aditiva enquanto o DGB responde
+    rápido e sem erros, e cai de forma multiplicativa (com recuo exponencial)
+    diante de respostas lentas, páginas de erro ou redirecionamentos ao login.
+    """
+
+    def __init__(self, taxa_inicial=1 / 3, taxa_min=0.05, taxa_max=5.0, incremento=0.1,
+                 fator_reducao=0.5, latencia_lenta=5.0, capacidade=1.0, recuo_base=2.0, recuo_max=60.0):
+        self.taxa = taxa_inicial
+        self.taxa_min = taxa_min
+        self.taxa_max = taxa_max
+        self.incremento = incremento
+        self.fator_reducao = fator_reducao
+        self.latencia_lenta = latencia_lenta
+        self.capacidade = capacidade
+        self.recuo_base = recuo_base
+        self.recuo_max = recuo_max
+
+        self.tokens = capacidade
+        self.ultimo = time.monotonic()
+        self.recuo_ate = 0.0
+        self.falhas_seguidas = 0
+        self.total_recuos = 0
+        self.eventos = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **padroes):
+        """
+        Cria o limitador a partir de DGB_RATE_INICIAL, DGB_RATE_MIN, DGB_RATE_MAX e DGB_LATENCIA_LENTA.
+        padroes: valores usados quando a variável correspondente não está definida.
+        """
+        variaveis = {
+            'taxa_inicial': ('DGB_RATE_INICIAL', 1 / 3),
+            'taxa_min': ('DGB_RATE_MIN', 0.05),
+            'taxa_max': ('DGB_RATE_MAX', 5.0),
+            'latencia_lenta': ('DGB_LATENCIA_LENTA', 5.0)
+        }
+        parametros = dict(padroes)
+        for nome, (variavel, padrao) in variaveis.items():
+            parametros[nome] = _get_float_env(variavel, parametros.get(nome, padrao))
+        return cls(**parametros)
+
+    def try_acquire(self):
+        """
+        Retira um token se houver um disponível agora (retorna 0.0); senão não reserva
+        nada e retorna quantos segundos faltam, pela taxa e pelo recuo atuais
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+            self.ultimo = agora
+
+            espera = max(0.0, self.recuo_ate - agora)
+            if espera == 0 and self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return max(espera, (1 - self.tokens) / self.taxa)
+
+    def acquire(self, continuar=None):
+        """Bloqueia até haver token; continuar() permite abortar a espera (ex.: /api/stop)"""
+        while True:
+            espera = self.try_acquire()
+            if espera <= 0:
+                return True
+            if continuar is not None and not continuar():
+                return False
+            time.sleep(min(espera, INTERVALO_REAVALIACAO))
+
+    async def acquire_async(self, continuar=None):
+        """
+        Versão assíncrona de acquire: a espera é recalculada a cada INTERVALO_REAVALIACAO,
+        então aumentos de taxa e recuos valem também para quem já está esperando
+        """
+        while True:
+            espera = self.try_acquire()
+            if espera <= 0:
+                return True
+            if continuar is not None and not continuar():
+                return False
+            await asyncio.sleep(min(espera, INTERVALO_REAVALIACAO))
+
+    def record(self, resultado):
+        """Ajusta a taxa conforme a resposta de uma pesquisa"""
+        motivo = avaliar_resultado(resultado, self.latencia_lenta)
+        with self._lock:
+            if motivo is None:
+                self.falhas_seguidas = 0
+                self.taxa = min(self.taxa_max, self.taxa + self.incremento)
+                return None
+
+            self.falhas_seguidas += 1
+            self.total_recuos += 1
+            self.taxa = max(self.taxa_min, self.taxa * self.fator_reducao)
+            recuo = min(self.recuo_max, self.recuo_base ** self.falhas_seguidas)
+            self.recuo_ate = time.monotonic() + recuo
+            # Zera o balde para não disparar rajada após o recuo
+            self.tokens = min(self.tokens, 0.0)
+
+            self.eventos.append({
+                'motivo': motivo,
+                'codigo': resultado.get('codigo'),
+                'nova_taxa': round(self.taxa, 3),
+                'recuo_s': round(recuo, 1),
+                'timestamp': datetime.now().isoformat()
+            })
+
+        logger.warning(f"🐢 Recuo ({motivo}) no produto {resultado.get('codigo')}: "
+                       f"taxa {self.taxa:.2f} req/s, pausa de {recuo:.0f}s")
+        return motivo
+
+    def snapshot(self):
+        """Estado atual para /api/status"""
+        with self._lock:
+            return {
+                'taxa_req_s': round(self.taxa, 3),
+                'intervalo_s': round(1 / self.taxa, 2),
+                'taxa_max': self.taxa_max,
+                'em_recuo_s': round(max(0.0, self.recuo_ate - time.monotonic()), 1),
+                'falhas_seguidas': self.falhas_seguidas,
+                'total_recuos': self.total_recuos,
+                'eventos': list(self.eventos)[-10:]
+            }
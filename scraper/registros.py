@@ -0,0 +1,143 @@
+# registros.py - Registro de estoque tipado (centavos e data de previsão); formato brasileiro só na saída
+import re
+import csv
+import logging
+from datetime import date
+from typing import NamedTuple, Union
+
+from numeros_br import centavos_de_texto, formatar_centavos
+
+logger = logging.getLogger(__name__)
+
+# Colunas dos CSVs por produto (DGBScraper.write_csv)
+COLUNAS_CSV = ['artigo', 'datahora', 'Produto / Situação / Cor / Desenho / Variante',
+               'Previsão', 'Estoque', 'Pedidos', 'Disponível']
+
+# Sentinela da previsão sem data
+PRONTA_ENTREGA = 'Pronta entrega'
+
+PADRAO_DATA_BR = re.compile(r'(\d{2})/(\d{2})/(\d{4})', re.ASCII)
+
+def previsao_de_texto(texto):
+    """'dd/mm/aaaa' -> date; 'Pronta entrega' -> PRONTA_ENTREGA; outros textos ('N/A', 'Erro') ficam como estão"""
+    texto = str(texto).strip() if texto is not None else ''
+    if texto.lower() == PRONTA_ENTREGA.lower():
+        return PRONTA_ENTREGA
+    match = PADRAO_DATA_BR.fullmatch(texto)
+    if match:
+        dia, mes, ano = (int(g) for g in match.groups())
+        try:
+            return date(ano, mes, dia)
+        except ValueError:
+            pass
+    return texto
+
+def previsoes_de_textos(textos):
+    """previsao_de_texto em lote; cada texto distinto (poucas datas por consolidação) é convertido uma vez"""
+    convertidas = {}
+    previsoes = []
+    for texto in textos:
+        if texto not in convertidas:
+            convertidas[texto] = previsao_de_texto(texto)
+        previsoes.append(convertidas[texto])
+    return previsoes
+
+def formatar_previsao(previsao):
+    """date -> 'dd/mm/aaaa'; textos sem alteração"""
+    if isinstance(previsao, date):
+        return f"{previsao.day:02d}/{previsao.month:02d}/{previsao.year:04d}"
+    return '' if previsao is None else str(previsao)
+
+def ordem_previsao(previsao):
+    """Chave de ordenação: vazio, pronta entrega, datas em ordem cronológica, outros textos"""
+    if previsao is None or previsao == '':
+        return (0, '')
+    if previsao == PRONTA_ENTREGA:
+        return (1, '')
+    if isinstance(previsao, date):
+        return (2, previsao.isoformat())
+    return (3, str(previsao).upper())
+
+class RegistroEstoque(NamedTuple):
+    """Uma linha de previsão de um produto/cor; estoque, pedidos e disponível em centavos"""
+    artigo: str
+    datahora: str
+    produto: str
+    previsao: Union[date, str]
+    estoque: int = 0
+    pedidos: int = 0
+    disponivel: int = 0
+
+    @classmethod
+    def de_textos(cls, artigo, datahora, produto, previsao, estoque, pedidos, disponivel):
+        """Registro a partir dos textos do DGB ou de um CSV (valor não numérico vira 0)"""
+        return cls(
+            str(artigo), str(datahora), str(produto), previsao_de_texto(previsao),
+            centavos_de_texto(estoque) or 0,
+            centavos_de_texto(pedidos) or 0,
+            centavos_de_texto(disponivel) or 0
+        )
+
+    @classmethod
+    def vazio(cls, artigo, datahora, produto, previsao):
+        """Linha indicativa (sem dados, erro) com os valores zerados"""
+        return cls(str(artigo), str(datahora), produto, previsao)
+
+    @classmethod
+    def de_linha_csv(cls, linha):
+        return cls.de_textos(*linha[:7])
+
+    def linha_csv(self):
+        """As 7 colunas do CSV, no formato brasileiro"""
+        return [
+            self.artigo,
+            self.datahora,
+            self.produto,
+            formatar_previsao(self.previsao),
+            formatar_centavos(self.estoque),
+            formatar_centavos(self.pedidos),
+            formatar_centavos(self.disponivel)
+        ]
+
+def linha_csv(registro):
+    """Colunas do CSV de um RegistroEstoque ou de uma lista de textos (parsers antigos)"""
+    if isinstance(registro, RegistroEstoque):
+        return registro.linha_csv()
+    return list(registro)
+
+def registros_de_linhas(linhas):
+    """RegistroEstoque a partir de linhas de textos (CSV, cache de parse)"""
+    return [RegistroEstoque.de_linha_csv(linha) for linha in linhas]
+
+# Colunas que o consolidador usa; um CSV com pelo menos MINIMO_COLUNAS_CSV delas é aceito
+COLUNAS_NECESSARIAS = COLUNAS_CSV[2:]
+MINIMO_COLUNAS_CSV = 4
+
+def ler_linhas_csv_produto(caminho):
+    """
+    Linhas de texto de um CSV por produto, sempre nas 7 colunas de write_csv.
+    As colunas são localizadas pelo nome (qualquer ordem, colunas extras ignoradas);
+    basta ter MINIMO_COLUNAS_CSV das necessárias, a que faltar fica vazia (valor 0,00,
+    previsão em branco), como no consolidador com pandas. Linhas curtas são completadas.
+    ValueError (com as colunas ausentes) se faltarem mais colunas que isso.
+    """
+    with open(caminho, 'r', newline='', encoding='utf-8-sig') as f:
+        leitor = csv.reader(f, delimiter=';')
+        cabecalho = [c.strip() for c in next(leitor, [])]
+        if cabecalho == COLUNAS_CSV:
+            posicoes = list(range(len(COLUNAS_CSV)))
+        else:
+            posicoes = [cabecalho.index(c) if c in cabecalho else None for c in COLUNAS_CSV]
+            ausentes = [c for c, p in zip(COLUNAS_CSV, posicoes) if p is None and c in COLUNAS_NECESSARIAS]
+            if len(COLUNAS_NECESSARIAS) - len(ausentes) < MINIMO_COLUNAS_CSV:
+                raise ValueError(f"colunas ausentes: {', '.join(ausentes)}")
+        linhas = []
+        for linha in leitor:
+            if not linha:
+                continue
+            linhas.append([linha[p] if p is not None and p < len(linha) else '' for p in posicoes])
+        return linhas
+
+def ler_csv_produto(caminho):
+    """Registros de um CSV por produto; ValueError se faltarem colunas (ver ler_linhas_csv_produto)"""
+    return registros_de_linhas(ler_linhas_csv_produto(caminho))
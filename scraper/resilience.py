@@ -0,0 +1,314 @@
+# resilience.py - Retentativas com recuo exponencial e circuit breaker para as pesquisas no DGB
+import os
+import time
+import random
+import socket
+import asyncio
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Classes de erro de uma pesquisa
+ERRO_TIMEOUT = 'timeout'
+ERRO_ELEMENTO_OBSOLETO = 'stale_element'
+ERRO_SESSAO = 'session_expired'
+ERRO_BOTAO = 'button_not_found'
+ERRO_CONEXAO = 'connection'
+ERRO_PRODUTO_TROCADO = 'wrong_product'
+ERRO_OUTRO = 'other'
+
+# Só vale a pena repetir o que pode ser transitório
+ERROS_RETENTAVEIS = (ERRO_TIMEOUT, ERRO_ELEMENTO_OBSOLETO, ERRO_SESSAO, ERRO_BOTAO, ERRO_CONEXAO,
+                     ERRO_PRODUTO_TROCADO)
+
+# Estados do circuit breaker
+CIRCUITO_FECHADO = 'fechado'
+CIRCUITO_ABERTO = 'aberto'
+CIRCUITO_MEIO_ABERTO = 'meio_aberto'
+
+class SessaoExpiradaError(Exception):
+    """O DGB respondeu com redirecionamento para o login"""
+
+class BotaoNaoEncontradoError(Exception):
+    """Botão 'Pesquisar' (ou o formulário de pesquisa) ausente na página"""
+
+class ProdutoTrocadoError(Exception):
+    """As linhas de resultado são de outro produto (pesquisas simultâneas na mesma view JSF)"""
+
+def _get_env(nome, padrao, tipo=float):
+    try:
+        return tipo(os.getenv(nome, str(padrao)))
+    except ValueError:
+        return padrao
+
+def classificar_excecao(erro):
+    """Classe de erro de uma exceção levantada durante a pesquisa"""
+    if isinstance(erro, SessaoExpiradaError):
+        return ERRO_SESSAO
+    if isinstance(erro, BotaoNaoEncontradoError):
+        return ERRO_BOTAO
+    if isinstance(erro, ProdutoTrocadoError):
+        return ERRO_PRODUTO_TROCADO
+
+    # Classificação pelo nome evita importar selenium/requests/httpx aqui
+    nomes = {classe.__name__ for classe in type(erro).__mro__}
+    if nomes & {'TimeoutException', 'Timeout', 'ReadTimeout', 'ConnectTimeout', 'PoolTimeout'} \
+            or isinstance(erro, (socket.timeout, TimeoutError, asyncio.TimeoutError)):
+        return ERRO_TIMEOUT
+    if 'StaleElementReferenceException' in nomes:
+        return ERRO_ELEMENTO_OBSOLETO
+    if 'NoSuchElementException' in nomes:
+        return ERRO_BOTAO
+    if nomes & {'ConnectionError', 'TransportError', 'WebDriverException', 'HTTPError', 'HTTPStatusError'} \
+            or isinstance(erro, ConnectionError):
+        return ERRO_CONEXAO
+    return ERRO_OUTRO
+
+def classificar_resultado(resultado):
+    """Classe de erro de um resultado de search_product (None se foi bem-sucedido)"""
+    if resultado.get('success'):
+        # Resultados que não estabilizaram no tempo limite contam como timeout
+        return ERRO_TIMEOUT if resultado.get('estado') == ERRO_TIMEOUT else None
+
+    if resultado.get('tipo_erro'):
+        return resultado['tipo_erro']
+
+    erro = str(resultado.get('error', '')).lower()
+    if 'timeout' in erro:
+        return ERRO_TIMEOUT
+    if 'stale' in erro:
+        return ERRO_ELEMENTO_OBSOLETO
+    if 'sessão' in erro or 'login' in erro:
+        return ERRO_SESSAO
+    if 'botão' in erro:
+        return ERRO_BOTAO
+    return ERRO_OUTRO
+
+class RetryPolicy:
+    """Até N tentativas com recuo exponencial e jitter total (espera aleatória em [0, base * 2^n])"""
+
+    def __init__(self, tentativas=3, base=1.0, maximo=30.0):
+        self.tentativas = max(1, int(tentativas))
+        self.base = base
+        self.maximo = maximo
+
+    @classmethod
+    def from_env(cls):
+        """DGB_RETRY_TENTATIVAS, DGB_RETRY_BASE e DGB_RETRY_MAX"""
+        return cls(
+            tentativas=_get_env('DGB_RETRY_TENTATIVAS', 3, int),
+            base=_get_env('DGB_RETRY_BASE', 1.0),
+            maximo=_get_env('DGB_RETRY_MAX', 30.0)
+        )
+
+    def espera(self, tentativa):
+        """Segundos a aguardar antes da tentativa seguinte (tentativa começa em 1)"""
+        return random.uniform(0, min(self.maximo, self.base * (2 ** tentativa)))
+
+class CircuitBreaker:
+    """
+    Abre quando a taxa de falhas nas últimas `janela` tentativas passa de `limiar`,
+    pausando todas as pesquisas por `pausa` segundos. Depois deixa passar uma
+    tentativa de sonda: sucesso fecha o circuito, falha o reabre.
+    """
+
+    def __init__(self, limiar=0.5, janela=20, minimo=5, pausa=60.0):
+        self.limiar = limiar
+        self.minimo = minimo
+        self.pausa = pausa
+        self.janela = deque(maxlen=janela)
+        self.estado = CIRCUITO_FECHADO
+        self.aberto_ate = 0.0
+        self.sonda_em_andamento = False
+        self.aberturas = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """DGB_CIRCUIT_LIMIAR, DGB_CIRCUIT_JANELA, DGB_CIRCUIT_MINIMO e DGB_CIRCUIT_PAUSA"""
+        return cls(
+            limiar=_get_env('DGB_CIRCUIT_LIMIAR', 0.5),
+            janela=_get_env('DGB_CIRCUIT_JANELA', 20, int),
+            minimo=_get_env('DGB_CIRCUIT_MINIMO', 5, int),
+            pausa=_get_env('DGB_CIRCUIT_PAUSA', 60.0)
+        )
+
+    def liberar(self):
+        """True se a tentativa pode seguir agora (não bloqueia)"""
+        with self._lock:
+            if self.estado == CIRCUITO_FECHADO:
+                return True
+            if self.estado == CIRCUITO_ABERTO and time.monotonic() >= self.aberto_ate:
+                self.estado = CIRCUITO_MEIO_ABERTO
+                self.sonda_em_andamento = False
+            if self.estado == CIRCUITO_MEIO_ABERTO and not self.sonda_em_andamento:
+                self.sonda_em_andamento = True
+                logger.info("🔌 Circuito meio aberto - enviando pesquisa de sonda")
+                return True
+            return False
+
+    def aguardar(self, continuar=None):
+        """Bloqueia enquanto o circuito estiver aberto; False se continuar() pedir parada"""
+        while not self.liberar():
+            if continuar is not None and not continuar():
+                return False
+            time.sleep(0.2)
+        return True
+
+    async def aguardar_async(self, continuar=None):
+        """Versão assíncrona de aguardar()"""
+        while not self.liberar():
+            if continuar is not None and not continuar():
+                return False
+            await asyncio.sleep(0.2)
+        return True
+
+    def registrar(self, sucesso):
+        """Registra o desfecho de uma tentativa"""
+        with self._lock:
+            if self.estado == CIRCUITO_MEIO_ABERTO:
+                self.sonda_em_andamento = False
+                if sucesso:
+                    self.estado = CIRCUITO_FECHADO
+                    self.janela.clear()
+                    logger.info("🔌 Circuito fechado - DGB respondendo novamente")
+                else:
+                    self._abrir()
+                return
+
+            self.janela.append(sucesso)
+            falhas = self.janela.count(False)
+            if (self.estado == CIRCUITO_FECHADO and len(self.janela) >= self.minimo
+                    and falhas / len(self.janela) >= self.limiar):
+                self._abrir()
+
+    def _abrir(self):
+        self.estado = CIRCUITO_ABERTO
+        self.aberto_ate = time.monotonic() + self.pausa
+        self.aberturas += 1
+        self.janela.clear()
+        logger.warning(f"⛔ Circuito aberto: muitas falhas seguidas - pausando pesquisas por {self.pausa:.0f}s")
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'estado': self.estado,
+                'retoma_em_s': round(max(0.0, self.aberto_ate - time.monotonic()), 1)
+                if self.estado == CIRCUITO_ABERTO else 0.0,
+                'aberturas': self.aberturas
+            }
+
+class Resiliencia:
+    """
+    Executa uma pesquisa com classificação de erros, retentativas, recuperação
+    (novo login ao expirar a sessão, recarga da página de estoque) e circuit breaker.
+    Compartilhada entre os workers de uma execução; contadores são thread-safe.
+    """
+
+    def __init__(self, politica=None, disjuntor=None, continuar=None):
+        self.politica = politica or RetryPolicy.from_env()
+        self.disjuntor = disjuntor or CircuitBreaker.from_env()
+        self.continuar = continuar
+        self.erros = Counter()
+        self.retentativas = 0
+        self.recuperacoes = Counter()
+        self.desistencias = 0
+        self._lock = threading.Lock()
+
+    def _contar(self, tipo, repetir, desistiu):
+        with self._lock:
+            self.erros[tipo] += 1
+            if repetir:
+                self.retentativas += 1
+            elif desistiu:
+                self.desistencias += 1
+
+    def _interrompido(self, produto):
+        return {'success': False, 'codigo': produto, 'error': 'Interrompido', 'tipo_erro': ERRO_OUTRO}
+
+    def _avaliar(self, resultado, tentativa):
+        """Retorna (tipo_erro, deve_repetir) para o resultado de uma tentativa"""
+        tipo = classificar_resultado(resultado)
+        self.disjuntor.registrar(tipo is None)
+        if tipo is None:
+            return None, False
+
+        repetir = tipo in ERROS_RETENTAVEIS and tentativa < self.politica.tentativas
+        self._contar(tipo, repetir, not resultado.get('success'))
+        resultado['tipo_erro'] = tipo
+        resultado['tentativas'] = tentativa
+        if repetir:
+            logger.warning(f"🔁 Produto {resultado.get('codigo')}: {tipo} na tentativa "
+                           f"{tentativa}/{self.politica.tentativas}")
+        return tipo, repetir
+
+    def _esperar(self, segundos):
+        limite = time.monotonic() + segundos
+        while time.monotonic() < limite:
+            if self.continuar is not None and not self.continuar():
+                return False
+            time.sleep(min(0.2, max(0.0, limite - time.monotonic())))
+        return True
+
+    def pesquisar(self, scraper, produto):
+        """Pesquisa com retentativas usando scraper.search_product e scraper.recover"""
+        resultado = None
+        for tentativa in range(1, self.politica.tentativas + 1):
+            if not self.disjuntor.aguardar(self.continuar):
+                return resultado or self._interrompido(produto)
+
+            resultado = scraper.search_product(produto)
+            tipo, repetir = self._avaliar(resultado, tentativa)
+            if not repetir:
+                return resultado
+
+            if not self._esperar(self.politica.espera(tentativa)):
+                return resultado
+            if scraper.recover(tipo):
+                with self._lock:
+                    self.recuperacoes[tipo] += 1
+        return resultado
+
+    async def pesquisar_async(self, buscar, recuperar, produto):
+        """
+        Versão assíncrona: buscar() e recuperar(tipo, contexto) são corrotinas.
+        buscar() retorna (resultado, contexto); o contexto é repassado a recuperar.
+        """
+        resultado = None
+        for tentativa in range(1, self.politica.tentativas + 1):
+            if not await self.disjuntor.aguardar_async(self.continuar):
+                return resultado or self._interrompido(produto)
+
+            resultado, contexto = await buscar()
+            tipo, repetir = self._avaliar(resultado, tentativa)
+            if not repetir:
+                return resultado
+
+            await asyncio.sleep(self.politica.espera(tentativa))
+            if await recuperar(tipo, contexto):
+                with self._lock:
+                    self.recuperacoes[tipo] += 1
+        return resultado
+
+    def to_dict(self):
+        """Contadores para /api/status e para o resumo da execução"""
+        with self._lock:
+            return {
+                'erros_por_tipo': dict(self.erros),
+                'retentativas': self.retentativas,
+                'recuperacoes': dict(self.recuperacoes),
+                'desistencias': self.desistencias,
+                'circuito': self.disjuntor.to_dict(),
+                'atualizado_em': datetime.now().isoformat()
+            }
+
+    def log_resumo(self):
+        """Escreve os contadores por classe de erro no log"""
+        dados = self.to_dict()
+        logger.info(f"🛡️  Retentativas: {dados['retentativas']} | desistências: {dados['desistencias']} | "
+                    f"aberturas do circuito: {dados['circuito']['aberturas']}")
+        for tipo, quantidade in sorted(dados['erros_por_tipo'].items()):
+            logger.info(f"   {tipo}: {quantidade}")
@@ -0,0 +1,131 @@
+# run_journal.py - Diário de execução (append-only, com fsync) para retomar scraping interrompido
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FOLDER = 'journal'
+
+def hash_html(html):
+    """SHA-256 do HTML capturado"""
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+def hash_linhas(linhas):
+    """SHA-256 das linhas extraídas no navegador (modo JSON, sem HTML), em JSON canônico"""
+    texto = json.dumps(linhas, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+class RunJournal:
+    """
+    Uma linha JSON por evento; cada produto concluído é gravado com fsync,
+    então uma queda do Chrome ou do Flask perde no máximo o produto em andamento.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, produtos, backend=None):
+        """Abre um novo diário para uma execução completa"""
+        os.makedirs(JOURNAL_FOLDER, exist_ok=True)
+        inicio = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Criação exclusiva: duas execuções no mesmo segundo (duplo clique, retomar e iniciar)
+        # ganham diários diferentes; o sufixo com zeros mantém a ordem de latest()
+        for tentativa in range(1, 1000):
+            run_id = inicio if tentativa == 1 else f"{inicio}_{tentativa:03d}"
+            caminho = os.path.join(JOURNAL_FOLDER, f"run_{run_id}.jsonl")
+            try:
+                with open(caminho, 'x', encoding='utf-8'):
+                    break
+            except FileExistsError:
+                continue
+        else:
+            raise FileExistsError(f"Diários demais iniciados em {inicio}")
+        journal = cls(caminho)
+        journal._append({
+            'tipo': 'inicio',
+            'run_id': run_id,
+            'backend': backend,
+            'produtos': list(produtos),
+            'timestamp': datetime.now().isoformat()
+        })
+        logger.info(f"📓 Diário de execução: {journal.caminho}")
+        return journal
+
+    @classmethod
+    def latest(cls):
+        """Diário mais recente ou None"""
+        if not os.path.exists(JOURNAL_FOLDER):
+            return None
+        arquivos = sorted(f for f in os.listdir(JOURNAL_FOLDER) if f.startswith('run_') and f.endswith('.jsonl'))
+        if not arquivos:
+            return None
+        return cls(os.path.join(JOURNAL_FOLDER, arquivos[-1]))
+
+    def _append(self, registro):
+        linha = json.dumps(registro, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.caminho, 'a', encoding='utf-8') as f:
+                f.write(linha)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def record(self, resultado):
+        """Grava um produto concluído (sucesso ou erro)"""
+        html = resultado.get('html')
+        linhas = resultado.get('linhas')
+        self._append({
+            'tipo': 'produto',
+            'codigo': resultado.get('codigo'),
+            'status': 'ok' if resultado.get('success') else 'erro',
+            'csv_file': resultado.get('csv_file'),
+            'inalterado': bool(resultado.get('inalterado')),
+            'html_sha256': hash_html(html) if html else resultado.get('html_sha256'),
+            # Extração JSON não guarda HTML: o que foi capturado é identificado pelas linhas
+            'linhas_sha256': hash_linhas(linhas) if linhas is not None else resultado.get('linhas_sha256'),
+            'error': resultado.get('error'),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def finish(self, mensagem=''):
+        """Marca o fim da execução"""
+        self._append({'tipo': 'fim', 'mensagem': mensagem, 'timestamp': datetime.now().isoformat()})
+
+    def load(self):
+        """
+        Lê o diário tolerando uma última linha truncada.
+        Retorna (cabecalho, {codigo: último registro do produto}).
+        """
+        cabecalho = {}
+        produtos = {}
+        with open(self.caminho, 'r', encoding='utf-8') as f:
+            for numero, linha in enumerate(f, 1):
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    logger.warning(f"Linha {numero} do diário ignorada (incompleta)")
+                    continue
+                if registro.get('tipo') == 'inicio':
+                    cabecalho = registro
+                elif registro.get('tipo') == 'produto':
+                    produtos[str(registro['codigo'])] = registro
+        return cabecalho, produtos
+
+    def pending(self):
+        """
+        Produtos ainda não concluídos com sucesso e registros já concluídos.
+        Retorna (pendentes, concluidos).
+        """
+        cabecalho, produtos = self.load()
+        concluidos = [r for r in produtos.values() if r.get('status') == 'ok']
+        feitos = {str(r['codigo']) for r in concluidos}
+        pendentes = [p for p in cabecalho.get('produtos', []) if str(p) not in feitos]
+        return pendentes, concluidos
@@ -14,19 +14,45 @@ from dotenv import load_dotenv
 
 # Importar parser
 import parser_dgb
+from wait_dgb import DGBWaitEngine, ESTADO_RESULTADOS, ESTADO_SEM_RESULTADOS
+from metrics import LatencyHistogram
+from worker_pool import ScrapingWorkerPool, get_num_workers
+from session_cache import SessionCache, reservar_slot, liberar_slot, caminho_do_slot
+from run_journal import RunJournal
+from rate_limiter import AdaptiveRateLimiter
+from lean_browsing import get_lean_browsing, configurar_opcoes_lean, ativar_bloqueio_cdp
+from resilience import (Resiliencia, SessaoExpiradaError, BotaoNaoEncontradoError, classificar_excecao,
+                        ERRO_SESSAO, ERRO_TIMEOUT, ERRO_ELEMENTO_OBSOLETO, ERRO_BOTAO)
+from html_archive import get_archive
+from registros import COLUNAS_CSV, linha_csv, registros_de_linhas
+from parse_cache import get_parse_cache, get_parse_cache_ativo, chave_resultado
+from pipeline import ScrapingPipeline, get_pipeline_ativo
+from extracao_dgb import JS_EXTRAIR_LINHAS, EXTRACAO_JSON, get_modo_extracao, validar_extracao
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Backends de coleta disponíveis
+BACKENDS = ('selenium', 'http', 'async')
+
 class DGBScraper:
-    def __init__(self, headless=True):  # Pode voltar para True
+    def __init__(self, headless=True, lean=None, extracao=None):  # Pode voltar para True
         self.headless = headless
+        self.lean = get_lean_browsing(lean)
+        self.extracao = get_modo_extracao(extracao)
         self.driver = None
         self.usuario = os.getenv('DGB_USUARIO')
         self.senha = os.getenv('DGB_SENHA')
         self.url_login = os.getenv('DGB_URL_LOGIN')
         self.url_estoque = os.getenv('DGB_URL_ESTOQUE')
+        self.latencias = LatencyHistogram()
+        # Um cache por navegador vivo: workers do pool não dividem JSESSIONID/ViewState
+        self.slot_sessao = reservar_slot()
+        self.sessao_cache = SessionCache(self.usuario, self.senha, self.url_login,
+                                         caminho=caminho_do_slot(self.slot_sessao))
+        self.sessao_reutilizada = False
         self.setup_driver()
+        self.espera = DGBWaitEngine(self.driver)
     
     def setup_driver(self):
         """Configura o navegador"""
@@ -39,19 +65,26 @@ class DGBScraper:
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+        if self.lean:
+            configurar_opcoes_lean(chrome_options)
         
         self.driver = webdriver.Chrome(options=chrome_options)
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        
+        # Lean browsing: só o DOM interessa, imagens/fontes/CSS/analytics são descartados
+        if self.lean:
+            ativar_bloqueio_cdp(self.driver)
     
     def login(self):
         """Realiza login no sistema"""
         try:
             logger.info("Realizando login...")
             self.driver.get(self.url_login)
-            time.sleep(3)
             
-            # Preencher login
-            login_field = self.driver.find_element(By.ID, "login")
+            # Preencher login (aguarda o campo em vez de pausa fixa)
+            login_field = self.espera.wait_for_element(By.ID, "login", timeout=15)
+            if login_field is None:
+                login_field = self.driver.find_element(By.ID, "login")
             login_field.clear()
             login_field.send_keys(self.usuario)
             
@@ -66,8 +99,11 @@ class DGBScraper:
             except:
                 login_button = self.driver.find_element(By.ID, "botaoEntrar")
             
+            url_login_atual = self.driver.current_url
             login_button.click()
-            time.sleep(5)
+            
+            # Aguardar o redirecionamento pós-login
+            self.espera.wait_url_change(url_login_atual, timeout=15)
             
             # Verificar se login foi bem-sucedido
             current_url = self.driver.current_url
@@ -87,7 +123,7 @@ class DGBScraper:
         try:
             logger.info("Navegando para página de estoque...")
             self.driver.get(self.url_estoque)
-            time.sleep(5)
+            self.espera.wait_for_element(By.ID, "produto", timeout=15)
             
             # Verificar se carregou
             if "estoquePrevisaoConsulta" in self.driver.current_url:
@@ -107,6 +143,60 @@ class DGBScraper:
             logger.error(f"Erro ao navegar para estoque: {e}")
             return False
     
+    def restore_session(self):
+        """Injeta os cookies em cache e valida a sessão com uma única navegação ao estoque"""
+        cookies = self.sessao_cache.load()
+        if not cookies:
+            return False
+        
+        try:
+            logger.info("Reaproveitando sessão em cache...")
+            for cookie in cookies:
+                parametros = {
+                    'name': cookie['name'],
+                    'value': cookie['value'],
+                    'domain': cookie.get('domain'),
+                    'path': cookie.get('path', '/'),
+                    'secure': cookie.get('secure', False),
+                    'httpOnly': cookie.get('httpOnly', False)
+                }
+                if cookie.get('expiry'):
+                    parametros['expires'] = cookie['expiry']
+                # CDP permite definir cookies sem carregar uma página do domínio antes
+                self.driver.execute_cdp_cmd('Network.setCookie', parametros)
+            
+            # Requisição de validação: a própria página de estoque
+            if (self.navigate_to_stock()
+                    and self.driver.find_elements(By.ID, "produto")
+                    and not self.driver.find_elements(By.ID, "senha")):
+                logger.info("✅ Sessão em cache válida - login dispensado")
+                self.sessao_reutilizada = True
+                return True
+        except Exception as e:
+            logger.warning(f"Não foi possível reaproveitar a sessão: {e}")
+        
+        logger.info("Sessão em cache expirada - novo login necessário")
+        self.sessao_cache.discard()
+        self.driver.delete_all_cookies()
+        return False
+    
+    def ensure_session(self):
+        """Garante sessão autenticada na página de estoque, fazendo login só quando necessário"""
+        if self.restore_session():
+            return True
+        
+        self.sessao_reutilizada = False
+        if not self.login():
+            return False
+        if not self.navigate_to_stock():
+            return False
+        
+        try:
+            self.sessao_cache.save(self.driver.get_cookies())
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar a sessão em cache: {e}")
+        return True
+    
     def search_product(self, codigo, situacao="TINTO"):
         """Pesquisa um produto específico e retorna HTML - VERSÃO CORRIGIDA"""
         try:
@@ -159,50 +249,105 @@ class DGBScraper:
                             inp_value = inp.get_attribute('value') or 'sem-valor'
                             if inp_type == 'submit':
                                 logger.info(f"  Input submit {i}: id='{inip_id}', value='{inp_value}'")
-                        raise Exception("Botão 'Pesquisar' não encontrado")
+                        raise BotaoNaoEncontradoError("Botão 'Pesquisar' não encontrado")
             
-            # Clicar em pesquisar
+            # Marcar resultados anteriores e clicar em pesquisar
+            self.espera.mark_results()
+            inicio = time.monotonic()
             pesquisar_button.click()
             logger.info("✅ Botão clicado")
             
-            # Aguardar resultados - aumentar tempo
-            logger.info("Aguardando resultados (8 segundos)...")
-            time.sleep(8)
+            # Aguardar o ciclo AJAX terminar (retorna assim que os resultados estabilizam)
+            estado, info = self.espera.wait_for_results()
+            latencia = time.monotonic() - inicio
+            self.latencias.observe(latencia)
             
-            # Verificar se há resultados
-            try:
-                # Verificar se há a mensagem de total
-                self.driver.find_element(By.ID, "estoqueTotal")
-                logger.info("✅ Resultados encontrados para o produto")
-            except:
-                logger.warning("Possivelmente nenhum resultado encontrado")
+            if estado == ESTADO_RESULTADOS:
+                logger.info(f"✅ {info.get('linhas')} linhas de resultado em {latencia:.2f}s")
+            elif estado == ESTADO_SEM_RESULTADOS:
+                logger.warning(f"Nenhum resultado para o produto {codigo} ({latencia:.2f}s)")
+            else:
+                logger.warning(f"Timeout aguardando resultados do produto {codigo} ({latencia:.2f}s)")
             
-            # Obter HTML
-            html = self.driver.page_source
+            # Sessão expirada: o DGB devolve a tela de login no lugar do estoque
+            if self.driver.find_elements(By.ID, "senha"):
+                raise SessaoExpiradaError("Sessão expirada - página de login retornada")
             
-            return {
+            resultado = {
                 'success': True,
                 'codigo': codigo,
-                'html': html,
+                'estado': estado,
+                'latencia': round(latencia, 3),
                 'timestamp': datetime.now().isoformat()
             }
             
+            # Extração no navegador: só as linhas voltam; o HTML completo apenas se falhar
+            linhas = self.extract_rows() if self.extracao == EXTRACAO_JSON else None
+            if linhas is not None:
+                resultado['linhas'] = linhas
+            else:
+                resultado['html'] = self.driver.page_source
+            
+            return resultado
+            
         except Exception as e:
             logger.error(f"Erro ao pesquisar produto {codigo}: {e}")
-            # Tentar salvar screenshot para debug
-            try:
-                screenshot_path = f"debug_error_{codigo}.png"
-                self.driver.save_screenshot(screenshot_path)
-                logger.info(f"Screenshot salvo: {screenshot_path}")
-            except:
-                pass
-            
             return {
                 'success': False,
                 'codigo': codigo,
-                'error': str(e)
+                'error': str(e),
+                'tipo_erro': classificar_excecao(e)
             }
     
+    def save_error_screenshot(self, codigo):
+        """Salva screenshot da página para debug de uma pesquisa que falhou"""
+        if not self.driver:
+            return None
+        try:
+            screenshot_path = f"debug_error_{codigo}.png"
+            self.driver.save_screenshot(screenshot_path)
+            logger.info(f"Screenshot salvo: {screenshot_path}")
+            return screenshot_path
+        except:
+            return None
+    
+    def is_healthy(self):
+        """Navegador respondendo, logado e na página de estoque (sem navegar)"""
+        try:
+            return (bool(self.driver.find_elements(By.ID, "produto"))
+                    and not self.driver.find_elements(By.ID, "senha"))
+        except Exception:
+            return False
+    
+    def recover(self, tipo_erro):
+        """Prepara a próxima tentativa conforme o erro: novo login ou recarga do estoque"""
+        try:
+            if tipo_erro == ERRO_SESSAO:
+                logger.info("🔑 Sessão expirada - refazendo login")
+                self.sessao_cache.discard()
+                return self.ensure_session()
+            if tipo_erro in (ERRO_TIMEOUT, ERRO_ELEMENTO_OBSOLETO, ERRO_BOTAO):
+                # Página nova: DOM, ViewState e formulário limpos
+                return self.navigate_to_stock()
+        except Exception as e:
+            logger.warning(f"Falha ao recuperar após {tipo_erro}: {e}")
+        return False
+    
+    def extract_rows(self):
+        """Extrai as linhas de resultado com um único execute_script; None se a validação falhar"""
+        try:
+            dados = self.driver.execute_script(JS_EXTRAIR_LINHAS)
+        except Exception as e:
+            logger.warning(f"Extração no navegador falhou, usando page_source: {e}")
+            return None
+        
+        valido, motivo = validar_extracao(dados)
+        if not valido:
+            logger.warning(f"Extração no navegador inválida ({motivo}), usando page_source")
+            return None
+        
+        return dados['linhas']
+    
     def clear_form_fields(self):
         """Limpa todos os campos do formulário"""
         try:
@@ -216,18 +361,12 @@ class DGBScraper:
         except:
             pass
     
-    def save_html_for_debug(self, html_content, produto_codigo):
-        """Salva HTML para debug"""
+    @staticmethod
+    def save_html_for_debug(html_content, produto_codigo):
+        """Arquiva o HTML para debug (comprimido e deduplicado); retorna o hash"""
         try:
-            os.makedirs('debug', exist_ok=True)
-            filename = f"debug_produto_{produto_codigo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-            filepath = os.path.join('debug', filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            
-            logger.info(f"✅ HTML salvo para debug: {filename}")
-            return filename
+            entrada = get_archive().put(html_content, produto_codigo)
+            return entrada['hash']
         except Exception as e:
             logger.error(f"Erro ao salvar HTML debug: {e}")
             return None
@@ -238,31 +377,9 @@ class DGBScraper:
             # Salvar HTML para debug primeiro
             self.save_html_for_debug(html_content, produto_codigo)
             
-            # Usar o parser simplificado
-            registros = parser_dgb.parse_html_dgb_simples(html_content, produto_codigo)
-            
-            if not registros:
-                logger.warning(f"Nenhum registro extraído para {produto_codigo}")
-                # Usar parser de emergência
-                registros = parser_dgb.parse_emergencia_simples(html_content, produto_codigo)
-            
-            # Criar pasta csv se não existir
-            os.makedirs('csv', exist_ok=True)
-            
-            # Nome do arquivo
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"produto_{produto_codigo}_{timestamp}.csv"
-            filepath = os.path.join('csv', filename)
-            
-            # Escrever CSV
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-                writer.writerow(['artigo', 'datahora', 'Produto / Situação / Cor / Desenho / Variante',
-                               'Previsão', 'Estoque', 'Pedidos', 'Disponível'])
-                writer.writerows(registros)
-            
-            logger.info(f"✅ CSV criado: {filename} ({len(registros)} registros)")
-            return filename
+            # Registros gerados à medida que as linhas são lidas, gravados direto no CSV
+            registros = parser_dgb.iterar_registros_html(html_content, produto_codigo)
+            return self.write_csv(registros, produto_codigo)
             
         except Exception as e:
             logger.error(f"❌ Erro ao criar CSV para {produto_codigo}: {e}")
@@ -287,34 +404,49 @@ class DGBScraper:
             except:
                 return None
     
+    @staticmethod
+    def create_csv_from_rows(linhas, produto_codigo):
+        """Cria CSV a partir das linhas extraídas no navegador (sem HTML)"""
+        try:
+            registros = parser_dgb.parse_linhas_extraidas(linhas, produto_codigo)
+            return DGBScraper.write_csv(registros, produto_codigo)
+        except Exception as e:
+            logger.error(f"❌ Erro ao criar CSV para {produto_codigo}: {e}")
+            return None
+    
+    @staticmethod
+    def write_csv(registros, produto_codigo, timestamp=None):
+        """
+        Grava os registros em csv/produto_<codigo>_<timestamp>.csv, no formato brasileiro.
+        Aceita lista ou gerador: cada registro é escrito assim que chega.
+        timestamp (AAAAMMDD_HHMMSS): momento dos dados; padrão agora.
+        """
+        # Criar pasta csv se não existir
+        os.makedirs('csv', exist_ok=True)
+        
+        # Nome do arquivo
+        timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"produto_{produto_codigo}_{timestamp}.csv"
+        filepath = os.path.join('csv', filename)
+        
+        # Escrever CSV
+        with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+            writer.writerow(COLUNAS_CSV)
+            total = 0
+            for registro in registros:
+                writer.writerow(linha_csv(registro))
+                total += 1
+        
+        logger.info(f"✅ CSV criado: {filename} ({total} registros)")
+        return filename
+    
     @staticmethod
     def create_csv_from_html_static(html_content, produto_codigo):
         """Método estático para criar CSV a partir de HTML"""
         try:
-            # Parsear HTML
-            registros = parser_dgb.parse_html_dgb_simples(html_content, produto_codigo)
-            
-            if not registros:
-                logger.warning(f"Nenhum registro extraído para {produto_codigo}")
-                return None
-            
-            # Criar pasta csv se não existir
-            os.makedirs('csv', exist_ok=True)
-            
-            # Nome do arquivo
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"produto_{produto_codigo}_{timestamp}.csv"
-            filepath = os.path.join('csv', filename)
-            
-            # Escrever CSV
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-                writer.writerow(['artigo', 'datahora', 'Produto / Situação / Cor / Desenho / Variante',
-                               'Previsão', 'Estoque', 'Pedidos', 'Disponível'])
-                writer.writerows(registros)
-            
-            logger.info(f"CSV criado: {filename} ({len(registros)} registros)")
-            return filename
+            registros = parser_dgb.iterar_registros_html(html_content, produto_codigo)
+            return DGBScraper.write_csv(registros, produto_codigo)
             
         except Exception as e:
             logger.error(f"Erro ao criar CSV para {produto_codigo}: {e}")
@@ -325,6 +457,7 @@ class DGBScraper:
         if self.driver:
             self.driver.quit()
             logger.info("Navegador fechado")
+        liberar_slot(self.slot_sessao)
 
 # Função auxiliar para criar CSV (pode ser chamada sem instância da classe)
 def create_csv_from_html(html_content, produto_codigo):
@@ -333,115 +466,256 @@ def create_csv_from_html(html_content, produto_codigo):
     Compatível com chamadas de outras partes do sistema
     """
     try:
-        # Parsear HTML
-        registros = parser_dgb.parse_html_dgb_simples(html_content, produto_codigo)
-        
-        if not registros:
-            logger.warning(f"Nenhum registro extraído para {produto_codigo}")
-            return None
-        
-        # Criar pasta csv se não existir
-        os.makedirs('csv', exist_ok=True)
-        
-        # Nome do arquivo
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"produto_{produto_codigo}_{timestamp}.csv"
-        filepath = os.path.join('csv', filename)
-        
-        # Escrever CSV
-        with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            writer.writerow(['artigo', 'datahora', 'Produto / Situação / Cor / Desenho / Variante',
-                           'Previsão', 'Estoque', 'Pedidos', 'Disponível'])
-            writer.writerows(registros)
-        
-        logger.info(f"CSV criado: {filename} ({len(registros)} registros)")
-        return filename
+        registros = parser_dgb.iterar_registros_html(html_content, produto_codigo)
+        return DGBScraper.write_csv(registros, produto_codigo)
         
     except Exception as e:
         logger.error(f"Erro ao criar CSV para {produto_codigo}: {e}")
         return None
 
-def run_scraping_thread(status_dict):
-    """Função executada na thread - VERSÃO CORRIGIDA"""
-    scraper = None
+def carregar_produtos(caminho='produtos.txt'):
+    """Lê a lista de produtos separada por vírgula"""
+    with open(caminho, 'r') as f:
+        return [p.strip() for p in f.read().split(',') if p.strip()]
+
+def get_backend(valor=None):
+    """Backend de coleta: 'selenium' (padrão), 'http' ou 'async', via parâmetro ou DGB_BACKEND"""
+    backend = (valor or os.getenv('DGB_BACKEND', 'selenium')).strip().lower()
+    if backend not in BACKENDS:
+        logger.warning(f"Backend desconhecido '{backend}', usando selenium")
+        backend = 'selenium'
+    return backend
+
+def criar_scraper(backend='selenium', headless=False):
+    """Instancia o scraper do backend escolhido"""
+    if backend in ('http', 'async'):
+        from http_backend import DGBHttpScraper
+        return DGBHttpScraper(headless=headless)
+    return DGBScraper(headless=headless)
+
+def criar_scraper_logado(headless=False, backend='selenium'):
+    """Cria um scraper já logado e posicionado na página de estoque"""
+    scraper = criar_scraper(backend, headless=headless)
+    
+    # Reaproveita a sessão em cache; login só quando o cookie expirou
+    if not scraper.ensure_session():
+        scraper.close()
+        raise RuntimeError('Falha no login ou ao acessar estoque')
+    
+    return scraper
+
+def buscar_produto(scraper, produto, resiliencia=None):
+    """Só a pesquisa (com retentativas, se houver política) - etapa de fetch do pipeline"""
+    logger.info(f"\n{'='*60}")
+    logger.info(f"Processando produto {produto}")
+    logger.info(f"{'='*60}")
+    
+    # Pesquisar produto
+    if resiliencia:
+        resultado = resiliencia.pesquisar(scraper, produto)
+    else:
+        resultado = scraper.search_product(produto)
+    
+    if not resultado['success']:
+        scraper.save_error_screenshot(produto)
+    
+    return resultado
+
+def parsear_resultado(resultado):
+    """Etapa de parse do pipeline: registros do CSV a partir das linhas ou do HTML"""
+    produto = resultado['codigo']
+    
+    # Mesmo conteúdo da última execução: reaproveitar os registros já parseados, com o horário desta pesquisa
+    if get_parse_cache_ativo():
+        chave = chave_resultado(resultado)
+        entrada = get_parse_cache().get(produto, chave)
+        if entrada:
+            resultado['inalterado'] = True
+            resultado['csv_anterior'] = entrada.get('csv_file')
+            logger.info(f"♻️  Produto {produto} inalterado desde {entrada.get('atualizado_em')} - parse reaproveitado")
+            datahora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            return [registro._replace(datahora=datahora) for registro in registros_de_linhas(entrada['registros'])]
+        resultado['chave_parse'] = chave
+    
+    if 'linhas' in resultado:
+        return parser_dgb.parse_linhas_extraidas(resultado['linhas'], produto)
+    
+    registros = parser_dgb.parse_html_dgb_simples(resultado['html'], produto)
+    if not registros:
+        logger.warning(f"Nenhum registro extraído para {produto}")
+        registros = parser_dgb.parse_emergencia_simples(resultado['html'], produto)
+    return registros
+
+def escrever_resultado(resultado, registros):
+    """Etapa de escrita do pipeline: HTML de debug (se houver) e CSV"""
+    produto = resultado['codigo']
+    
+    # Arquivado mesmo sem mudança: o arquivo deduplica o conteúdo e registra a captura desta execução
+    if 'html' in resultado:
+        DGBScraper.save_html_for_debug(resultado['html'], produto)
+    
+    if resultado.get('inalterado'):
+        # Mesmas linhas com o horário desta pesquisa: o CSV novo substitui o anterior
+        anterior = resultado.pop('csv_anterior', None)
+        csv_filename = DGBScraper.write_csv(registros, produto)
+        if anterior and anterior != csv_filename:
+            try:
+                os.remove(os.path.join('csv', anterior))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Não foi possível remover {anterior}: {e}")
+        get_parse_cache().update_csv(produto, csv_filename)
+        return csv_filename
+    
+    csv_filename = DGBScraper.write_csv(registros, produto)
+    
+    chave = resultado.pop('chave_parse', None)
+    if chave and registros:
+        get_parse_cache().put(produto, chave, registros, csv_filename)
+    return csv_filename
+
+def gerar_csv(resultado):
+    """Parse e escrita na mesma thread (sem pipeline); retorna o nome do CSV ou None"""
+    try:
+        return escrever_resultado(resultado, parsear_resultado(resultado))
+    except Exception as e:
+        logger.error(f"❌ Erro ao criar CSV para {resultado.get('codigo')}: {e}")
+        return None
+
+def processar_produto(scraper, produto, resiliencia=None):
+    """Pesquisa um produto e cria o CSV correspondente, tudo na mesma thread"""
+    resultado = buscar_produto(scraper, produto, resiliencia)
+    
+    # Se obteve as linhas (ou o HTML) com sucesso, criar CSV
+    if resultado['success'] and ('linhas' in resultado or 'html' in resultado):
+        csv_filename = gerar_csv(resultado)
+        
+        if csv_filename:
+            resultado['csv_file'] = csv_filename
+            logger.info(f"✅ Produto {produto} processado - CSV criado")
+        else:
+            resultado['success'] = False
+            resultado['error'] = 'Não foi possível criar CSV'
+            logger.error(f"❌ Produto {produto}: erro ao criar CSV")
+    
+    return resultado
+
+def run_scraping_thread(status_dict, num_workers=None, backend=None, retomar=False):
+    """Função executada na thread - distribui os produtos entre N navegadores"""
+    journal = None
+    pipeline = None
     
     try:
-        # Carregar produtos
-        with open('produtos.txt', 'r') as f:
-            produtos = [p.strip() for p in f.read().split(',') if p.strip()]
+        backend = get_backend(backend)
+        status_dict['csv_files'] = []  # Lista de CSVs criados
         
-        status_dict['total'] = len(produtos)
+        if retomar:
+            # Retomar a última execução: pular o que o diário já registrou como concluído
+            journal = RunJournal.latest()
+            if journal is None:
+                status_dict['message'] = 'Nenhuma execução para retomar'
+                return
+            
+            cabecalho, _ = journal.load()
+            produtos, concluidos = journal.pending()
+            total = len(cabecalho.get('produtos', []))
+            
+            for registro in concluidos:
+                status_dict['results'].append({
+                    'success': True,
+                    'codigo': registro['codigo'],
+                    'csv_file': registro.get('csv_file'),
+                    'html_sha256': registro.get('html_sha256'),
+                    'linhas_sha256': registro.get('linhas_sha256'),
+                    'timestamp': registro.get('timestamp'),
+                    'inalterado': registro.get('inalterado', False),
+                    'retomado': True
+                })
+                if registro.get('csv_file'):
+                    status_dict['csv_files'].append(registro['csv_file'])
+            
+            logger.info(f"🔁 Retomando {journal.caminho}: {len(concluidos)} concluídos, {len(produtos)} pendentes")
+        else:
+            # Carregar produtos
+            produtos = carregar_produtos()
+            total = len(produtos)
+            journal = RunJournal.create(produtos, backend)
+        
+        status_dict['backend'] = backend
+        status_dict['journal'] = journal.caminho
+        status_dict['total'] = total
         status_dict['message'] = f'Processando {len(produtos)} produtos'
-        status_dict['csv_files'] = []  # Lista de CSVs criados
         
-        # Iniciar scraper
-        scraper = DGBScraper(headless=False)  # False para ver o que está acontecendo
+        # Ritmo adaptativo entre consultas (substitui a pausa fixa de 3s)
+        limitador = AdaptiveRateLimiter.from_env()
+        status_dict['rate_limiter'] = limitador.snapshot()
         
-        # Login
-        status_dict['message'] = 'Realizando login...'
-        if not scraper.login():
-            status_dict['message'] = 'Falha no login'
-            status_dict['running'] = False
-            return
+        # Retentativas por classe de erro + circuit breaker compartilhado entre os workers
+        resiliencia = Resiliencia(continuar=lambda: status_dict['running'])
+        status_dict['resiliencia'] = resiliencia.to_dict()
         
-        # Navegar para estoque
-        status_dict['message'] = 'Navegando para estoque...'
-        if not scraper.navigate_to_stock():
-            status_dict['message'] = 'Erro ao acessar estoque'
-            status_dict['running'] = False
-            return
+        # Fetch só pesquisa; parse e escrita do CSV rodam em segundo plano
+        if get_pipeline_ativo():
+            pipeline = ScrapingPipeline(status_dict, parsear_resultado, escrever_resultado)
+            processar = lambda scraper, produto: buscar_produto(scraper, produto, resiliencia)
+        else:
+            processar = lambda scraper, produto: processar_produto(scraper, produto, resiliencia)
         
-        status_dict['message'] = 'Iniciando consultas...'
+        if backend == 'async':
+            # Motor assíncrono: muitas pesquisas em paralelo sobre poucas conexões
+            from async_engine import AsyncScrapingEngine
+            pool = AsyncScrapingEngine(status_dict, produtos, ao_registrar=journal.record, limitador=limitador,
+                                       resiliencia=resiliencia, pipeline=pipeline, gerar_csv=gerar_csv)
+        else:
+            # False para ver o que está acontecendo
+            pool = ScrapingWorkerPool(
+                status_dict,
+                produtos,
+                criar_scraper=lambda: criar_scraper_logado(headless=False, backend=backend),
+                processar=processar,
+                num_workers=get_num_workers(num_workers),
+                ao_registrar=journal.record,
+                limitador=limitador,
+                resiliencia=resiliencia,
+                pipeline=pipeline
+            )
         
-        # Processar cada produto
-        for i, produto in enumerate(produtos, 1):
-            if not status_dict['running']:
-                break
-            
-            status_dict['current'] = produto
-            status_dict['progress'] = int((i / len(produtos)) * 100)
-            status_dict['message'] = f'Processando {produto} ({i}/{len(produtos)})'
-            
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Processando produto {produto} ({i}/{len(produtos)})")
-            logger.info(f"{'='*60}")
-            
-            # Pesquisar produto
-            resultado = scraper.search_product(produto)
-            
-            # Se obteve HTML com sucesso, criar CSV
-            if resultado['success'] and 'html' in resultado:
-                # Criar CSV
-                csv_filename = scraper.create_csv_from_html(resultado['html'], produto)
-                
-                if csv_filename:
-                    resultado['csv_file'] = csv_filename
-                    status_dict['csv_files'].append(csv_filename)
-                    logger.info(f"✅ Produto {produto} processado - CSV criado")
-                else:
-                    resultado['success'] = False
-                    resultado['error'] = 'Não foi possível criar CSV'
-                    logger.error(f"❌ Produto {produto}: erro ao criar CSV")
-            
-            status_dict['results'].append(resultado)
-            
-            # Pequena pausa entre consultas
-            time.sleep(3)
+        if produtos and not pool.run():
+            status_dict['message'] = 'Falha no login ou ao acessar estoque'
+            return
         
         # Resumo final
         sucessos = sum(1 for r in status_dict['results'] if r.get('success'))
         erros = sum(1 for r in status_dict['results'] if not r.get('success'))
+        inalterados = sum(1 for r in status_dict['results'] if r.get('inalterado'))
         
-        status_dict['message'] = f'✅ Scraping concluído! {sucessos} sucessos, {erros} erros'
+        status_dict['message'] = f'✅ Scraping concluído! {sucessos} sucessos ({inalterados} inalterados), {erros} erros'
+        status_dict['parse_cache'] = dict(get_parse_cache().to_dict(), inalterados=inalterados)
         status_dict['end_time'] = datetime.now().isoformat()
+        if status_dict['running']:
+            journal.finish(status_dict['message'])
         
         logger.info(f"\n{'='*60}")
         logger.info(f"📊 RESUMO FINAL")
         logger.info(f"{'='*60}")
         logger.info(f"✅ Sucessos: {sucessos}")
         logger.info(f"❌ Erros: {erros}")
+        logger.info(f"♻️  Inalterados (sem novo parse): {inalterados}")
         logger.info(f"📁 CSVs criados: {len(status_dict['csv_files'])}")
+        pool.log_resumo()
+        if pipeline:
+            pipeline.log_resumo()
+        status_dict['resiliencia'] = resiliencia.to_dict()
+        resiliencia.log_resumo()
+        
+        # Tempo recuperado em relação à antiga espera fixa de 8s por produto
+        latencia = pool.latencias.to_dict()
+        economia = latencia['total'] * 8 - latencia['soma_s']
+        latencia['economia_vs_espera_fixa_s'] = round(economia, 1)
+        status_dict['latencia'] = latencia
+        pool.latencias.log_resumo()
+        logger.info(f"⏱️  Tempo economizado vs espera fixa de 8s: {economia:.1f}s")
         logger.info(f"{'='*60}")
         
     except Exception as e:
@@ -451,6 +725,7 @@ def run_scraping_thread(status_dict):
         status_dict['message'] = f'❌ Erro: {str(e)}'
     
     finally:
-        if scraper:
-            scraper.close()
-        status_dict['running'] = False
\ No newline at end of file
+        if pipeline:
+            pipeline.close()
+        parser_dgb.salvar_estrategias_cor()
+        status_dict['running'] = False
@@ -0,0 +1,145 @@
+# session_cache.py - Cache criptografado dos cookies da sessão DGB
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from cryptography.fernet import Fernet, InvalidToken
+
+logger = logging.getLogger(__name__)
+
+CACHE_FOLDER = 'cache'
+CACHE_FILE = os.path.join(CACHE_FOLDER, 'dgb_session.bin')
+
+# Slots em uso neste processo: cada navegador vivo tem a sua sessão (JSESSIONID e ViewState próprios)
+_slots_em_uso = set()
+_slots_lock = threading.Lock()
+
+def reservar_slot():
+    """Menor slot livre neste processo (0 para o primeiro navegador)"""
+    with _slots_lock:
+        slot = 0
+        while slot in _slots_em_uso:
+            slot += 1
+        _slots_em_uso.add(slot)
+        return slot
+
+def liberar_slot(slot):
+    """Devolve o slot quando o navegador é fechado"""
+    with _slots_lock:
+        _slots_em_uso.discard(slot)
+
+def caminho_do_slot(slot):
+    """Arquivo do cache de um slot (o slot 0 mantém o nome original)"""
+    if not slot:
+        return CACHE_FILE
+    return os.path.join(CACHE_FOLDER, f'dgb_session_{slot}.bin')
+
+def get_session_ttl():
+    """Validade máxima da sessão em cache (segundos), via DGB_SESSION_TTL"""
+    try:
+        return int(os.getenv('DGB_SESSION_TTL', '3600'))
+    except ValueError:
+        return 3600
+
+def _derivar_chave(usuario, senha, url):
+    """Chave derivada das credenciais"""
+    segredo = f"{usuario}|{senha}|{url}".encode('utf-8')
+    return base64.urlsafe_b64encode(hashlib.sha256(segredo).digest())
+
+def _criar_fernet(usuario, senha, url):
+    """Usa DGB_SESSION_KEY se definida e válida; senão a chave derivada das credenciais"""
+    chave = os.getenv('DGB_SESSION_KEY')
+    if chave:
+        try:
+            return Fernet(chave.encode())
+        except (ValueError, TypeError) as e:
+            logger.warning(f"DGB_SESSION_KEY inválida ({e}), usando a chave derivada das credenciais")
+    return Fernet(_derivar_chave(usuario, senha, url))
+
+class SessionCache:
+    """Guarda os cookies (JSESSIONID e afins) de um login bem-sucedido em disco, criptografados"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, usuario, senha, url, caminho=CACHE_FILE, ttl=None):
+        self.caminho = caminho
+        self.ttl = ttl if ttl is not None else get_session_ttl()
+        self.fernet = _criar_fernet(usuario, senha, url)
+        # Conteúdo do arquivo que esta instância leu ou gravou por último
+        self._token = None
+
+    def load(self):
+        """Retorna a lista de cookies em cache ou None se ausente/expirada"""
+        with self._lock:
+            if not os.path.exists(self.caminho):
+                return None
+            try:
+                with open(self.caminho, 'rb') as f:
+                    token = f.read()
+                dados = json.loads(self.fernet.decrypt(token))
+                self._token = token
+            except (InvalidToken, ValueError, OSError) as e:
+                logger.warning(f"Cache de sessão inválido, descartando: {e}")
+                self._remover()
+                return None
+
+        agora = time.time()
+        if agora - dados.get('salvo_em', 0) > self.ttl:
+            logger.info("Sessão em cache expirada (TTL)")
+            self.discard()
+            return None
+
+        cookies = [c for c in dados.get('cookies', []) if not c.get('expiry') or c['expiry'] > agora]
+        if not any(c.get('name', '').upper() == 'JSESSIONID' for c in cookies):
+            logger.info("Cookie de sessão ausente ou expirado no cache")
+            self.discard()
+            return None
+
+        return cookies
+
+    def save(self, cookies):
+        """Grava os cookies criptografados (escrita atômica)"""
+        dados = {'salvo_em': time.time(), 'cookies': cookies}
+        token = self.fernet.encrypt(json.dumps(dados).encode('utf-8'))
+        with self._lock:
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            temporario = f"{self.caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, 'wb') as f:
+                f.write(token)
+            os.replace(temporario, self.caminho)
+            self._token = token
+        logger.info(f"🔐 Sessão salva em cache ({len(cookies)} cookies)")
+
+    def clear(self):
+        """Remove o cache de sessão"""
+        with self._lock:
+            self._remover()
+            self._token = None
+
+    def discard(self):
+        """
+        Remove o cache só se ele ainda for a entrada que esta instância leu ou gravou:
+        uma sessão nova salva por outro navegador/processo nesse meio tempo é mantida
+        """
+        with self._lock:
+            if self._token is None:
+                return False
+            try:
+                with open(self.caminho, 'rb') as f:
+                    atual = f.read()
+            except OSError:
+                atual = None
+            descartado = atual == self._token
+            if descartado:
+                self._remover()
+            self._token = None
+            return descartado
+
+    def _remover(self):
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
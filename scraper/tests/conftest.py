@@ -0,0 +1,8 @@
+# conftest.py - Os módulos do scraper são planos (importados a partir de scraper/)
+import os
+import sys
+
+PASTA_SCRAPER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if PASTA_SCRAPER not in sys.path:
+    sys.path.insert(0, PASTA_SCRAPER)
@@ -0,0 +1,105 @@
+# test_async_engine.py - Motor assíncrono contra o DGB falso
+import time
+import threading
+
+import pytest
+
+from async_engine import AsyncScrapingEngine
+from rate_limiter import AdaptiveRateLimiter
+from fake_dgb_server import FakeDGBServer, carregar_capturas
+from parser_dgb import parse_html_dgb_simples
+from registros import linha_csv
+
+TIMESTAMP = '2026-01-21 14:33:46'
+
+CAPTURAS = carregar_capturas()
+PRODUTOS = sorted(CAPTURAS)[:4]
+
+def registros_csv(html, produto):
+    return [linha_csv(r) for r in parse_html_dgb_simples(html, produto, timestamp=TIMESTAMP)]
+
+def novo_status(produtos):
+    return {'running': True, 'results': [], 'csv_files': [], 'total': len(produtos),
+            'message': '', 'current': None, 'progress': 0}
+
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('DGB_SESSION_KEY', raising=False)
+    servidor = FakeDGBServer(CAPTURAS).start()
+    for nome, valor in servidor.env().items():
+        monkeypatch.setenv(nome, valor)
+    yield servidor
+    servidor.stop()
+
+def executar(produtos, **kwargs):
+    """Roda o motor e devolve {produto: html} das pesquisas que foram para o CSV"""
+    gerados = {}
+
+    def gerar_csv(resultado):
+        gerados[resultado['codigo']] = resultado['html']
+        return f"estoque_{resultado['codigo']}.csv"
+
+    status = novo_status(produtos)
+    motor = AsyncScrapingEngine(status, produtos, gerar_csv=gerar_csv, **kwargs)
+    assert motor.run()
+    return status, gerados
+
+def test_resposta_de_outro_produto_e_repetida(servidor, monkeypatch):
+    # Primeira pesquisa de cada produto volta com as linhas de outro (view JSF compartilhada)
+    original = servidor.captura
+    trocados = set()
+    lock = threading.Lock()
+
+    def captura_trocada(produto):
+        with lock:
+            primeira = produto not in trocados
+            trocados.add(produto)
+        if primeira:
+            outro = PRODUTOS[(PRODUTOS.index(produto) + 1) % len(PRODUTOS)]
+            return original(outro)
+        return original(produto)
+
+    monkeypatch.setattr(servidor, 'captura', captura_trocada)
+    status, gerados = executar(PRODUTOS, concorrencia=4)
+
+    assert all(r['success'] for r in status['results'])
+    # (o GET da página de estoque também passa por captura(), então nem todo produto é trocado)
+    assert servidor.to_dict()['pesquisas'] > len(PRODUTOS)
+    for produto in PRODUTOS:
+        assert registros_csv(gerados[produto], produto) == registros_csv(CAPTURAS[produto], produto)
+
+def test_produto_sempre_trocado_vira_erro_e_nao_gera_csv(servidor, monkeypatch):
+    original = servidor.captura
+    monkeypatch.setattr(servidor, 'captura', lambda produto: original(PRODUTOS[1]))
+
+    status, gerados = executar([PRODUTOS[0]])
+
+    assert list(gerados) == []
+    assert status['results'][0]['tipo_erro'] == 'wrong_product'
+
+def test_recuo_no_meio_da_execucao_atrasa_as_pesquisas_seguintes(servidor, monkeypatch):
+    # A 3ª pesquisa recebe HTTP 500; as demais respondem na hora
+    horarios = []
+    contar = servidor._contar
+
+    def contar_com_horario(chave):
+        if chave == 'pesquisas':
+            horarios.append(time.monotonic())
+        contar(chave)
+
+    monkeypatch.setattr(servidor, '_contar', contar_com_horario)
+    monkeypatch.setattr(servidor, '_sortear', lambda taxa: taxa == servidor.taxa_erro and len(horarios) == 3)
+    servidor.taxa_erro = 1.0
+
+    limitador = AdaptiveRateLimiter(taxa_inicial=10, taxa_max=10, incremento=0, recuo_base=1.0)
+    produtos = (PRODUTOS * 2)[:6]
+    status, _ = executar(produtos, concorrencia=6, limitador=limitador)
+
+    assert [r['success'] for r in status['results']].count(False) == 1
+    assert len(horarios) == len(produtos)
+    intervalos = [b - a for a, b in zip(horarios, horarios[1:])]
+    # Antes do erro: ~0,1 s entre pesquisas; depois: o recuo de 1 s vale para as que já esperavam
+    assert max(intervalos[:2]) < 0.5
+    assert intervalos[2] >= 0.8
+    assert limitador.snapshot()['total_recuos'] == 1
@@ -0,0 +1,83 @@
+# test_bulk_reparse.py - Reprocessamento das capturas arquivadas sem apagar CSVs mais novos
+import os
+
+import pytest
+
+import bulk_reparse
+from fake_dgb_server import carregar_capturas
+from html_archive import HtmlArchive
+
+CAPTURAS = carregar_capturas()
+PRODUTO = sorted(CAPTURAS)[0]
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DGB_PARSE_CACHE', '0')
+    os.makedirs('csv')
+    return tmp_path
+
+def arquivar(pasta, timestamp):
+    HtmlArchive(str(pasta / 'arquivo')).put(CAPTURAS[PRODUTO], PRODUTO, timestamp=timestamp)
+
+def gravar_csv(timestamp, conteudo='dados da pesquisa'):
+    nome = f'produto_{PRODUTO}_{timestamp}.csv'
+    with open(os.path.join('csv', nome), 'w', encoding='utf-8') as f:
+        f.write(conteudo)
+    return nome
+
+def reparsear(pasta, **kwargs):
+    return bulk_reparse.reparsear_arquivo(bulk_reparse.status_inicial(), num_workers=1,
+                                          pasta_archive=str(pasta / 'arquivo'), **kwargs)
+
+def test_captura_mais_velha_que_o_csv_nao_substitui_o_csv(pasta):
+    # Captura HTML antiga; depois uma pesquisa com extração JSON (nada arquivado) gerou um CSV novo
+    arquivar(pasta, '20260101_100000')
+    recente = gravar_csv('20260201_120000')
+
+    status = reparsear(pasta)
+
+    assert os.listdir('csv') == [recente]
+    with open(os.path.join('csv', recente), encoding='utf-8') as f:
+        assert f.read() == 'dados da pesquisa'
+    assert status['concluidos'] == 0
+    assert status['pulados'] == [{'produto': PRODUTO, 'captura': '20260101_100000', 'csv_mais_novo': recente}]
+
+def test_captura_atual_substitui_o_csv_gerado_dela(pasta):
+    arquivar(pasta, '20260201_120000')
+    do_scraping = gravar_csv('20260201_120003')
+    antigo = gravar_csv('20260101_100000')
+
+    status = reparsear(pasta)
+
+    assert status['concluidos'] == 1 and not status['pulados']
+    # O nome leva o momento da captura, não o do reprocessamento
+    assert os.listdir('csv') == [f'produto_{PRODUTO}_20260201_120000.csv']
+    assert do_scraping not in os.listdir('csv') and antigo not in os.listdir('csv')
+
+def test_por_padrao_apaga_so_os_csvs_anteriores_a_captura(pasta, monkeypatch):
+    arquivar(pasta, '20260201_120000')
+    antigo = gravar_csv('20260101_100000')
+    parsear = bulk_reparse.reparsear_captura
+
+    def parse_com_pesquisa_no_meio(*args, **kwargs):
+        # Uma pesquisa grava um CSV novo enquanto a captura é reprocessada
+        gravar_csv('20260301_090000')
+        return parsear(*args, **kwargs)
+    monkeypatch.setattr(bulk_reparse, 'reparsear_captura', parse_com_pesquisa_no_meio)
+
+    status = reparsear(pasta)
+
+    assert sorted(os.listdir('csv')) == [f'produto_{PRODUTO}_20260201_120000.csv',
+                                         f'produto_{PRODUTO}_20260301_090000.csv']
+    assert antigo not in os.listdir('csv')
+    assert status['concluidos'] == 1
+
+def test_sem_substituir_os_anteriores_ficam(pasta):
+    arquivar(pasta, '20260201_120000')
+    antigo = gravar_csv('20260101_100000')
+
+    status = reparsear(pasta, substituir=False)
+
+    assert sorted(os.listdir('csv')) == sorted([antigo, f'produto_{PRODUTO}_20260201_120000.csv'])
+    assert status['com_csvs_anteriores'] == 1
@@ -0,0 +1,45 @@
+# test_copias_estoque.py - Módulos copiados para estoque/ (app que roda da própria pasta) iguais aos do scraper
+import os
+import time
+import threading
+import importlib.util
+
+import pytest
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+COPIAS = ['numeros_br.py', 'rate_limiter.py']
+
+def carregar_do_estoque(nome):
+    """Módulo da pasta estoque/, com outro nome para não trocar o do scraper já importado"""
+    spec = importlib.util.spec_from_file_location(f'estoque_{nome}', os.path.join(RAIZ, 'estoque', f'{nome}.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+@pytest.mark.parametrize('arquivo', COPIAS)
+def test_copia_do_estoque_e_identica(arquivo):
+    with open(os.path.join(RAIZ, 'scraper', arquivo), 'rb') as f:
+        original = f.read()
+    with open(os.path.join(RAIZ, 'estoque', arquivo), 'rb') as f:
+        assert f.read() == original, f"estoque/{arquivo} difere de scraper/{arquivo}"
+
+def test_limitador_do_estoque_aplica_recuo_a_quem_ja_espera():
+    rate_limiter = carregar_do_estoque('rate_limiter')
+    limitador = rate_limiter.AdaptiveRateLimiter(taxa_inicial=10, recuo_base=0.6)
+    assert limitador.acquire()
+
+    liberado = []
+    inicio = time.monotonic()
+    espera = threading.Thread(target=lambda: liberado.append(limitador.acquire() and time.monotonic() - inicio))
+    espera.start()
+    # Sem recuo o próximo token sairia em 0,1 s; o recuo chega com a espera em andamento
+    time.sleep(0.03)
+    limitador.record({'success': False, 'codigo': '14', 'error': 'HTTP 500'})
+    espera.join(5)
+
+    assert liberado and liberado[0] >= 0.55
+
+def test_numeros_do_estoque_recusam_ponto_antes_dos_digitos():
+    numeros_br = carregar_do_estoque('numeros_br')
+    assert numeros_br.centavos_de_textos(['.542834', '..60,', '1.234,56']).tolist() == [0, 0, 123456]
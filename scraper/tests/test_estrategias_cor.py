@@ -0,0 +1,102 @@
+# test_estrategias_cor.py - Contagens de processos diferentes somadas no mesmo arquivo
+import json
+
+import estrategias_cor
+from estrategias_cor import CHAVE_GERAL, EstrategiasCor
+
+def contar(estrategias, chave, linhas, acertou=True):
+    for _ in range(linhas):
+        estrategias.registrar(chave, [('direto', acertou)])
+
+def no_disco(caminho):
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)['chaves']
+
+def test_gravacoes_de_processos_diferentes_sao_somadas(tmp_path):
+    # Dois workers do bulk_reparse: cada um carregou o arquivo antes de o outro gravar
+    caminho = str(tmp_path / 'estrategias.json')
+    primeiro, segundo = EstrategiasCor(caminho), EstrategiasCor(caminho)
+    contar(primeiro, '14', 30)
+    contar(segundo, '14', 12, acertou=False)
+    contar(segundo, '15', 5)
+
+    primeiro.salvar(forcar=True)
+    segundo.salvar(forcar=True)
+
+    chaves = no_disco(caminho)
+    assert chaves['14'] == {'linhas': 42, 'estrategias': {'direto': [42, 30]}}
+    assert chaves['15']['linhas'] == 5
+    assert chaves[CHAVE_GERAL]['linhas'] == 47
+
+    # Nova gravação só leva o que foi contado depois da anterior
+    contar(primeiro, '14', 1)
+    primeiro.salvar(forcar=True)
+    assert no_disco(caminho)['14']['linhas'] == 43
+    assert primeiro.to_dict()['15']['linhas'] == 5
+
+def test_arquivo_travado_adia_a_gravacao_sem_perder_contagens(tmp_path, monkeypatch):
+    monkeypatch.setattr(estrategias_cor, 'ESPERA_TRAVA_S', 0.05)
+    caminho = str(tmp_path / 'estrategias.json')
+    estrategias = EstrategiasCor(caminho)
+    contar(estrategias, '14', 3)
+
+    trava = tmp_path / 'estrategias.json.lock'
+    trava.write_text('')
+    estrategias.salvar(forcar=True)
+    assert not (tmp_path / 'estrategias.json').exists()
+
+    trava.unlink()
+    estrategias.salvar(forcar=True)
+    assert no_disco(caminho)['14']['linhas'] == 3
+
+def test_ordem_aprendida_desligada_por_padrao(monkeypatch):
+    monkeypatch.delenv('DGB_COR_APRENDIDA', raising=False)
+    assert estrategias_cor.get_cor_aprendida() is False
+    monkeypatch.setenv('DGB_COR_APRENDIDA', '1')
+    assert estrategias_cor.get_cor_aprendida() is True
+
+def test_contagens_retiradas_do_filho_sao_gravadas_pelo_principal(tmp_path):
+    caminho = str(tmp_path / 'estrategias.json')
+    filho, principal = EstrategiasCor(caminho), EstrategiasCor(caminho)
+    contar(filho, '14', 1500)
+
+    pendentes = filho.retirar_pendentes()
+    filho.salvar(forcar=True)
+    assert not (tmp_path / 'estrategias.json').exists()
+
+    principal.somar_pendentes(pendentes)
+    principal.somar_pendentes(pendentes)
+    principal.salvar(forcar=True)
+    # 3000 linhas somadas antes do limite: as taxas não mudam com a divisão
+    assert no_disco(caminho)['14']['estrategias']['direto'] == [750, 750]
+
+def test_reprocessamento_em_processos_grava_uma_vez_com_as_contagens_dos_filhos(tmp_path, monkeypatch):
+    import bulk_reparse
+    import parser_dgb
+    from fake_dgb_server import carregar_capturas
+    from html_archive import HtmlArchive
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DGB_PARSE_CACHE', '0')
+    monkeypatch.setenv('DGB_COR_APRENDIDA', '1')
+    caminho = str(tmp_path / 'estrategias.json')
+    anterior = estrategias_cor.set_estrategias_cor(EstrategiasCor(caminho))
+    salvar = estrategias_cor.EstrategiasCor.salvar
+    gravacoes = []
+    monkeypatch.setattr(estrategias_cor.EstrategiasCor, 'salvar',
+                        lambda self, forcar=False: (gravacoes.append(forcar), salvar(self, forcar)))
+    try:
+        capturas = carregar_capturas()
+        produtos = sorted(capturas)[:3]
+        for produto in produtos:
+            HtmlArchive(str(tmp_path / 'arquivo')).put(capturas[produto], produto, timestamp='20260201_120000')
+        linhas = sum(len(parser_dgb.extrair_linhas_lxml(capturas[p])) for p in produtos)
+
+        status = bulk_reparse.reparsear_arquivo(bulk_reparse.status_inicial(), num_workers=2,
+                                                pasta_archive=str(tmp_path / 'arquivo'))
+    finally:
+        estrategias_cor.set_estrategias_cor(anterior)
+
+    assert status['concluidos'] == len(produtos) and status['workers'] == 2
+    assert gravacoes == [True]
+    assert no_disco(caminho)[CHAVE_GERAL]['linhas'] == linhas
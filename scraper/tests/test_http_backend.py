@@ -0,0 +1,61 @@
+# test_http_backend.py - DGBHttpScraper contra o DGB falso: os registros batem com o parser sobre a mesma captura
+import pytest
+
+from fake_dgb_server import FakeDGBServer, carregar_capturas
+from http_backend import DGBHttpScraper
+from parser_dgb import parse_html_dgb_simples
+from registros import linha_csv
+from resilience import ERRO_SESSAO
+
+TIMESTAMP = '2026-01-21 14:33:46'
+
+CAPTURAS = carregar_capturas()
+
+def registros_csv(html, produto):
+    return [linha_csv(r) for r in parse_html_dgb_simples(html, produto, timestamp=TIMESTAMP)]
+
+@pytest.fixture(scope='module')
+def servidor():
+    servidor = FakeDGBServer(CAPTURAS).start()
+    yield servidor
+    servidor.stop()
+
+@pytest.fixture
+def scraper_http(servidor, tmp_path, monkeypatch):
+    # Cache de sessão e histórico das estratégias de cor ficam na pasta temporária
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('DGB_SESSION_KEY', raising=False)
+    for nome, valor in servidor.env().items():
+        monkeypatch.setenv(nome, valor)
+    scraper = DGBHttpScraper()
+    assert scraper.ensure_session()
+    yield scraper
+    scraper.close()
+
+@pytest.mark.parametrize('produto', sorted(CAPTURAS))
+def test_registros_iguais_aos_da_captura(scraper_http, produto):
+    resultado = scraper_http.search_product(produto)
+    assert resultado['success'], resultado.get('error')
+
+    esperado = registros_csv(CAPTURAS[produto], produto)
+    assert esperado, f'captura {produto} sem registros'
+    assert registros_csv(resultado['html'], produto) == esperado
+    assert resultado['estado'] == 'resultados'
+
+def test_sessao_expirada_refaz_login_e_repete_a_pesquisa(scraper_http, servidor):
+    produto = sorted(CAPTURAS)[0]
+    logins = servidor.to_dict()['logins']
+
+    # O servidor esquece a sessão: a pesquisa parcial recebe <redirect> para o login
+    with servidor.lock:
+        servidor.sessoes.clear()
+    resultado = scraper_http.search_product(produto)
+    assert not resultado['success']
+    assert resultado['tipo_erro'] == ERRO_SESSAO
+
+    assert scraper_http.recover(resultado['tipo_erro'])
+    assert servidor.to_dict()['logins'] == logins + 1
+
+    resultado = scraper_http.search_product(produto)
+    assert resultado['success'], resultado.get('error')
+    assert registros_csv(resultado['html'], produto) == registros_csv(CAPTURAS[produto], produto)
@@ -0,0 +1,44 @@
+# test_numeros_br.py - Conversão em lote (matriz de bytes) igual à conversão por célula
+import random
+
+import numpy as np
+import pytest
+
+from numeros_br import centavos_de_texto, centavos_de_textos, formatar_centavos, textos_de_centavos
+
+INT64_MAX = np.iinfo(np.int64).max
+
+def esperado(texto, invalido=0):
+    """centavos_de_texto com os limites do lote: não número ou fora do int64 viram `invalido`"""
+    valor = centavos_de_texto(texto)
+    if valor is None or abs(valor) > INT64_MAX:
+        return invalido
+    return valor
+
+@pytest.mark.parametrize('texto', ['.542834', '..60,', '-.9', '.,34', '.50', '-..4'])
+def test_ponto_antes_dos_digitos_vai_para_a_celula(texto):
+    assert centavos_de_textos([texto]).tolist() == [esperado(texto)]
+
+@pytest.mark.parametrize('alfabeto, tamanho', [
+    ('0123456789.,-', 12),
+    ('0123456789.,-+ ', 24),
+    ('0123456789.,-+ aé\t', 40),
+])
+def test_lote_igual_a_celula_em_textos_aleatorios(alfabeto, tamanho):
+    aleatorio = random.Random(f'{alfabeto}{tamanho}')
+    textos = [''.join(aleatorio.choice(alfabeto) for _ in range(aleatorio.randint(0, tamanho)))
+              for _ in range(20000)]
+    # Também os formatos reais, com sinal e pontos de milhar
+    textos += [formatar_centavos(aleatorio.randint(-10 ** 12, 10 ** 12)) for _ in range(5000)]
+
+    obtidos = centavos_de_textos(textos, invalido=-1).tolist()
+
+    divergentes = [(t, o, esperado(t, -1)) for t, o in zip(textos, obtidos) if o != esperado(t, -1)]
+    assert divergentes == []
+
+def test_ida_e_volta_em_lote():
+    aleatorio = random.Random(7)
+    centavos = [aleatorio.randint(-10 ** 15, 10 ** 15) for _ in range(5000)] + [0, -1, 99, -100]
+    textos = textos_de_centavos(centavos)
+    assert textos == [formatar_centavos(c) for c in centavos]
+    assert centavos_de_textos(textos).tolist() == centavos
@@ -0,0 +1,59 @@
+# test_parse_cache.py - Página inalterada: parse reaproveitado, mas com o horário e a captura da nova pesquisa
+import os
+import csv
+from datetime import datetime
+
+import pytest
+
+import scraper
+import parser_dgb
+import html_archive
+import parse_cache
+from fake_dgb_server import carregar_capturas
+
+CAPTURAS = carregar_capturas()
+PRODUTO = sorted(CAPTURAS)[0]
+
+class Relogio(datetime):
+    agora = datetime(2026, 2, 1, 12, 0, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.agora
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DGB_PARSE_CACHE', '1')
+    monkeypatch.setattr(scraper, 'datetime', Relogio)
+    monkeypatch.setattr(html_archive, 'datetime', Relogio)
+    monkeypatch.setattr(html_archive, '_archive', html_archive.HtmlArchive(str(tmp_path / 'arquivo')))
+    monkeypatch.setattr(parse_cache, '_cache', parse_cache.ParseCache(str(tmp_path / 'parse')))
+    return tmp_path
+
+def pesquisar(momento):
+    Relogio.agora = momento
+    resultado = {'success': True, 'codigo': PRODUTO, 'html': CAPTURAS[PRODUTO]}
+    return resultado, scraper.gerar_csv(resultado)
+
+def ler(nome):
+    with open(os.path.join('csv', nome), newline='', encoding='utf-8-sig') as f:
+        return list(csv.reader(f, delimiter=';'))[1:]
+
+def test_pagina_inalterada_leva_o_horario_da_nova_pesquisa_e_e_arquivada(pasta):
+    _, primeiro = pesquisar(datetime(2026, 2, 1, 12, 0, 0))
+    resultado, segundo = pesquisar(datetime(2026, 2, 2, 9, 30, 0))
+
+    assert primeiro == f'produto_{PRODUTO}_20260201_120000.csv'
+    assert resultado['inalterado']
+    assert segundo == f'produto_{PRODUTO}_20260202_093000.csv'
+    # O CSV anterior (mesmas linhas, horário antigo) é substituído
+    assert os.listdir('csv') == [segundo]
+    linhas = ler(segundo)
+    assert linhas and {linha[1] for linha in linhas} == {'2026-02-02 09:30:00'}
+    parseado = parser_dgb.parse_html_dgb_simples(CAPTURAS[PRODUTO], PRODUTO)
+    assert [linha[2:] for linha in linhas] == [r.linha_csv()[2:] for r in parseado]
+
+    capturas = html_archive.get_archive().entries(PRODUTO)
+    assert [c['timestamp'] for c in capturas] == ['20260201_120000', '20260202_093000']
+    assert capturas[0]['hash'] == capturas[1]['hash'] and not capturas[1]['novo']
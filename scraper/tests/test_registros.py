@@ -0,0 +1,54 @@
+# test_registros.py - Leitura dos CSVs por produto com a mesma tolerância do consolidador com pandas
+import os
+import logging
+
+import pytest
+
+import consolidator
+from registros import COLUNAS_CSV, ler_linhas_csv_produto
+
+PRODUTO = '000014 - VELUDO CONFORT - COR: 5 - BLACK'
+
+def gravar(caminho, cabecalho, *linhas):
+    with open(caminho, 'w', encoding='utf-8-sig', newline='') as f:
+        for linha in (cabecalho,) + linhas:
+            f.write(';'.join(linha) + '\r\n')
+    return str(caminho)
+
+def test_csv_de_write_csv_e_lido_sem_alteracao(tmp_path):
+    linha = ['14', '2026-01-20 10:00:00', PRODUTO, 'Pronta entrega', '1.234,56', '0,00', '1.234,56']
+    assert ler_linhas_csv_produto(gravar(tmp_path / 'a.csv', COLUNAS_CSV, linha)) == [linha]
+
+def test_colunas_fora_de_ordem_e_uma_ausente_sao_aceitas(tmp_path):
+    # Sem 'Pedidos' (4 das 5 necessárias), com colunas em outra ordem e uma extra
+    cabecalho = ['Disponível', 'Produto / Situação / Cor / Desenho / Variante', 'extra', 'Estoque', 'Previsão']
+    caminho = gravar(tmp_path / 'a.csv', cabecalho, ['10,00', PRODUTO, 'x', '12,50', '20/01/2026'])
+
+    assert ler_linhas_csv_produto(caminho) == [['', '', PRODUTO, '20/01/2026', '12,50', '', '10,00']]
+
+def test_linha_curta_e_completada(tmp_path):
+    caminho = gravar(tmp_path / 'a.csv', COLUNAS_CSV, ['14', '2026-01-20 10:00:00', PRODUTO, 'Pronta entrega'])
+    assert ler_linhas_csv_produto(caminho) == [['14', '2026-01-20 10:00:00', PRODUTO, 'Pronta entrega', '', '', '']]
+
+def test_menos_de_4_colunas_necessarias_e_erro_com_as_ausentes(tmp_path):
+    caminho = gravar(tmp_path / 'a.csv', ['Produto / Situação / Cor / Desenho / Variante', 'Previsão', 'Estoque'],
+                     [PRODUTO, 'Pronta entrega', '1,00'])
+    with pytest.raises(ValueError, match='Pedidos, Disponível'):
+        ler_linhas_csv_produto(caminho)
+
+def test_consolidador_soma_csv_antigo_e_registra_o_ignorado(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('csv')
+    os.makedirs('xlsx')
+    gravar(os.path.join('csv', 'produto_14_20260120_100000.csv'),
+           ['Produto / Situação / Cor / Desenho / Variante', 'Previsão', 'Estoque', 'Disponível'],
+           [PRODUTO, 'Pronta entrega', '1.234,56', '1.000,00'])
+    gravar(os.path.join('csv', 'outro.csv'), ['a', 'b'], ['1', '2'])
+
+    with caplog.at_level(logging.WARNING, logger='consolidator'):
+        resultado, _ = consolidator.consolidar_dados_estruturados()
+
+    assert resultado['arquivos_processados'] == 1
+    with open(os.path.join('csv', resultado['arquivo_csv']), encoding='utf-8-sig') as f:
+        assert f.read().splitlines()[1] == f'{PRODUTO};Pronta entrega;1.234,56;0,00;1.000,00'
+    assert any('outro.csv' in r.getMessage() and 'ignorado' in r.getMessage() for r in caplog.records)
@@ -0,0 +1,52 @@
+# test_run_journal.py - Diário de execução e a retomada pela API
+import importlib
+
+from run_journal import RunJournal, hash_linhas
+
+LINHAS = [{'divs': ['000014VELUDO CONFORT', '001TINTO /000055 - BLACK'],
+           'valores': [['Pronta entrega', '5.343,60', '2.484,20', '2.859,40']]}]
+
+def test_extracao_json_registra_o_hash_das_linhas(tmp_path):
+    journal = RunJournal(str(tmp_path / 'run.jsonl'))
+    journal.record({'success': True, 'codigo': '14', 'linhas': LINHAS, 'csv_file': 'estoque_14.csv'})
+    journal.record({'success': True, 'codigo': '15', 'html': '<html></html>'})
+
+    _, produtos = journal.load()
+    assert produtos['14']['linhas_sha256'] == hash_linhas(LINHAS)
+    assert produtos['14']['html_sha256'] is None
+    assert produtos['15']['html_sha256'] and produtos['15']['linhas_sha256'] is None
+
+def test_hash_das_linhas_muda_com_o_conteudo():
+    alteradas = [dict(LINHAS[0], valores=[['Pronta entrega', '5.343,60', '2.484,20', '2.859,41']])]
+    assert hash_linhas(LINHAS) == hash_linhas([dict(LINHAS[0])])
+    assert hash_linhas(LINHAS) != hash_linhas(alteradas)
+
+def test_retomar_recusa_durante_reprocessamento(tmp_path, monkeypatch):
+    # app cria as pastas de trabalho na pasta atual ao ser importado
+    monkeypatch.chdir(tmp_path)
+    app = importlib.import_module('app')
+    monkeypatch.setattr(app, 'reparse_status', {'running': True})
+    monkeypatch.setitem(app.scraping_status, 'running', False)
+
+    resposta = app.app.test_client().post('/api/resume')
+    assert resposta.status_code == 400
+    assert 'Reprocessamento' in resposta.get_json()['error']
+
+def test_execucoes_no_mesmo_segundo_tem_diarios_diferentes(tmp_path, monkeypatch):
+    import run_journal
+    from datetime import datetime
+
+    class Relogio(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 2, 1, 12, 0, 0)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(run_journal, 'datetime', Relogio)
+    diarios = [RunJournal.create([str(n)]) for n in range(1, 12)]
+
+    assert len({d.caminho for d in diarios}) == 11
+    assert diarios[1].caminho.endswith('run_20260201_120000_002.jsonl')
+    assert RunJournal.latest().caminho == diarios[-1].caminho
+    inicio, _ = RunJournal.latest().load()
+    assert inicio['produtos'] == ['11'] and inicio['run_id'] == '20260201_120000_011'
@@ -0,0 +1,43 @@
+# test_session_cache.py - Cache de sessão por navegador, descarte seguro e chave inválida
+import logging
+
+import session_cache
+from session_cache import SessionCache, reservar_slot, liberar_slot, caminho_do_slot
+
+COOKIES = [{'name': 'JSESSIONID', 'value': 'abc', 'path': '/'}]
+
+def criar(caminho, **kwargs):
+    return SessionCache('usuario', 'senha', 'http://dgb/login', caminho=str(caminho), **kwargs)
+
+def test_slots_distintos_por_navegador():
+    a, b = reservar_slot(), reservar_slot()
+    try:
+        assert a != b
+        assert caminho_do_slot(a) != caminho_do_slot(b)
+    finally:
+        liberar_slot(a)
+        liberar_slot(b)
+
+def test_descarte_mantem_sessao_salva_por_outro_worker(tmp_path):
+    caminho = tmp_path / 'sessao.bin'
+    worker_a, worker_b = criar(caminho), criar(caminho)
+    worker_a.save(COOKIES)
+    assert worker_b.load() == COOKIES
+
+    # A refaz o login e grava uma sessão nova; a falha de B com a sessão antiga não a apaga
+    worker_a.save([{'name': 'JSESSIONID', 'value': 'novo', 'path': '/'}])
+    assert worker_b.discard() is False
+    assert caminho.exists()
+
+    assert worker_a.discard() is True
+    assert not caminho.exists()
+
+def test_chave_invalida_usa_a_chave_derivada(tmp_path, monkeypatch, caplog):
+    monkeypatch.setenv('DGB_SESSION_KEY', 'nao-e-uma-chave-fernet')
+    with caplog.at_level(logging.WARNING, logger=session_cache.__name__):
+        cache = criar(tmp_path / 'sessao.bin')
+    assert 'DGB_SESSION_KEY inválida' in caplog.text
+
+    cache.save(COOKIES)
+    monkeypatch.delenv('DGB_SESSION_KEY')
+    assert criar(tmp_path / 'sessao.bin').load() == COOKIES
@@ -0,0 +1,43 @@
+# test_wait_dgb.py - Espera dos resultados da pesquisa com um driver que devolve estados prontos
+import time
+
+from wait_dgb import DGBWaitEngine, ESTADO_RESULTADOS, ESTADO_SEM_RESULTADOS, ESTADO_TIMEOUT
+
+def estado_pagina(ajax=0, pronto=True, atualizado=False, linhas=0):
+    return {'ajax': ajax, 'pronto': pronto, 'atualizado': atualizado, 'estoque_total': False, 'linhas': linhas}
+
+class DriverFalso:
+    """Devolve os estados em sequência para JS_ESTADO_PAGINA (o último se repete)"""
+
+    def __init__(self, estados):
+        self.estados = list(estados)
+
+    def execute_script(self, script, *args):
+        if len(self.estados) > 1:
+            return self.estados.pop(0)
+        return self.estados[0]
+
+def espera(driver, timeout=5):
+    return DGBWaitEngine(driver, timeout=timeout, intervalo=0.01, estabilidade=0.02, ciclos_sem_atualizacao=10)
+
+def test_resultados_novos_estaveis():
+    estado, info = espera(DriverFalso([estado_pagina(ajax=1), estado_pagina(atualizado=True, linhas=7)])).wait_for_results()
+    assert estado == ESTADO_RESULTADOS
+    assert info['linhas'] == 7
+
+def test_resposta_sem_elementos_de_resultado_nao_espera_o_timeout():
+    driver = DriverFalso([estado_pagina(ajax=1), estado_pagina(ajax=1), estado_pagina()])
+    inicio = time.monotonic()
+    estado, info = espera(driver).wait_for_results()
+    assert estado == ESTADO_SEM_RESULTADOS
+    assert info['sem_atualizacao']
+    assert time.monotonic() - inicio < 1
+
+def test_linhas_antigas_sem_atualizacao_nao_contam_como_resultado():
+    estado, _ = espera(DriverFalso([estado_pagina(linhas=12)])).wait_for_results()
+    assert estado == ESTADO_SEM_RESULTADOS
+
+def test_ajax_ativo_ate_o_fim_e_timeout():
+    estado, info = espera(DriverFalso([estado_pagina(ajax=1)]), timeout=0.3).wait_for_results()
+    assert estado == ESTADO_TIMEOUT
+    assert info['ajax'] == 1
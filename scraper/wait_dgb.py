@@ -0,0 +1,191 @@
+# wait_dgb.py - Espera orientada a eventos do ciclo AJAX (JSF/PrimeFaces) do DGB
+import time
+import logging
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# Estados finais de uma pesquisa
+ESTADO_RESULTADOS = 'resultados'
+ESTADO_SEM_RESULTADOS = 'sem_resultados'
+ESTADO_TIMEOUT = 'timeout'
+
+# AJAX ocioso sem nenhum elemento de resultado novo por CICLOS_SEM_ATUALIZACAO x estabilidade:
+# a resposta não trouxe resultados (vazia ou mensagem de validação em outro lugar)
+CICLOS_SEM_ATUALIZACAO = 10
+
+# Instala um contador de requisições AJAX ativas usando os eventos do jsf.ajax
+JS_INSTALAR_MONITOR = """
+if (!window.__dgbMonitor) {
+    var m = {ativos: 0, concluidos: 0, erros: 0};
+    window.__dgbMonitor = m;
+    try {
+        if (window.jsf && jsf.ajax && jsf.ajax.addOnEvent) {
+            jsf.ajax.addOnEvent(function (data) {
+                if (data.status === 'begin') { m.ativos++; }
+                if (data.status === 'success') { m.ativos = Math.max(0, m.ativos - 1); m.concluidos++; }
+            });
+            jsf.ajax.addOnError(function () { m.ativos = Math.max(0, m.ativos - 1); m.erros++; });
+        }
+    } catch (e) {}
+}
+return true;
+"""
+
+# Marca os elementos de resultado atuais; o update AJAX do JSF os substitui
+JS_MARCAR_RESULTADOS = """
+['mensagem', 'estoquePrevisaoList', 'estoqueTotal'].forEach(function (id) {
+    var el = document.getElementById(id);
+    if (el) { el.setAttribute('data-dgb-antigo', '1'); }
+});
+return true;
+"""
+
+# Fotografia do estado da página usada a cada polling
+JS_ESTADO_PAGINA = """
+var m = window.__dgbMonitor || {ativos: 0};
+var ativos = m.ativos;
+if (window.jQuery && jQuery.active) { ativos += jQuery.active; }
+if (window.PrimeFaces && PrimeFaces.ajax && PrimeFaces.ajax.Queue && PrimeFaces.ajax.Queue.requests) {
+    ativos += PrimeFaces.ajax.Queue.requests.length;
+}
+var novo = function (id) {
+    var el = document.getElementById(id);
+    return !!el && !el.hasAttribute('data-dgb-antigo');
+};
+var total = document.getElementById('estoqueTotal');
+return {
+    ajax: ativos,
+    pronto: document.readyState === 'complete',
+    atualizado: novo('mensagem') || novo('estoquePrevisaoList') || novo('estoqueTotal'),
+    estoque_total: !!total,
+    linhas: document.querySelectorAll('tr.registro').length
+};
+"""
+
+class _ResultadosEstaveis:
+    """
+    Condição para WebDriverWait: AJAX ocioso, DOM novo e contagem de linhas estável;
+    ou AJAX ocioso e documento pronto sem atualização por ciclos_sem_atualizacao x estabilidade
+    """
+
+    def __init__(self, estabilidade, ciclos_sem_atualizacao=CICLOS_SEM_ATUALIZACAO):
+        self.estabilidade = estabilidade
+        self.espera_sem_atualizacao = estabilidade * ciclos_sem_atualizacao
+        self.ultimo_total = None
+        self.desde = None
+        self.ocioso_desde = None
+        self.ultimo_estado = None
+
+    def __call__(self, driver):
+        try:
+            estado = driver.execute_script(JS_ESTADO_PAGINA)
+        except WebDriverException:
+            # Página sendo recarregada (submit não-AJAX)
+            self.ultimo_total = None
+            self.ocioso_desde = None
+            return False
+        self.ultimo_estado = estado
+        agora = time.monotonic()
+
+        if estado['ajax'] > 0 or not estado['pronto']:
+            self.ultimo_total = None
+            self.ocioso_desde = None
+            return False
+
+        if not estado['atualizado']:
+            # Nada novo renderizado: depois de um tempo ocioso, a pesquisa acabou sem resultados
+            self.ultimo_total = None
+            if self.ocioso_desde is None:
+                self.ocioso_desde = agora
+            if agora - self.ocioso_desde < self.espera_sem_atualizacao:
+                return False
+            return dict(estado, sem_atualizacao=True)
+        self.ocioso_desde = None
+
+        if estado['linhas'] != self.ultimo_total:
+            self.ultimo_total = estado['linhas']
+            self.desde = agora
+            return False
+
+        if agora - self.desde < self.estabilidade:
+            return False
+
+        return estado
+
+class DGBWaitEngine:
+    """Substitui os time.sleep fixos por esperas que retornam assim que a página está pronta"""
+
+    def __init__(self, driver, timeout=30, intervalo=0.1, estabilidade=0.3,
+                 ciclos_sem_atualizacao=CICLOS_SEM_ATUALIZACAO):
+        self.driver = driver
+        self.timeout = timeout
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        self.ciclos_sem_atualizacao = ciclos_sem_atualizacao
+
+    def _wait(self, timeout=None):
+        return WebDriverWait(self.driver, timeout or self.timeout, poll_frequency=self.intervalo)
+
+    def wait_document_ready(self, timeout=None):
+        """Aguarda document.readyState == 'complete'"""
+        try:
+            self._wait(timeout).until(
+                lambda d: d.execute_script("return document.readyState") == 'complete'
+            )
+            return True
+        except TimeoutException:
+            logger.warning("Timeout aguardando carregamento do documento")
+            return False
+
+    def wait_for_element(self, by, valor, timeout=None):
+        """Aguarda um elemento estar presente e retorna o elemento (ou None)"""
+        try:
+            return self._wait(timeout).until(EC.presence_of_element_located((by, valor)))
+        except TimeoutException:
+            logger.warning(f"Timeout aguardando elemento {valor}")
+            return None
+
+    def wait_url_change(self, url_anterior, timeout=None):
+        """Aguarda a URL mudar (ex.: redirecionamento após o login)"""
+        try:
+            self._wait(timeout).until(EC.url_changes(url_anterior))
+            self.wait_document_ready(timeout)
+            return True
+        except TimeoutException:
+            return False
+
+    def install_ajax_monitor(self):
+        """Instala o contador de AJAX ativo na página atual"""
+        try:
+            self.driver.execute_script(JS_INSTALAR_MONITOR)
+        except WebDriverException as e:
+            logger.debug(f"Não foi possível instalar monitor AJAX: {e}")
+
+    def mark_results(self):
+        """Marca os resultados atuais para detectar quando forem substituídos"""
+        self.install_ajax_monitor()
+        try:
+            self.driver.execute_script(JS_MARCAR_RESULTADOS)
+        except WebDriverException as e:
+            logger.debug(f"Não foi possível marcar resultados: {e}")
+
+    def wait_for_results(self, timeout=None):
+        """
+        Aguarda o fim da pesquisa disparada pelo botão Pesquisar.
+        Retorna (estado, info) com estado em ESTADO_RESULTADOS,
+        ESTADO_SEM_RESULTADOS ou ESTADO_TIMEOUT.
+        """
+        condicao = _ResultadosEstaveis(self.estabilidade, self.ciclos_sem_atualizacao)
+        try:
+            estado = self._wait(timeout).until(condicao)
+        except TimeoutException:
+            logger.warning(f"Timeout aguardando resultados: {condicao.ultimo_estado}")
+            return ESTADO_TIMEOUT, condicao.ultimo_estado or {}
+
+        # Sem atualização as linhas na página (se houver) são da pesquisa anterior
+        if estado['linhas'] > 0 and not estado.get('sem_atualizacao'):
+            return ESTADO_RESULTADOS, estado
+        return ESTADO_SEM_RESULTADOS, estado
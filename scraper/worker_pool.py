@@ -0,0 +1,220 @@
+# worker_pool.py - Pool de navegadores DGB consumindo uma fila de produtos
+import os
+import time
+import queue
+import threading
+import logging
+from datetime import datetime
+
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+def get_num_workers(valor=None):
+    """Número de workers: parâmetro explícito ou variável DGB_WORKERS (padrão 1)"""
+    try:
+        n = int(valor if valor is not None else os.getenv('DGB_WORKERS', '1'))
+    except (TypeError, ValueError):
+        n = 1
+    return max(1, n)
+
+class WorkerStats:
+    """Contadores de vazão de um worker"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.inicio = time.monotonic()
+        self.fim = None
+        self.processados = 0
+        self.sucessos = 0
+        self.erros = 0
+        self.tempo_ocupado = 0.0
+        self.atual = ''
+        self.estado = 'iniciando'
+
+    def to_dict(self):
+        decorrido = max((self.fim or time.monotonic()) - self.inicio, 1e-6)
+        return {
+            'estado': self.estado,
+            'atual': self.atual,
+            'processados': self.processados,
+            'sucessos': self.sucessos,
+            'erros': self.erros,
+            'tempo_ativo_s': round(decorrido, 1),
+            'produtos_por_minuto': round(self.processados * 60 / decorrido, 2),
+            'segundos_por_produto': round(self.tempo_ocupado / self.processados, 2) if self.processados else None
+        }
+
+class ScrapingWorkerPool:
+    """
+    Executa N instâncias de scraper (cada uma com seu Chrome) puxando
+    códigos de uma fila compartilhada e reportando em status_dict.
+    """
+
+    def __init__(self, status_dict, produtos, criar_scraper, processar, num_workers=1, pausa=3,
+                 ao_registrar=None, limitador=None, resiliencia=None, pipeline=None):
+        self.status = status_dict
+        self.produtos = list(produtos)
+        self.criar_scraper = criar_scraper
+        self.processar = processar
+        self.ao_registrar = ao_registrar
+        self.limitador = limitador
+        # Só para publicar os contadores; as retentativas acontecem em processar()
+        self.resiliencia = resiliencia
+        # Com pipeline, processar() só pesquisa; parse e CSV seguem em segundo plano
+        self.pipeline = pipeline
+        self.num_workers = max(1, min(num_workers, len(self.produtos) or 1))
+        if pipeline:
+            pipeline.set_fetch_workers(self.num_workers)
+        self.pausa = pausa
+        self.latencias = LatencyHistogram()
+        self.fila = queue.Queue()
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.concluidos = 0
+        self.workers_com_sessao = 0
+        self.inicio = time.monotonic()
+
+        for produto in self.produtos:
+            self.fila.put(produto)
+
+    def run(self):
+        """Inicia os workers e bloqueia até a fila esvaziar ou o scraping ser interrompido"""
+        self.status['workers'] = {}
+        self.status['message'] = f'Iniciando {self.num_workers} navegador(es)...'
+        logger.info(f"🚀 Iniciando pool com {self.num_workers} worker(s) para {len(self.produtos)} produtos")
+
+        threads = []
+        for i in range(1, self.num_workers + 1):
+            nome = f'worker-{i}'
+            self.stats[nome] = WorkerStats(nome)
+            thread = threading.Thread(target=self._worker, args=(nome,), name=f'dgb-{nome}', daemon=True)
+            threads.append(thread)
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        # Aguarda parse/escrita dos produtos já pesquisados
+        if self.pipeline:
+            self.pipeline.close()
+
+        self._publicar()
+        return self.workers_com_sessao > 0
+
+    def _worker(self, nome):
+        stats = self.stats[nome]
+        scraper = None
+
+        try:
+            try:
+                scraper = self.criar_scraper()
+                scraper.latencias = self.latencias
+            except Exception as e:
+                logger.error(f"[{nome}] Falha ao iniciar sessão: {e}")
+                stats.estado = f'erro: {e}'
+                self._publicar()
+                return
+
+            with self.lock:
+                self.workers_com_sessao += 1
+                if self.status['message'].startswith('Iniciando'):
+                    self.status['message'] = 'Iniciando consultas...'
+            stats.estado = 'ativo'
+
+            while self.status['running']:
+                try:
+                    produto = self.fila.get_nowait()
+                except queue.Empty:
+                    break
+
+                # Ritmo de consultas compartilhado entre os workers
+                if self.limitador and not self.limitador.acquire(lambda: self.status['running']):
+                    self.fila.put(produto)
+                    break
+
+                stats.atual = produto
+                with self.lock:
+                    self.status['current'] = produto
+
+                logger.info(f"[{nome}] Processando produto {produto}")
+                inicio = time.monotonic()
+                try:
+                    resultado = self.processar(scraper, produto)
+                except Exception as e:
+                    logger.error(f"[{nome}] Erro no produto {produto}: {e}")
+                    resultado = {'success': False, 'codigo': produto, 'error': str(e)}
+                resultado['worker'] = nome
+
+                duracao = time.monotonic() - inicio
+                stats.tempo_ocupado += duracao
+                stats.processados += 1
+                if resultado.get('success'):
+                    stats.sucessos += 1
+                else:
+                    stats.erros += 1
+                if self.limitador:
+                    self.limitador.record(resultado)
+                if self.pipeline:
+                    self.pipeline.observe_fetch(duracao)
+                    self.pipeline.submit(resultado, self._registrar)
+                else:
+                    self._registrar(resultado)
+
+                # Sem limitador adaptativo: pausa fixa entre consultas
+                if not self.limitador and self.pausa and not self.fila.empty():
+                    time.sleep(self.pausa)
+
+            stats.estado = 'finalizado'
+
+        finally:
+            stats.atual = ''
+            stats.fim = time.monotonic()
+            if scraper:
+                try:
+                    scraper.close()
+                except Exception as e:
+                    logger.warning(f"[{nome}] Erro ao fechar navegador: {e}")
+            self._publicar()
+
+    def _registrar(self, resultado):
+        """Registra o resultado de um produto em status_dict (sob lock)"""
+        with self.lock:
+            self.concluidos += 1
+            if self.ao_registrar:
+                self.ao_registrar(resultado)
+            self.status['results'].append(resultado)
+            if resultado.get('csv_file'):
+                self.status['csv_files'].append(resultado['csv_file'])
+            # Conta também resultados restaurados de uma execução retomada
+            total = self.status.get('total') or len(self.produtos)
+            feitos = len(self.status['results'])
+            self.status['progress'] = int((feitos / total) * 100) if total else 100
+            self.status['message'] = f"Processando {resultado.get('codigo')} ({feitos}/{total})"
+        self._publicar()
+
+    def _publicar(self):
+        """Atualiza a leitura de vazão por worker e agregada em status_dict"""
+        with self.lock:
+            decorrido = max(time.monotonic() - self.inicio, 1e-6)
+            self.status['workers'] = {nome: s.to_dict() for nome, s in self.stats.items()}
+            self.status['throughput'] = {
+                'workers': self.num_workers,
+                'concluidos': self.concluidos,
+                'produtos_por_minuto': round(self.concluidos * 60 / decorrido, 2),
+                'atualizado_em': datetime.now().isoformat()
+            }
+            self.status['latencia'] = self.latencias.to_dict()
+            if self.limitador:
+                self.status['rate_limiter'] = self.limitador.snapshot()
+            if self.resiliencia:
+                self.status['resiliencia'] = self.resiliencia.to_dict()
+
+    def log_resumo(self):
+        """Escreve a vazão de cada worker no log"""
+        for nome, s in self.stats.items():
+            d = s.to_dict()
+            logger.info(f"👷 {nome}: {d['processados']} produtos, {d['produtos_por_minuto']} prod/min, "
+                        f"{d['sucessos']} sucessos, {d['erros']} erros")
+        logger.info(f"⚡ Vazão total: {self.status.get('throughput', {}).get('produtos_por_minuto')} prod/min "
+                    f"com {self.num_workers} worker(s)")